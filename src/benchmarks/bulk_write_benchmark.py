@@ -0,0 +1,121 @@
+"""
+Benchmark of the chunk writer (models/ChunkWriter.py) against the former sequential insert_many_chunks.
+
+It inserts the same chunks into a MongoDB collection with:
+- sequential: ordered bulk_write of 100 chunks, one round-trip at a time (the former insert_many_chunks).
+- ChunkWriter: unordered bulk_writes cut by encoded size, at every concurrency level of --concurrency.
+
+and reports the inserts/sec and the batch sizes. The collection is dropped before every run.
+
+It needs a running mongod, run it from the src directory:
+    python -m benchmarks.bulk_write_benchmark                                   # mongodb://localhost:27017
+    python -m benchmarks.bulk_write_benchmark --uri mongodb://host:27017 --chunks 200000
+    python -m benchmarks.bulk_write_benchmark --chunk-size 1000 --batch-bytes 4194304 --concurrency 1 4 16
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne
+
+from models.ChunkWriter import ChunkWriter
+from models.db_schemes import DataChunk
+
+
+def make_chunks(count: int, chunk_size: int):
+    # chunks shaped like the ones of a processed file: same project, asset and generation, numbered in order
+    rng = random.Random(42)
+    vocabulary = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 10))) for _ in range(5000)]
+    project_id, asset_id, generation = ObjectId(), ObjectId(), ObjectId()
+
+    chunks = []
+    for i in range(count):
+        text = " ".join(rng.choices(vocabulary, k=chunk_size // 6))[:chunk_size]
+        chunks.append(DataChunk(
+            chunk_text=text,
+            chunk_metadata={"source": "benchmark.txt", "page": i // 20},
+            chunk_order=i + 1,
+            chunk_project_id=project_id,
+            chunk_asset_id=asset_id,
+            chunk_generation=generation
+        ))
+
+    return chunks
+
+
+async def insert_sequential(collection, chunks: list, batch_size: int=100):
+    # the former ChunkModel.insert_many_chunks
+    for i in range(0, len(chunks), batch_size):
+        await collection.bulk_write([
+            InsertOne(chunk.dict(by_alias=True, exclude_unset=True))
+            for chunk in chunks[i:i + batch_size]
+        ])
+
+    return len(chunks), len(range(0, len(chunks), batch_size))
+
+
+async def insert_writer(collection, chunks: list, batch_bytes: int, batch_size: int, concurrency: int):
+    writer = ChunkWriter(collection=collection, max_batch_bytes=batch_bytes, max_batch_size=batch_size,
+                         concurrency=concurrency)
+    for chunk in chunks:
+        await writer.add(chunk)
+
+    return await writer.close(), len(writer.batches)
+
+
+async def run(collection, name: str, insert, chunks: list, *args):
+    await collection.drop()
+
+    start = time.perf_counter()
+    inserted, batches = await insert(collection, chunks, *args)
+    seconds = time.perf_counter() - start
+
+    assert inserted == len(chunks) == await collection.count_documents({}), f"{name}: missing chunks"
+
+    return {
+        "name": name,
+        "batches": batches,
+        "chunks_per_batch": len(chunks) / batches,
+        "inserts_s": len(chunks) / seconds,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="MongoDB connection string")
+    parser.add_argument("--database", default="rag_benchmark", help="database of the benchmark collection")
+    parser.add_argument("--chunks", type=int, default=50000, help="chunks inserted per run")
+    parser.add_argument("--chunk-size", type=int, default=500, help="characters per chunk")
+    parser.add_argument("--batch-bytes", type=int, default=2097152, help="PROCESSING_INSERT_BATCH_BYTES")
+    parser.add_argument("--batch-size", type=int, default=1000, help="PROCESSING_INSERT_BATCH_SIZE")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="PROCESSING_INSERTS_IN_FLIGHT levels")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    collection = client[args.database]["chunks"]
+    chunks = make_chunks(count=args.chunks, chunk_size=args.chunk_size)
+
+    try:
+        results = [await run(collection, "sequential (100, ordered)", insert_sequential, chunks)]
+        for concurrency in args.concurrency:
+            results.append(await run(collection, f"ChunkWriter x{concurrency}", insert_writer, chunks,
+                                     args.batch_bytes, args.batch_size, concurrency))
+    finally:
+        await client.drop_database(args.database)
+        client.close()
+
+    print(f"{args.chunks} chunks of {args.chunk_size} characters, batches of at most "
+          f"{args.batch_bytes} bytes / {args.batch_size} chunks")
+    print(f"{'writer':<28}{'batches':>9}{'chunks/batch':>14}{'inserts/s':>12}{'speedup':>9}")
+    for result in results:
+        print(f"{result['name']:<28}{result['batches']:>9}{result['chunks_per_batch']:>14.1f}"
+              f"{result['inserts_s']:>12.0f}{result['inserts_s'] / results[0]['inserts_s']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark of the compressed-at-rest storage (FILE_STORAGE_COMPRESSION) against raw I/O.
+
+It writes the same content to disk chunk by chunk (like DataController.write_blob_stream does),
+then reads it back decompressed (like ProcessController does), and reports the compression ratio
+and the write / read throughput for every compression and level.
+
+Run it from the src directory:
+    python -m benchmarks.compression_benchmark                      # synthetic text (64 MB)
+    python -m benchmarks.compression_benchmark --file my_file.txt   # your own file
+    python -m benchmarks.compression_benchmark --size-mb 256 --levels 1 3 6
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from helpers.compression import COMPRESSION_EXTENSIONS, get_compressor, open_decompressed
+from models.enums.StorageEnums import CompressionEnum
+
+CHUNK_SIZE = 512000 # same as FILE_DEFAULT_CHUNK_SIZE
+
+
+def make_synthetic_text(size: int):
+    # words with a natural-language like frequency distribution, split in lines and paragraphs
+    rng = random.Random(42)
+    vocabulary = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 10))) for _ in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    parts, total = [], 0
+    while total < size:
+        line = " ".join(rng.choices(vocabulary, weights=weights, k=rng.randint(5, 20))) + ".\n"
+        if rng.random() < 0.1:
+            line += "\n"
+        parts.append(line)
+        total += len(line)
+
+    return "".join(parts).encode("utf-8")[:size]
+
+
+def write_file(file_path: str, content: bytes, compression: str, level: int):
+    compressor = get_compressor(compression=compression, level=level)
+
+    with open(file_path, "wb") as f:
+        for i in range(0, len(content), CHUNK_SIZE):
+            chunk = content[i:i + CHUNK_SIZE]
+            f.write(compressor.compress(chunk) if compressor is not None else chunk)
+
+        if compressor is not None:
+            f.write(compressor.flush())
+
+
+def read_file(file_path: str, compression: str):
+    size = 0
+
+    with open_decompressed(file_path=file_path, compression=compression) as f:
+        while chunk := f.read(CHUNK_SIZE):
+            size += len(chunk)
+
+    return size
+
+
+def run(content: bytes, compression: str, level: int, work_dir: str):
+    file_path = os.path.join(work_dir, "blob" + COMPRESSION_EXTENSIONS[compression])
+
+    start = time.perf_counter()
+    write_file(file_path=file_path, content=content, compression=compression, level=level)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    read_size = read_file(file_path=file_path, compression=compression)
+    read_seconds = time.perf_counter() - start
+
+    assert read_size == len(content), "the content read back does not match the written content"
+
+    stored_size = os.path.getsize(file_path)
+    os.remove(file_path)
+
+    mb = len(content) / (1024 * 1024)
+    return {
+        "compression": compression,
+        "level": level if compression != CompressionEnum.NONE.value else "-",
+        "ratio": len(content) / stored_size,
+        "write_mb_s": mb / write_seconds,
+        "read_mb_s": mb / read_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="benchmark this file instead of synthetic text")
+    parser.add_argument("--size-mb", type=int, default=64, help="size of the synthetic text in MB")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 3, 6, 9])
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            content = f.read()
+    else:
+        content = make_synthetic_text(size=args.size_mb * 1024 * 1024)
+
+    compressions = [CompressionEnum.GZIP.value, CompressionEnum.ZSTD.value]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = [run(content=content, compression=CompressionEnum.NONE.value, level=0, work_dir=work_dir)]
+        for compression in compressions:
+            for level in args.levels:
+                results.append(run(content=content, compression=compression, level=level, work_dir=work_dir))
+
+    print(f"content: {len(content) / (1024 * 1024):.1f} MB")
+    print(f"{'compression':<12}{'level':>6}{'ratio':>8}{'write MB/s':>12}{'read MB/s':>12}")
+    for result in results:
+        print(f"{result['compression']:<12}{result['level']:>6}{result['ratio']:>8.2f}"
+              f"{result['write_mb_s']:>12.1f}{result['read_mb_s']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Microbenchmark of the lean DataChunk / Asset paths against the pydantic round-trip.
+
+- chunk write: DataChunk(...).dict(by_alias=True, exclude_unset=True) (validated model, then dict)
+  against DataChunk.make_record(...) (BSON ready dict built directly, what the ingestion writes).
+- asset listing: full records decoded from BSON then Asset(**record) (the former get_all_project_assets in /process)
+  against projected records decoded from BSON and used as they are (AssetModel.iter_assets).
+
+With pydantic 2 the validation runs in compiled code, Asset.model_construct(**record) is slower than Asset(**record):
+the read path saves by skipping the models and the unused fields, not by skipping the validation.
+
+It checks that both paths give the same documents / fields, and reports the operations per second.
+
+Run it from the src directory:
+    python -m benchmarks.serialization_benchmark
+    python -m benchmarks.serialization_benchmark --count 500000 --chunk-size 1000
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import bson
+from bson.objectid import ObjectId
+
+from models.db_schemes import Asset, DataChunk
+
+
+def make_chunk_args(count: int, chunk_size: int):
+    project_id, asset_id, generation = ObjectId(), ObjectId(), ObjectId()
+    return [
+        {
+            "chunk_text": "x" * chunk_size,
+            "chunk_metadata": {"source": "benchmark.pdf", "page": i // 20},
+            "chunk_order": i + 1,
+            "chunk_project_id": project_id,
+            "chunk_asset_id": asset_id,
+            "chunk_generation": generation,
+            "chunk_profile": None,
+        }
+        for i in range(count)
+    ]
+
+
+def make_asset_records(count: int):
+    project_id = ObjectId()
+    return [
+        {
+            "_id": ObjectId(),
+            "asset_project_id": project_id,
+            "asset_type": "file",
+            "asset_name": f"{i}_file.pdf",
+            "asset_size": 1024 * i,
+            "asset_stored_size": 1024 * i,
+            "asset_hash": f"{i:064x}",
+            "asset_config": {"asset_compression": None},
+            "asset_chunking": {"asset_hash": f"{i:064x}", "chunk_size": 100, "overlap_size": 20},
+            "asset_pushed_at": datetime.utcnow(),
+        }
+        for i in range(count)
+    ]
+
+
+def timed(func, items: list, repeat: int):
+    # best of `repeat` runs
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = [func(item) for item in items]
+        best = min(best, time.perf_counter() - start)
+    return result, len(items) / best
+
+
+def compare(name: str, slow, fast, items: list, repeat: int, key=lambda result: result):
+    slow_results, slow_ops = timed(slow, items, repeat)
+    fast_results, fast_ops = timed(fast, items, repeat)
+
+    assert [key(result) for result in slow_results] == [key(result) for result in fast_results], \
+        f"{name}: the lean path does not give the same result"
+
+    return {"name": name, "slow_ops": slow_ops, "fast_ops": fast_ops}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="documents per run")
+    parser.add_argument("--chunk-size", type=int, default=500, help="characters per chunk")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path, the best one is reported")
+    args = parser.parse_args()
+
+    chunk_args = make_chunk_args(count=args.count, chunk_size=args.chunk_size)
+    asset_records = make_asset_records(count=args.count)
+
+    # what the database sends: full documents, or only the projected fields
+    full_documents = [bson.encode(record) for record in asset_records]
+    projected_documents = [
+        bson.encode({key: record[key] for key in ("_id", "asset_name", "asset_hash")})
+        for record in asset_records
+    ]
+
+    results = [
+        compare("chunk write", lambda kwargs: DataChunk(**kwargs).dict(by_alias=True, exclude_unset=True),
+                lambda kwargs: DataChunk.make_record(**kwargs), chunk_args, args.repeat),
+        compare("asset listing",
+                lambda documents: Asset(**bson.decode(documents[0])),
+                lambda documents: bson.decode(documents[1]),
+                list(zip(full_documents, projected_documents)), args.repeat,
+                key=lambda asset: (asset["_id"], asset["asset_name"], asset["asset_hash"]) if isinstance(asset, dict)
+                                  else (asset.id, asset.asset_name, asset.asset_hash)),
+    ]
+
+    print(f"{args.count} documents, chunks of {args.chunk_size} characters, same results on both paths")
+    print(f"{'path':<16}{'pydantic ops/s':>16}{'lean ops/s':>14}{'speedup':>9}")
+    for result in results:
+        print(f"{result['name']:<16}{result['slow_ops']:>16.0f}{result['fast_ops']:>14.0f}"
+              f"{result['fast_ops'] / result['slow_ops']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Microbenchmark of the settings lookups made by one request.
+
+- before: every lookup builds a new Settings() (reads the environment and parses `.env`),
+  what get_settings did for the Depends(get_settings) of the route, every controller and every model.
+- after: every lookup returns the cached snapshot (get_settings), `.env` is only read again by reload_settings.
+
+It checks that both paths give the same settings, and reports the microseconds per request.
+
+Run it from the src directory (it needs the `.env` file the app uses):
+    python -m benchmarks.settings_benchmark
+    python -m benchmarks.settings_benchmark --lookups 6 --requests 5000
+"""
+
+import argparse
+import time
+
+from helpers.config import Settings, get_settings, reload_settings
+
+
+def timed(func, requests: int, lookups: int, repeat: int):
+    # best of `repeat` runs, microseconds per request
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            for _ in range(lookups):
+                func()
+        best = min(best, time.perf_counter() - start)
+    return best / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    parser.add_argument("--lookups", type=int, default=4,
+                        help="settings lookups per request (Example: the route dependency, two controllers, a model)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path, the best one is reported")
+    args = parser.parse_args()
+
+    assert Settings().model_dump() == get_settings().model_dump(), "the snapshot does not give the same settings"
+
+    before_us = timed(Settings, args.requests, args.lookups, args.repeat)
+    after_us = timed(get_settings, args.requests, args.lookups, args.repeat)
+    reload_us = timed(reload_settings, args.requests, 1, args.repeat)
+
+    print(f"{args.requests} requests, {args.lookups} settings lookups per request, same settings on both paths")
+    print(f"{'path':<28}{'us/request':>12}")
+    print(f"{'before: Settings() each':<28}{before_us:>12.2f}")
+    print(f"{'after: cached snapshot':<28}{after_us:>12.2f}")
+    print(f"{'speedup':<28}{before_us / after_us:>11.0f}x")
+    print(f"{'reload_settings (once)':<28}{reload_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
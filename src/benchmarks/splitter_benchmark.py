@@ -0,0 +1,146 @@
+"""
+Benchmark of the native text splitter (helpers/text_splitter.py) against langchain's RecursiveCharacterTextSplitter.
+
+It splits the same text with both splitters, checks that they give exactly the same chunks,
+and reports the throughput of:
+- split_text: the splitters alone (list of strings).
+- pipeline: what load_and_split_window does with each splitter, from pages to (chunk_text, chunk_metadata) tuples
+  (create_documents + tuples for langchain, ProcessController.split_file_content for native).
+
+Run it from the src directory:
+    python -m benchmarks.splitter_benchmark                      # synthetic text (16 MB)
+    python -m benchmarks.splitter_benchmark --file my_file.txt   # your own file
+    python -m benchmarks.splitter_benchmark --size-mb 64 --configs 100:20 1000:200
+"""
+
+import argparse
+import random
+import time
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from helpers.text_splitter import RecursiveTextSplitter
+
+PAGE_SIZE = 3000 # characters per page in the pipeline benchmark, about one PDF page
+
+
+def make_synthetic_text(size: int):
+    # words with a natural-language like frequency distribution, lines, paragraphs,
+    # and a few very long tokens (URLs, base64...) that force the splitters down to single characters
+    rng = random.Random(42)
+    vocabulary = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 10))) for _ in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    parts, total = [], 0
+    while total < size:
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(5, 20))
+        if rng.random() < 0.02:
+            words.append("".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789/+=", k=rng.randint(200, 2000))))
+
+        line = " ".join(words) + ".\n"
+        if rng.random() < 0.1:
+            line += "\n"
+        parts.append(line)
+        total += len(line)
+
+    return "".join(parts)[:size]
+
+
+def langchain_pipeline(pages: list, chunk_size: int, overlap_size: int):
+    # same as ProcessController.process_file_content + load_and_split_window
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap_size, length_function=len)
+    chunks = text_splitter.create_documents(
+        [page.page_content for page in pages],
+        metadatas=[page.metadata for page in pages]
+    )
+    return [(chunk.page_content, chunk.metadata) for chunk in chunks]
+
+
+def native_pipeline(pages: list, chunk_size: int, overlap_size: int):
+    # same as ProcessController.split_file_content
+    text_splitter = RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap_size)
+    chunks = []
+    for page in pages:
+        text = page.page_content
+        chunks.extend((text[start:end], page.metadata) for start, end in text_splitter.split_spans(text))
+    return chunks
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(text: str, chunk_size: int, overlap_size: int, repeat: int):
+    langchain_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap_size, length_function=len)
+    native_splitter = RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap_size)
+
+    pages = [
+        Document(page_content=text[i:i + PAGE_SIZE], metadata={"source": "benchmark", "page": i // PAGE_SIZE})
+        for i in range(0, len(text), PAGE_SIZE)
+    ]
+
+    # best of `repeat` runs
+    langchain_seconds = native_seconds = langchain_pipeline_seconds = native_pipeline_seconds = float("inf")
+    for _ in range(repeat):
+        langchain_chunks, seconds = timed(langchain_splitter.split_text, text)
+        langchain_seconds = min(langchain_seconds, seconds)
+
+        native_chunks, seconds = timed(native_splitter.split_text, text)
+        native_seconds = min(native_seconds, seconds)
+
+        langchain_page_chunks, seconds = timed(langchain_pipeline, pages, chunk_size, overlap_size)
+        langchain_pipeline_seconds = min(langchain_pipeline_seconds, seconds)
+
+        native_page_chunks, seconds = timed(native_pipeline, pages, chunk_size, overlap_size)
+        native_pipeline_seconds = min(native_pipeline_seconds, seconds)
+
+    assert native_chunks == langchain_chunks, "split_text: the native splitter does not give the langchain chunks"
+    assert native_page_chunks == langchain_page_chunks, "pipeline: the native splitter does not give the langchain chunks"
+
+    mb = len(text) / (1024 * 1024)
+    return {
+        "config": f"{chunk_size}:{overlap_size}",
+        "chunks": len(native_chunks),
+        "langchain_mb_s": mb / langchain_seconds,
+        "native_mb_s": mb / native_seconds,
+        "langchain_pipeline_mb_s": mb / langchain_pipeline_seconds,
+        "native_pipeline_mb_s": mb / native_pipeline_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="benchmark this file instead of synthetic text")
+    parser.add_argument("--size-mb", type=int, default=16, help="size of the synthetic text in MB")
+    parser.add_argument("--configs", nargs="+", default=["100:20", "500:50", "1000:200"],
+                        help="chunk_size:overlap_size pairs")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per config, the best one is reported")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = make_synthetic_text(size=args.size_mb * 1024 * 1024)
+
+    results = []
+    for config in args.configs:
+        chunk_size, overlap_size = (int(value) for value in config.split(":"))
+        results.append(run(text=text, chunk_size=chunk_size, overlap_size=overlap_size, repeat=args.repeat))
+
+    print(f"text: {len(text) / (1024 * 1024):.1f} MB, same chunks with both splitters")
+    print(f"{'config':<10}{'chunks':>10}{'langchain MB/s':>16}{'native MB/s':>13}{'speedup':>9}"
+          f"{'pipeline langchain':>20}{'pipeline native':>17}{'speedup':>9}")
+    for result in results:
+        print(f"{result['config']:<10}{result['chunks']:>10}"
+              f"{result['langchain_mb_s']:>16.1f}{result['native_mb_s']:>13.1f}"
+              f"{result['native_mb_s'] / result['langchain_mb_s']:>8.1f}x"
+              f"{result['langchain_pipeline_mb_s']:>20.1f}{result['native_pipeline_mb_s']:>17.1f}"
+              f"{result['native_pipeline_mb_s'] / result['langchain_pipeline_mb_s']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark of the token length mode (ProcessRequest.length_unit=tokens) against the character mode.
+
+It splits the same pages with:
+- characters: the native splitter, lengths in characters.
+- tokens: the native splitter, lengths in tokens measured on the offsets of one batched tokenizer call per window
+  (what load_and_split_window does).
+- tokens (langchain): langchain's splitter calling the tokenizer on every piece, for reference (--with-langchain).
+
+and reports the splitting throughput, the share of it spent tokenizing, and the chunk sizes in tokens.
+
+Run it from the src directory (the tokenizer is downloaded once, then read from the local Hugging Face cache):
+    python -m benchmarks.token_splitter_benchmark                           # gpt2 tokenizer, synthetic text (8 MB)
+    python -m benchmarks.token_splitter_benchmark --tokenizer ./my_tokenizer --file my_file.txt
+    python -m benchmarks.token_splitter_benchmark --char-config 1000:200 --token-config 256:50 --with-langchain
+"""
+
+import argparse
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.splitter_benchmark import make_synthetic_text, PAGE_SIZE
+from helpers.text_splitter import RecursiveTextSplitter
+from helpers.tokenizer import get_tokenizer, get_token_span_lengths
+
+WINDOW_PAGES = 20 # same as PROCESSING_WINDOW_PAGES
+
+
+def split_characters(pages: list, chunk_size: int, overlap_size: int):
+    text_splitter = RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap_size)
+    return [page[start:end] for page in pages for start, end in text_splitter.split_spans(page)], 0
+
+
+def split_tokens(pages: list, chunk_size: int, overlap_size: int, tokenizer_name: str):
+    text_splitter = RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap_size)
+    chunks, tokenize_seconds = [], 0
+
+    for i in range(0, len(pages), WINDOW_PAGES):
+        window = pages[i:i + WINDOW_PAGES]
+
+        start = time.perf_counter()
+        span_lengths = get_token_span_lengths(texts=window, tokenizer_name=tokenizer_name)
+        tokenize_seconds += time.perf_counter() - start
+
+        for page, span_length in zip(window, span_lengths):
+            chunks.extend(page[start:end] for start, end in text_splitter.split_spans(page, span_length=span_length))
+
+    return chunks, tokenize_seconds
+
+
+def split_tokens_langchain(pages: list, chunk_size: int, overlap_size: int, tokenizer_name: str):
+    text_splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+        get_tokenizer(tokenizer_name), chunk_size=chunk_size, chunk_overlap=overlap_size
+    )
+    return [chunk for page in pages for chunk in text_splitter.split_text(page)], None
+
+
+def run(name: str, func, pages: list, size: int, tokenizer, *args):
+    start = time.perf_counter()
+    chunks, tokenize_seconds = func(pages, *args)
+    seconds = time.perf_counter() - start
+
+    # chunk sizes in tokens, measured on the chunk text alone
+    chunk_tokens = [len(ids) for ids in tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+
+    return {
+        "name": name,
+        "chunks": len(chunks),
+        "mb_s": size / (1024 * 1024) / seconds,
+        "tokenize_share": f"{tokenize_seconds / seconds:.0%}" if tokenize_seconds is not None else "-",
+        "mean_tokens": sum(chunk_tokens) / max(len(chunk_tokens), 1),
+        "max_tokens": max(chunk_tokens, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokenizer", default="gpt2", help="hub model id or local directory (PROCESSING_TOKENIZER)")
+    parser.add_argument("--file", help="benchmark this file instead of synthetic text")
+    parser.add_argument("--size-mb", type=int, default=8, help="size of the synthetic text in MB")
+    parser.add_argument("--char-config", default="1000:200", help="chunk_size:overlap_size in characters")
+    parser.add_argument("--token-config", default="256:50", help="chunk_size:overlap_size in tokens")
+    parser.add_argument("--with-langchain", action="store_true", help="also run langchain's per-piece token length")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = make_synthetic_text(size=args.size_mb * 1024 * 1024)
+
+    pages = [text[i:i + PAGE_SIZE] for i in range(0, len(text), PAGE_SIZE)]
+    char_size, char_overlap = (int(value) for value in args.char_config.split(":"))
+    token_size, token_overlap = (int(value) for value in args.token_config.split(":"))
+
+    tokenizer = get_tokenizer(args.tokenizer) # loaded once, outside the timings
+
+    results = [
+        run(f"characters {args.char_config}", split_characters, pages, len(text), tokenizer, char_size, char_overlap),
+        run(f"tokens {args.token_config}", split_tokens, pages, len(text), tokenizer,
+            token_size, token_overlap, args.tokenizer),
+    ]
+    if args.with_langchain:
+        results.append(run(f"tokens {args.token_config} (langchain)", split_tokens_langchain, pages, len(text), tokenizer,
+                           token_size, token_overlap, args.tokenizer))
+
+    print(f"text: {len(text) / (1024 * 1024):.1f} MB, {len(pages)} pages, tokenizer: {args.tokenizer}")
+    print(f"{'mode':<30}{'chunks':>10}{'MB/s':>9}{'tokenizing':>12}{'mean tokens':>13}{'max tokens':>12}")
+    for result in results:
+        print(f"{result['name']:<30}{result['chunks']:>10}{result['mb_s']:>9.2f}{result['tokenize_share']:>12}"
+              f"{result['mean_tokens']:>13.1f}{result['max_tokens']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
 from helpers.config import Settings, get_settings
+from helpers.compression import COMPRESSION_EXTENSIONS
+from helpers.page_cache import PAGE_CACHE_VERSION
+from models.enums.StorageEnums import CompressionEnum
 import os, random, string
 
 class BaseController:
@@ -14,6 +17,18 @@ class BaseController:
             self.base_dir, 
             "assets/files"
             )
+
+        # Content-addressed blob store shared by all projects  |  Output: f:\LLM\LLMProjects\RAG-APP-1\src\assets\blobs
+        self.blobs_dir = os.path.join(
+            self.base_dir,
+            "assets/blobs"
+            )
+
+        # Partial (resumable) uploads that are not committed to the blob store yet
+        self.uploads_dir = os.path.join(
+            self.base_dir,
+            "assets/uploads"
+            )
         
     def generate_random_string(self, length: int=12):
         """
@@ -27,6 +42,62 @@ class BaseController:
         """
         return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
 
+    def get_blob_path(self, file_hash: str, create_dir: bool=False, compression: str=CompressionEnum.NONE.value):
+        """
+        This function returns the sharded path of a blob inside the blob store.
+        The first two pairs of hex characters of the hash are used as directory levels,
+        so no single directory grows without bound.
+
+        Args:
+            file_hash (str): The SHA-256 hex digest of the file content (before compression).
+            create_dir (bool, optional): Create the shard directory if it does not exist. Defaults to False.
+            compression (str, optional): How the blob is compressed on disk. Defaults to "none".
+
+        Returns:
+            str: The blob path. Example: assets/blobs/ab/cd/abcd1234... (or abcd1234....gz when compressed)
+        """
+        blob_dir = os.path.join(self.blobs_dir, file_hash[:2], file_hash[2:4])
+
+        if create_dir and not os.path.exists(blob_dir):
+            os.makedirs(blob_dir, exist_ok=True)
+
+        return os.path.join(blob_dir, file_hash + COMPRESSION_EXTENSIONS[compression])
+
+    def find_blob_path(self, file_hash: str):
+        """
+        This function looks for an existing blob, whatever the compression it was stored with.
+
+        Args:
+            file_hash (str): The SHA-256 hex digest of the file content.
+
+        Returns:
+            tuple: (blob_path, compression), or (None, None) if the blob does not exist.
+        """
+        for compression in COMPRESSION_EXTENSIONS:
+            blob_path = self.get_blob_path(file_hash=file_hash, compression=compression)
+            if os.path.exists(blob_path):
+                return blob_path, compression
+
+        return None, None
+
+
+    def get_page_cache_path(self, file_hash: str, pdf_extractor: str):
+        """
+        This function returns the path of the extracted pages sidecar of a blob (see helpers/page_cache.py).
+        It is stored next to the blob and keyed by the extractor and the page cache version,
+        so a change of either one never reads stale pages.
+
+        Args:
+            file_hash (str): The SHA-256 hex digest of the file content.
+            pdf_extractor (str): One of PdfExtractorEnum values.
+
+        Returns:
+            str: The sidecar path. Example: assets/blobs/ab/cd/abcd1234....native.v1.pages
+        """
+        blob_path = self.get_blob_path(file_hash=file_hash)
+
+        return f"{blob_path}.{pdf_extractor}.v{PAGE_CACHE_VERSION}.pages"
+
 
 
 
@@ -1,10 +1,32 @@
 from fastapi import UploadFile
 from .BaseController import BaseController
-from .ProjectController import ProjectController
 from models import ResponseSignal
+from models.enums.StorageEnums import CompressionEnum
+from models.enums.ProcessingEnums import ProcessingEnum
+from helpers.compression import get_compressor
+from typing import AsyncIterator
+import aiofiles
+import asyncio
+import codecs
+import hashlib
 import os
 import re
 
+# the type detected by sniff_content_type for every extension the processing supports (see ProcessingEnum):
+# the processing picks the loader from the extension, a file whose content does not match it can not be processed
+EXTENSION_CONTENT_TYPES = {
+    ProcessingEnum.TXT.value: "text/plain",
+    ProcessingEnum.PDF.value: "application/pdf",
+}
+
+
+class UploadRejected(Exception):
+    # raised inside write_blob_stream to abort an upload that breaks the size or type rules
+    def __init__(self, signal: str):
+        super().__init__(signal)
+        self.signal = signal
+
+
 class DataController(BaseController):
     def __init__(self):
         
@@ -16,6 +38,14 @@ class DataController(BaseController):
         file.size returns the size of the file in bytes, 
         so we need to convert the FILE_MAX_SIZE from MB to bytes by multiplying it by self.size_scale which is 1024 * 1024 = 1048576 
         """
+
+        # number of leading bytes used to detect the file type of streamed uploads (see sniff_content_type)
+        self.sniff_size = 2048
+
+    def get_max_file_size(self):
+        # FILE_MAX_SIZE is in MB, return it in bytes
+        return self.app_settings.FILE_MAX_SIZE * self.size_scale
+
     def validate_uploaded_file(self, file: UploadFile):
         
         r"""
@@ -28,16 +58,36 @@ class DataController(BaseController):
             The result of the operation.
         """
         
+        return self.validate_file_properties(
+            content_type=file.content_type,
+            file_size=file.size
+        )
+
+
+    def validate_file_properties(self, content_type: str, file_size: int):
+
+        r"""
+        This function validates the type and the size of a file, whatever the way it is uploaded
+
+        Args:
+            content_type: The MIME type of the file.
+            file_size: The size of the file in bytes.
+
+        Returns:
+            The result of the operation.
+        """
+        
         # check if the file type is not in the list of allowed file types (existing in the .env file)
-        if file.content_type not in self.app_settings.FILE_ALLOWED_TYPES:
+        if content_type not in self.app_settings.FILE_ALLOWED_TYPES:
             return False, ResponseSignal.FILE_TYPE_NOT_SUPPORTED.value
         
         # check if the file size is greater than the maximum allowed size
-        if file.size > self.app_settings.FILE_MAX_SIZE * self.size_scale:
+        # (the size may be unknown for streamed bodies, it is then enforced while the bytes are written, see write_blob_stream)
+        if file_size is not None and file_size > self.get_max_file_size():
             return False, ResponseSignal.FILE_SIZE_EXCEEDED.value
         
         r"""
-        file.size returns the size of the file in bytes, 
+        file_size is in bytes, 
         so we need to convert the FILE_MAX_SIZE from MB to bytes by multiplying it by self.size_scale which is 1024 * 1024 = 1048576 
         """
         
@@ -45,47 +95,365 @@ class DataController(BaseController):
         return True, ResponseSignal.FILE_VALIDATED_SUCCESS.value
 
     
-    def generate_unique_filepath(self, orig_file_name: str, project_id: str):
-        
+    def get_expected_content_type(self, file_name: str):
+
         r"""
-        This function generates a unique file name for the uploaded file after removing special characters and replacing spaces with underscores.
+        This function returns the file type expected for the extension of a file name.
+
+        Args:
+            file_name: The original file name.
+
+        Returns:
+            The MIME type, or None if the extension can not be processed or its type is not allowed.
+        """
+
+        content_type = EXTENSION_CONTENT_TYPES.get(os.path.splitext(file_name or "")[-1])
+
+        if content_type not in self.app_settings.FILE_ALLOWED_TYPES:
+            return None
+
+        return content_type
+
+
+    def generate_file_id(self, orig_file_name: str):
+
+        r"""
+        This function generates a unique file id (asset name) for the uploaded file after removing special characters and replacing spaces with underscores.
+        The file id is only a logical name, the file content itself is stored once in the blob store (see write_blob_stream).
 
         Args:
             orig_file_name: The original file name.
-            project_id: The project id.
 
         Returns:
-            A unique file path
+            A unique file id. Example output: mw1178534nx8_Projectname.txt
         """
-        
-        # Generate a random string of 12 characters | Output: 12 random characters
-        random_key = self.generate_random_string()
-        
-        # Get the project directory or create it if it does not exist
-        # Example output: f:\LLM\LLMProjects\RAG-APP-1\src\assets\files\1
-        project_path = ProjectController().get_project_path(project_id=project_id)
 
         # Remove special characters and replace spaces with underscores
         cleaned_file_name = self.get_clean_file_name(
             orig_file_name=orig_file_name
         )
 
-        # Generate a new file path by joining the project directory with the random string and the cleaned file name
-        # Example output: f:\LLM\LLMProjects\RAG-APP-1\src\assets\files\1\mw1178534nx8_Projectname.txt
-        new_file_path = os.path.join(
-            project_path,
-            random_key + "_" + cleaned_file_name
+        return self.generate_random_string() + "_" + cleaned_file_name
+
+
+    def is_valid_file_hash(self, file_hash: str):
+        r"""
+        This function checks that the given hash is a lowercase SHA-256 hex digest.
+
+        Args:
+            file_hash: The hash sent by the client.
+
+        Returns:
+            True if the hash is valid, False otherwise.
+        """
+        return re.fullmatch(r"[0-9a-f]{64}", file_hash or "") is not None
+
+
+    async def iter_upload_file(self, file: UploadFile):
+        r"""
+        This function reads the uploaded file in chunks of FILE_DEFAULT_CHUNK_SIZE bytes.
+
+        Args:
+            file: The uploaded file.
+
+        Yields:
+            The file content chunk by chunk.
+        """
+        while chunk := await file.read(self.app_settings.FILE_DEFAULT_CHUNK_SIZE):
+            yield chunk
+
+
+    def sniff_content_type(self, head: bytes):
+
+        r"""
+        This function detects the file type from its first bytes (magic bytes) instead of trusting the client.
+
+        Args:
+            head: The first bytes of the file.
+
+        Returns:
+            The detected MIME type. Example: application/pdf
+        """
+
+        if head.startswith(b"%PDF-"):
+            return "application/pdf"
+
+        if b"\x00" in head:
+            return "application/octet-stream"
+
+        try:
+            # final=False: a multi-byte character may be cut at the end of the head
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        except UnicodeDecodeError:
+            return "application/octet-stream"
+
+        return "text/plain"
+
+
+    async def write_blob_stream(self, chunks: AsyncIterator[bytes], max_size: int=None, allowed_types: list=None,
+                                expected_type: str=None):
+
+        r"""
+        This function writes a stream of bytes into the content-addressed blob store.
+        The SHA-256 hash is computed incrementally while the chunks are written to a temporary file,
+        then the temporary file is moved to its sharded blob path. If a blob with the same hash already exists,
+        the temporary file is dropped and the existing blob is reused (deduplication).
+
+        The size limit and the allowed types are enforced while the bytes arrive, so an invalid upload
+        is aborted as soon as it is detected instead of after the whole body has been received.
+
+        Args:
+            chunks: An async iterator of bytes (Example: iter_upload_file(file) or request.stream()).
+            max_size: The maximum size in bytes. Defaults to None (no limit).
+            allowed_types: The allowed MIME types, detected from the magic bytes. Defaults to None (no check).
+            expected_type: The MIME type the file must have (see get_expected_content_type). Defaults to None (no check).
+
+        Returns:
+            (is_valid, result_signal, blob) where blob is a dict with file_hash, file_path, file_size and content_type.
+        """
+
+        temp_dir = os.path.join(self.blobs_dir, "tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        temp_path = os.path.join(temp_dir, self.generate_random_string(length=24))
+
+        file_hash = hashlib.sha256()
+        file_size = 0
+        head = b""
+        content_type = None
+        compression = CompressionEnum.NONE.value
+        compressor = None
+
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for chunk in chunks:
+
+                    file_size += len(chunk)
+                    if max_size is not None and file_size > max_size:
+                        raise UploadRejected(ResponseSignal.FILE_SIZE_EXCEEDED.value)
+
+                    # wait for enough bytes to detect the file type, then check it once
+                    if content_type is None:
+                        head += chunk
+                        if len(head) < self.sniff_size:
+                            continue
+
+                        content_type = self.sniff_content_type(head=head)
+                        self.check_content_type(content_type=content_type, allowed_types=allowed_types,
+                                                expected_type=expected_type)
+
+                        compression, compressor = self.get_storage_compressor(content_type=content_type)
+                        chunk, head = head, b""
+
+                    file_hash.update(chunk) # the hash is always computed on the original content
+                    await f.write(await self.compress_chunk(compressor=compressor, chunk=chunk))
+
+                # nothing to process
+                if file_size == 0:
+                    raise UploadRejected(ResponseSignal.FILE_EMPTY.value)
+
+                # the whole file is smaller than the sniffing window
+                if content_type is None:
+                    content_type = self.sniff_content_type(head=head)
+                    self.check_content_type(content_type=content_type, allowed_types=allowed_types,
+                                            expected_type=expected_type)
+
+                    compression, compressor = self.get_storage_compressor(content_type=content_type)
+                    file_hash.update(head)
+                    await f.write(await self.compress_chunk(compressor=compressor, chunk=head))
+
+                if compressor is not None:
+                    await f.write(compressor.flush())
+
+            file_hash = file_hash.hexdigest()
+            blob_path = self.commit_blob(file_path=temp_path, file_hash=file_hash, compression=compression)
+
+        except UploadRejected as e:
+            os.remove(temp_path)
+            return False, e.signal, None
+
+        except BaseException:
+            # Never leave half written files behind (commit_blob moved or removed it when it succeeded)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return True, ResponseSignal.FILE_UPLOAD_SUCCESS.value, {
+            "file_hash": file_hash,
+            "file_path": blob_path,
+            "file_size": file_size,
+            "stored_size": os.path.getsize(blob_path),
+            "content_type": content_type,
+        }
+
+
+    def check_content_type(self, content_type: str, allowed_types: list=None, expected_type: str=None):
+
+        # raises UploadRejected, see write_blob_stream
+        if allowed_types is not None and content_type not in allowed_types:
+            raise UploadRejected(ResponseSignal.FILE_TYPE_NOT_SUPPORTED.value)
+
+        if expected_type is not None and content_type != expected_type:
+            raise UploadRejected(ResponseSignal.FILE_TYPE_MISMATCH.value)
+
+
+    def get_storage_compressor(self, content_type: str):
+
+        r"""
+        This function chooses how a file is stored on disk (FILE_STORAGE_COMPRESSION), based on its type.
+
+        Args:
+            content_type: The detected MIME type of the file.
+
+        Returns:
+            (compression, compressor), compressor is None when the file is stored as it is.
+        """
+
+        compression = self.app_settings.FILE_STORAGE_COMPRESSION
+        if compression == CompressionEnum.NONE.value or content_type not in self.app_settings.FILE_COMPRESSIBLE_TYPES:
+            return CompressionEnum.NONE.value, None
+
+        return compression, get_compressor(
+            compression=compression,
+            level=self.app_settings.FILE_STORAGE_COMPRESSION_LEVEL
         )
 
-        # Check if the new file path already exists, if it does, generate a new random string and try again.
-        while os.path.exists(new_file_path):
-            random_key = self.generate_random_string()
-            new_file_path = os.path.join(
-                project_path,
-                random_key + "_" + cleaned_file_name
-            )
 
-        return new_file_path, random_key + "_" + cleaned_file_name
+    async def compress_chunk(self, compressor, chunk: bytes):
+
+        # compression is CPU bound (zlib and zstd release the GIL), keep it off the event loop
+        if compressor is None:
+            return chunk
+
+        return await asyncio.to_thread(compressor.compress, chunk)
+
+
+    def commit_blob(self, file_path: str, file_hash: str, compression: str=CompressionEnum.NONE.value):
+
+        r"""
+        This function moves a fully written file to its blob path, or drops it if the blob already exists
+        (whatever the compression the existing blob was stored with).
+
+        Args:
+            file_path: The path of the written file (must be on the same filesystem as the blob store).
+            file_hash: The SHA-256 hex digest of the file content (before compression).
+            compression: How the written file is compressed. Defaults to "none".
+
+        Returns:
+            The blob path.
+        """
+
+        existing_blob_path, _ = self.find_blob_path(file_hash=file_hash)
+        if existing_blob_path is not None:
+            os.remove(file_path)
+            return existing_blob_path
+
+        blob_path = self.get_blob_path(file_hash=file_hash, create_dir=True, compression=compression)
+        os.replace(file_path, blob_path) # atomic on the same filesystem
+
+        return blob_path
+
+
+    async def iter_file(self, file_path: str):
+
+        r"""
+        This function reads a file on disk in chunks of FILE_DEFAULT_CHUNK_SIZE bytes.
+
+        Args:
+            file_path: The path of the file (Example: the partial file of an upload session).
+
+        Yields:
+            The file content chunk by chunk.
+        """
+
+        async with aiofiles.open(file_path, "rb") as f:
+            while chunk := await f.read(self.app_settings.FILE_DEFAULT_CHUNK_SIZE):
+                yield chunk
+
+
+    def get_upload_part_path(self, upload_id: str):
+
+        r"""
+        This function returns the path of the partial file of a resumable upload session.
+
+        Args:
+            upload_id: The upload session id (the id of its asset record).
+
+        Returns:
+            The partial file path. Example: assets/uploads/6790a1...part
+        """
+
+        os.makedirs(self.uploads_dir, exist_ok=True)
+
+        return os.path.join(self.uploads_dir, upload_id + ".part")
+
+
+    def delete_upload_part(self, upload_id: str):
+
+        r"""
+        This function deletes the partial file of an upload session (Example: the session expired).
+        """
+
+        part_path = self.get_upload_part_path(upload_id=upload_id)
+
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+    def get_upload_offset(self, upload_id: str):
+
+        r"""
+        This function returns the committed offset of a resumable upload, i.e. the number of bytes already on disk.
+
+        Args:
+            upload_id: The upload session id.
+
+        Returns:
+            The committed offset in bytes.
+        """
+
+        part_path = self.get_upload_part_path(upload_id=upload_id)
+
+        if not os.path.exists(part_path):
+            return 0
+
+        return os.path.getsize(part_path)
+
+
+    async def write_upload_range(self, upload_id: str, offset: int, total_size: int, chunks: AsyncIterator[bytes]):
+
+        r"""
+        This function appends a byte range to a resumable upload.
+        The range must start at the committed offset, and the upload can not grow beyond its declared size.
+        Every chunk is flushed as it arrives, so a dropped connection keeps all the bytes received so far.
+
+        Args:
+            upload_id: The upload session id.
+            offset: The offset of the first byte of the range (sent by the client).
+            total_size: The declared size of the whole file.
+            chunks: An async iterator of bytes (Example: request.stream()).
+
+        Returns:
+            (is_valid, result_signal, committed_offset)
+        """
+
+        part_path = self.get_upload_part_path(upload_id=upload_id)
+        committed_offset = self.get_upload_offset(upload_id=upload_id)
+
+        if offset != committed_offset:
+            return False, ResponseSignal.UPLOAD_OFFSET_MISMATCH.value, committed_offset
+
+        async with aiofiles.open(part_path, "ab") as f:
+            async for chunk in chunks:
+
+                if committed_offset + len(chunk) > total_size:
+                    await f.truncate(offset) # drop the whole invalid range
+                    return False, ResponseSignal.FILE_SIZE_EXCEEDED.value, offset
+
+                await f.write(chunk)
+                await f.flush()
+                committed_offset += len(chunk)
+
+        return True, ResponseSignal.UPLOAD_RANGE_SUCCESS.value, committed_offset
     
     
     # Remove special characters and replace spaces with underscores
@@ -116,4 +484,4 @@ class DataController(BaseController):
         # Example input: " example file name.txt "   |   Output: "example_file_name.txt"
         cleaned_file_name = cleaned_file_name.replace(" ", "_")
 
-        return cleaned_file_name
\ No newline at end of file
+        return cleaned_file_name
@@ -1,10 +1,44 @@
 from .BaseController import BaseController
 from .ProjectController import ProjectController
 import os
+import mmap
+import shutil
 from langchain_community.document_loaders import TextLoader
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter # used to split the text into chunks
+from langchain_community.document_loaders.base import BaseLoader
+from langchain_community.document_loaders.blob_loaders import Blob
+from langchain_community.document_loaders.parsers import PyMuPDFParser
+from langchain_core.documents import Document
 from models import ProcessingEnum
+from models.enums.ProcessingEnums import SplitterEnum, PdfExtractorEnum, LengthUnitEnum
+from models.enums.StorageEnums import CompressionEnum
+from helpers.compression import open_decompressed
+from helpers.text_splitter import RecursiveTextSplitter
+from helpers.tokenizer import get_token_span_lengths
+from helpers.page_cache import read_page_count, read_pages, write_pages, merge_page_files
+import fitz
+
+
+class CompressedBlobLoader(BaseLoader):
+    # Same output as TextLoader / PyMuPDFLoader, for blobs stored compressed (FILE_STORAGE_COMPRESSION)
+
+    def __init__(self, file_path: str, compression: str, file_extension: str):
+        self.file_path = file_path
+        self.compression = compression
+        self.file_extension = file_extension
+
+    def lazy_load(self):
+
+        with open_decompressed(file_path=self.file_path, compression=self.compression) as f:
+            content = f.read()
+
+        if self.file_extension == ProcessingEnum.TXT.value:
+            yield Document(page_content=content.decode("utf-8"), metadata={"source": self.file_path})
+            return
+
+        yield from PyMuPDFParser().lazy_parse(Blob.from_data(content, path=self.file_path))
+
 
 class ProcessController(BaseController):
     
@@ -23,29 +57,54 @@ class ProcessController(BaseController):
     
     
     
-    def get_file_loader(self, file_id: str):
-        
-        file_extension = self.get_file_extension(file_id=file_id)
+    def get_file_path(self, file_id: str, file_hash: str=None):
+
+        # Deduplicated assets live in the blob store (maybe compressed), older assets in the project directory
+        if file_hash:
+            return self.find_blob_path(file_hash=file_hash)
+
         file_path = os.path.join(
             self.project_path, 
             file_id
             )
-        
+
         if not os.path.exists(file_path):
+            return None, None
+
+        return file_path, CompressionEnum.NONE.value
+
+
+    def get_file_loader(self, file_id: str, file_hash: str=None):
+        
+        file_extension = self.get_file_extension(file_id=file_id)
+        file_path, compression = self.get_file_path(file_id=file_id, file_hash=file_hash)
+        
+        if file_path is None:
+            return None
+
+        if file_extension not in [ProcessingEnum.TXT.value, ProcessingEnum.PDF.value]:
             return None
+
+        # compressed blobs are decompressed on the fly
+        if compression != CompressionEnum.NONE.value:
+            return CompressedBlobLoader(
+                file_path=file_path,
+                compression=compression,
+                file_extension=file_extension
+            )
         
         if file_extension == ProcessingEnum.TXT.value:
             return TextLoader(file_path=file_path, encoding="utf-8")
         
         if file_extension == ProcessingEnum.PDF.value:
-            return PyMuPDFLoader(file_path=file_path, encoding="utf-8")
+            return PyMuPDFLoader(file_path=file_path)
         
         return None
         
         
-    def get_file_content(self, file_id: str):
+    def get_file_content(self, file_id: str, file_hash: str=None):
 
-        loader = self.get_file_loader(file_id=file_id)
+        loader = self.get_file_loader(file_id=file_id, file_hash=file_hash)
         
         if loader:
             return loader.load() # get the file content as a list of content and metadata
@@ -55,6 +114,332 @@ class ProcessController(BaseController):
     
 
 
+    def get_file_windows(self, file_id: str, file_hash: str=None, pdf_extractor: str=PdfExtractorEnum.LANGCHAIN.value,
+                         window_pages: int=None, window_bytes: int=None):
+
+        r"""
+        This function cuts a file into windows, so a large file is never loaded and split all at once:
+        - PDF: ranges of `window_pages` pages, Example: [(0, 20), (20, 40), (40, 45)]
+        - TXT larger than `window_bytes`: byte ranges (see get_text_windows)
+        - Others: a single window (None) holding the whole file.
+
+        The window sizes default to PROCESSING_WINDOW_PAGES / PROCESSING_WINDOW_BYTES.
+
+        Returns:
+            The list of windows, or None if the file can not be loaded.
+        """
+
+        file_extension = self.get_file_extension(file_id=file_id)
+        file_path, compression = self.get_file_path(file_id=file_id, file_hash=file_hash)
+
+        if file_path is None or file_extension not in [ProcessingEnum.TXT.value, ProcessingEnum.PDF.value]:
+            return None
+
+        if file_extension == ProcessingEnum.PDF.value:
+
+            # already extracted pages are windowed too, even for a compressed blob
+            page_cache_path = self.get_existing_page_cache_path(file_hash=file_hash, pdf_extractor=pdf_extractor)
+            if page_cache_path:
+                return self.get_page_windows(page_count=read_page_count(page_cache_path), window_pages=window_pages)
+
+            if compression == CompressionEnum.NONE.value:
+                with fitz.open(file_path) as doc:
+                    return self.get_page_windows(page_count=doc.page_count, window_pages=window_pages)
+
+        if file_extension == ProcessingEnum.TXT.value and compression == CompressionEnum.NONE.value:
+            return self.get_text_windows(file_path=file_path, window_bytes=window_bytes)
+
+        return [None]
+
+
+    def get_text_windows(self, file_path: str, window_bytes: int=None):
+
+        r"""
+        This function cuts a text file into byte ranges of about `window_bytes` (default: PROCESSING_WINDOW_BYTES),
+        without reading it:
+        the file is memory-mapped and every cut is moved back to the closest paragraph ("\n\n"), line ("\n")
+        or at least character boundary, so every window decodes on its own and a paragraph is rarely cut.
+
+        Returns:
+            list: Example: [(0, 4194000), (4194000, 8388300), (8388300, 9000000)],
+                  or [None] when the file fits in a single window (loaded by TextLoader).
+        """
+
+        file_size = os.path.getsize(file_path)
+        window_bytes = window_bytes or self.app_settings.PROCESSING_WINDOW_BYTES
+
+        if file_size <= window_bytes:
+            return [None]
+
+        windows = []
+
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+            start = 0
+            while start < file_size:
+
+                end = start + window_bytes
+                if end >= file_size:
+                    windows.append((start, file_size))
+                    break
+
+                # the separator starts the next window, like the splitter keeps it at the start of a piece
+                for separator in [b"\n\n", b"\n"]:
+                    cut = mm.rfind(separator, start + 1, end)
+                    if cut != -1:
+                        end = cut
+                        break
+                else:
+                    # no line break: do not cut a multi-byte UTF-8 character (continuation bytes are 10xxxxxx)
+                    while end > start + 1 and mm[end] & 0xC0 == 0x80:
+                        end -= 1
+
+                windows.append((start, end))
+                start = end
+
+        return windows
+
+
+    def get_text_window(self, file_path: str, window: tuple):
+
+        # only this window of the file is read and decoded, the memory used does not depend on the file size
+        start, end = window
+
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode("utf-8")
+
+        # same metadata as TextLoader
+        return [Document(page_content=text, metadata={"source": file_path})]
+
+
+    def get_page_windows(self, page_count: int, window_pages: int=None):
+
+        window_pages = window_pages or self.app_settings.PROCESSING_WINDOW_PAGES
+        return [
+            (start_page, min(start_page + window_pages, page_count))
+            for start_page in range(0, page_count, window_pages)
+        ]
+
+
+    def get_existing_page_cache_path(self, file_hash: str, pdf_extractor: str):
+
+        # only the blobs have a page cache: it is keyed by the content hash
+        if not file_hash:
+            return None
+
+        page_cache_path = self.get_page_cache_path(file_hash=file_hash, pdf_extractor=pdf_extractor)
+        if not os.path.exists(page_cache_path):
+            return None
+
+        return page_cache_path
+
+
+    def get_window_content(self, file_id: str, file_hash: str=None, window: tuple=None,
+                           pdf_extractor: str=PdfExtractorEnum.LANGCHAIN.value, cache_token: str=None):
+
+        r"""
+        This function loads one window of a file (see get_file_windows) as a list of Documents.
+
+        The pages of a PDF blob are read from its page cache (see helpers/page_cache.py) when it exists,
+        so changing chunk_size / overlap_size only splits the pages again.
+        Otherwise they are extracted, and written to a part of the page cache when a cache_token is given
+        (see commit_page_cache).
+
+        Args:
+            file_id (str): The file id (asset name).
+            file_hash (str, optional): The blob hash of the file. Defaults to None (file stored in the project directory).
+            window (tuple, optional): The window to load, as returned by get_file_windows. Defaults to None (the whole file).
+            pdf_extractor (str, optional): The PDF text extraction (PdfExtractorEnum). Defaults to langchain.
+            cache_token (str, optional): Identifies the run writing the page cache parts. Defaults to None (no cache write).
+
+        Returns:
+            list: The Documents, or None if the file can not be loaded.
+        """
+
+        if self.get_file_extension(file_id=file_id) != ProcessingEnum.PDF.value:
+            return self.extract_window_content(file_id=file_id, file_hash=file_hash, window=window,
+                                               pdf_extractor=pdf_extractor)
+
+        start_page, end_page = window if window is not None else (0, None)
+
+        page_cache_path = self.get_existing_page_cache_path(file_hash=file_hash, pdf_extractor=pdf_extractor)
+        if page_cache_path:
+            return [
+                Document(page_content=page_text, metadata=page_metadata)
+                for page_text, page_metadata in read_pages(page_cache_path, start_page=start_page, end_page=end_page)
+            ]
+
+        pages = self.extract_window_content(file_id=file_id, file_hash=file_hash, window=window,
+                                            pdf_extractor=pdf_extractor)
+
+        if pages is not None and file_hash and cache_token:
+            parts_dir = self.get_page_cache_parts_dir(
+                file_hash=file_hash,
+                pdf_extractor=pdf_extractor,
+                cache_token=cache_token
+            )
+            os.makedirs(parts_dir, exist_ok=True)
+
+            write_pages(
+                os.path.join(parts_dir, f"{start_page:08d}.pages"),
+                [(page.page_content, page.metadata) for page in pages]
+            )
+
+        return pages
+
+
+    def get_page_cache_parts_dir(self, file_hash: str, pdf_extractor: str, cache_token: str):
+
+        # every run writes its own parts: two jobs extracting the same blob never mix their files
+        return f"{self.get_page_cache_path(file_hash=file_hash, pdf_extractor=pdf_extractor)}.{cache_token}.parts"
+
+
+    def commit_page_cache(self, file_hash: str, pdf_extractor: str, cache_token: str, commit: bool=True):
+
+        r"""
+        This function merges the page cache parts written by a run (one per window) into the page cache of the blob,
+        then deletes them.
+
+        Args:
+            file_hash (str): The blob hash of the file.
+            pdf_extractor (str): The PDF text extraction (PdfExtractorEnum).
+            cache_token (str): The token given to get_window_content.
+            commit (bool, optional): False only deletes the parts (Example: the run failed, some windows are missing).
+
+        Returns:
+            bool: True if the page cache was written.
+        """
+
+        if not file_hash:
+            return False
+
+        parts_dir = self.get_page_cache_parts_dir(file_hash=file_hash, pdf_extractor=pdf_extractor, cache_token=cache_token)
+        if not os.path.isdir(parts_dir):
+            return False
+
+        try:
+            if commit:
+                merge_page_files(
+                    part_paths=[
+                        os.path.join(parts_dir, part_name)
+                        for part_name in sorted(os.listdir(parts_dir))
+                    ],
+                    file_path=self.get_page_cache_path(file_hash=file_hash, pdf_extractor=pdf_extractor)
+                )
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+        return commit
+
+
+    def extract_window_content(self, file_id: str, file_hash: str=None, window: tuple=None,
+                               pdf_extractor: str=PdfExtractorEnum.LANGCHAIN.value):
+
+        # PDF pages are extracted according to pdf_extractor (PdfExtractorEnum):
+        # - langchain: the same content and metadata as PyMuPDFLoader.
+        # - native / native_blocks: PyMuPDF directly (see extract_pdf_pages), the page number is the only metadata.
+        file_extension = self.get_file_extension(file_id=file_id)
+
+        if window is not None and file_extension == ProcessingEnum.TXT.value:
+            file_path, _ = self.get_file_path(file_id=file_id, file_hash=file_hash)
+            return self.get_text_window(file_path=file_path, window=window) if file_path else None
+
+        if file_extension != ProcessingEnum.PDF.value or pdf_extractor == PdfExtractorEnum.LANGCHAIN.value:
+            if window is None:
+                return self.get_file_content(file_id=file_id, file_hash=file_hash)
+            return self.get_langchain_pdf_pages(file_id=file_id, file_hash=file_hash, window=window)
+
+        file_path, compression = self.get_file_path(file_id=file_id, file_hash=file_hash)
+
+        if file_path is None:
+            return None
+
+        blocks = pdf_extractor == PdfExtractorEnum.NATIVE_BLOCKS.value
+
+        # compressed blobs are only windowed once their pages are cached (see get_file_windows):
+        # the whole file is decompressed in memory
+        if compression != CompressionEnum.NONE.value:
+            with open_decompressed(file_path=file_path, compression=compression) as f:
+                content = f.read()
+
+            with fitz.open(stream=content, filetype="pdf") as doc:
+                return self.extract_pdf_pages(doc=doc, start_page=0, end_page=doc.page_count, blocks=blocks)
+
+        with fitz.open(file_path) as doc:
+            start_page, end_page = window if window is not None else (0, doc.page_count)
+            return self.extract_pdf_pages(doc=doc, start_page=start_page, end_page=end_page, blocks=blocks)
+
+
+    def get_langchain_pdf_pages(self, file_id: str, file_hash: str=None, window: tuple=None):
+
+        # a page range read with the same content and metadata as PyMuPDFLoader
+        file_path, _ = self.get_file_path(file_id=file_id, file_hash=file_hash)
+
+        if file_path is None:
+            return None
+
+        start_page, end_page = window
+        pages = []
+
+        with fitz.open(file_path) as doc:
+
+            doc_metadata = {
+                key: value
+                for key, value in doc.metadata.items()
+                if isinstance(value, (str, int))
+            }
+
+            for page_number in range(start_page, end_page):
+                pages.append(Document(
+                    page_content=doc[page_number].get_text(),
+                    metadata={
+                        "source": file_path,
+                        "file_path": file_path,
+                        "page": page_number,
+                        "total_pages": doc.page_count,
+                        **doc_metadata,
+                    }
+                ))
+
+        return pages
+
+
+    def extract_pdf_pages(self, doc, start_page: int, end_page: int, blocks: bool=False):
+
+        r"""
+        This function extracts the text of a page range of an opened PDF, page by page.
+
+        Args:
+            doc (fitz.Document): The opened PDF.
+            start_page (int): The first page (included).
+            end_page (int): The last page (excluded).
+            blocks (bool): Extract the text blocks in reading order, separated by a blank line,
+                           so the splitter keeps paragraphs together. Defaults to False (plain page text).
+
+        Returns:
+            list: One Document per page, with the page number as the only metadata.
+        """
+
+        pages = []
+
+        for page_number in range(start_page, end_page):
+            page = doc[page_number]
+
+            if blocks:
+                # block: (x0, y0, x1, y1, text, block_no, block_type), block_type 0 = text, 1 = image
+                page_text = "\n\n".join(
+                    block[4].strip()
+                    for block in page.get_text("blocks", sort=True)
+                    if block[6] == 0 and block[4].strip()
+                )
+            else:
+                page_text = page.get_text()
+
+            pages.append(Document(page_content=page_text, metadata={"page": page_number}))
+
+        return pages
+
+
     def process_file_content(self, file_content: list, file_id: str,
                             chunk_size: int=100, overlap_size: int=20):
 
@@ -79,4 +464,177 @@ class ProcessController(BaseController):
             metadatas=file_content_metadata
         )
 
-        return chunks
\ No newline at end of file
+        return chunks
+
+
+    def split_file_content(self, file_content: list, chunk_size: int=100, overlap_size: int=20,
+                           span_lengths: list=None):
+
+        r"""
+        This function gives the same chunks as process_file_content, with the native splitter (see helpers/text_splitter).
+
+        Args:
+            file_content (list): The Documents (pages) to split.
+            chunk_size (int, optional): The chunk size. Defaults to 100.
+            overlap_size (int, optional): The overlap between two chunks. Defaults to 20.
+            span_lengths (list, optional): One span_length function per Document, Example: get_token_span_lengths.
+                                           Defaults to None (lengths in characters).
+
+        Returns:
+            A list of (chunk_text, chunk_metadata) tuples, the chunks of a page share the page metadata.
+        """
+
+        text_splitter = RecursiveTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=overlap_size,
+        )
+
+        if span_lengths is None:
+            span_lengths = [None] * len(file_content)
+
+        chunks = []
+        for rec, span_length in zip(file_content, span_lengths):
+            text = rec.page_content
+            chunks.extend(
+                (text[start:end], rec.metadata)
+                for start, end in text_splitter.split_spans(text, span_length=span_length)
+            )
+
+        return chunks
+
+
+    def get_token_span_lengths(self, file_content: list, tokenizer_name: str=None):
+
+        # the pages are tokenized once, in one batch, whatever the number of chunking profiles
+        return get_token_span_lengths(
+            texts=[rec.page_content for rec in file_content],
+            tokenizer_name=tokenizer_name or self.app_settings.PROCESSING_TOKENIZER
+        )
+
+
+    def split_window_content(self, file_content: list, file_id: str, chunk_size: int=100, overlap_size: int=20,
+                             splitter: str=SplitterEnum.LANGCHAIN.value, span_lengths: list=None):
+
+        # (chunk_text, chunk_metadata) tuples with the chosen splitter, both give the same chunks.
+        # Lengths in tokens (span_lengths) are measured on offsets, only the native splitter supports them.
+        if splitter == SplitterEnum.NATIVE.value or span_lengths is not None:
+            return self.split_file_content(
+                file_content=file_content,
+                chunk_size=chunk_size,
+                overlap_size=overlap_size,
+                span_lengths=span_lengths
+            )
+
+        file_chunks = self.process_file_content(
+            file_content=file_content,
+            file_id=file_id,
+            chunk_size=chunk_size,
+            overlap_size=overlap_size
+        )
+
+        return [
+            (chunk.page_content, chunk.metadata)
+            for chunk in file_chunks
+        ]
+
+
+def get_file_windows(project_id: str, file_id: str, file_hash: str=None,
+                     pdf_extractor: str=PdfExtractorEnum.LANGCHAIN.value, window_pages: int=None,
+                     window_bytes: int=None):
+
+    r"""
+    This function cuts a file into windows that can be loaded and split one after the other (see ProcessController.get_file_windows).
+    It is meant to run in a worker process (see ProcessingWorkerPool): the worker processes read their own settings
+    when they start, the caller passes the window sizes it records.
+    """
+
+    return ProcessController(project_id=project_id).get_file_windows(
+        file_id=file_id,
+        file_hash=file_hash,
+        pdf_extractor=pdf_extractor,
+        window_pages=window_pages,
+        window_bytes=window_bytes
+    )
+
+
+def commit_page_cache(project_id: str, file_hash: str, pdf_extractor: str, cache_token: str, commit: bool=True):
+
+    r"""
+    This function merges the page cache parts written while processing a file (see ProcessController.commit_page_cache).
+    It is meant to run in a worker process (see ProcessingWorkerPool).
+    """
+
+    return ProcessController(project_id=project_id).commit_page_cache(
+        file_hash=file_hash,
+        pdf_extractor=pdf_extractor,
+        cache_token=cache_token,
+        commit=commit
+    )
+
+
+def load_and_split_window(project_id: str, file_id: str, file_hash: str=None, window: tuple=None,
+                          chunk_size: int=100, overlap_size: int=20, splitter: str=SplitterEnum.LANGCHAIN.value,
+                          pdf_extractor: str=PdfExtractorEnum.LANGCHAIN.value, cache_token: str=None,
+                          chunking_profiles: list=None, length_unit: str=LengthUnitEnum.CHARACTERS.value,
+                          tokenizer_name: str=None):
+
+    r"""
+    This function loads and splits one window of a file. It is CPU bound, so it is meant to run in a worker process
+    (see ProcessingWorkerPool), keeping the event loop free and processing several files in parallel.
+
+    Args:
+        project_id: The project id.
+        file_id: The file id (asset name).
+        file_hash: The blob hash of the file. Defaults to None (file stored in the project directory).
+        window: The window to load, as returned by get_file_windows. Defaults to None (the whole file).
+        chunk_size: The chunk size.
+        overlap_size: The overlap between two chunks.
+        splitter: The text splitter (SplitterEnum). Defaults to langchain.
+        pdf_extractor: The PDF text extraction (PdfExtractorEnum). Defaults to langchain.
+        cache_token: Write the extracted pages to the page cache parts of this run (see commit_page_cache).
+                     Defaults to None (no cache write).
+        chunking_profiles: Split under every profile ({"name", "chunk_size", "overlap_size"}) instead of
+                           chunk_size / overlap_size. Defaults to None.
+        length_unit: The unit of chunk_size / overlap_size (LengthUnitEnum). Defaults to characters.
+        tokenizer_name: The tokenizer of the tokens unit. Defaults to None (PROCESSING_TOKENIZER of the worker process,
+                        read when it started: the caller passes the one it records).
+
+    Returns:
+        A list of (chunk_text, chunk_metadata, chunk_profile) tuples (cheaper to send back to the parent process than
+        Documents), chunk_profile is None without chunking_profiles. None if the file can not be loaded.
+    """
+
+    process_controller = ProcessController(project_id=project_id)
+
+    file_content = process_controller.get_window_content(
+        file_id=file_id,
+        file_hash=file_hash,
+        window=window,
+        pdf_extractor=pdf_extractor,
+        cache_token=cache_token
+    )
+
+    if file_content is None:
+        return None
+
+    span_lengths = None
+    if length_unit == LengthUnitEnum.TOKENS.value:
+        span_lengths = process_controller.get_token_span_lengths(file_content=file_content,
+                                                                 tokenizer_name=tokenizer_name)
+
+    # the window is loaded once, then split under every chunking profile
+    if chunking_profiles is None:
+        chunking_profiles = [{"name": None, "chunk_size": chunk_size, "overlap_size": overlap_size}]
+
+    return [
+        (chunk_text, chunk_metadata, chunking_profile["name"])
+        for chunking_profile in chunking_profiles
+        for chunk_text, chunk_metadata in process_controller.split_window_content(
+            file_content=file_content,
+            file_id=file_id,
+            chunk_size=chunking_profile["chunk_size"],
+            overlap_size=chunking_profile["overlap_size"],
+            splitter=splitter,
+            span_lengths=span_lengths
+        )
+    ]
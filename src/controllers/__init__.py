@@ -1,3 +1,3 @@
 from .DataController import DataController
 from .ProjectController import ProjectController
-from .ProcessController import ProcessController
+from .ProcessController import ProcessController, get_file_windows, load_and_split_window, commit_page_cache
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+import time
+
+
+class TTLCache:
+    r"""
+    In-process LRU cache whose entries expire `ttl_seconds` after they were set.
+
+    - LRU: when `max_size` entries are stored, setting a new one evicts the least recently used.
+    - TTL: bounds how long an entry changed by another process (or directly in the database) can be served.
+
+    Not shared between processes, and not thread-safe: meant for objects used from the event loop.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+
+        entry = self.entries.get(key)
+
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+
+        if self.max_size <= 0:
+            return
+
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_stats(self):
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
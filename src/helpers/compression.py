@@ -0,0 +1,53 @@
+import gzip
+import zlib
+import zstandard
+from models.enums.StorageEnums import CompressionEnum
+
+
+# file extension appended to the blob path for every compression
+COMPRESSION_EXTENSIONS = {
+    CompressionEnum.NONE.value: "",
+    CompressionEnum.GZIP.value: ".gz",
+    CompressionEnum.ZSTD.value: ".zst",
+}
+
+
+def get_compressor(compression: str, level: int):
+    """
+    This function returns a streaming compressor object with `compress(data)` and `flush()` methods,
+    or None when the blobs are stored as they are.
+
+    Args:
+        compression (str): One of CompressionEnum values.
+        level (int): The compression level (gzip: 1-9, zstd: 1-22).
+
+    Returns:
+        The compressor object or None.
+    """
+    if compression == CompressionEnum.GZIP.value:
+        return zlib.compressobj(level, zlib.DEFLATED, 31) # wbits=31 writes a gzip container (readable by gzip.open)
+
+    if compression == CompressionEnum.ZSTD.value:
+        return zstandard.ZstdCompressor(level=level).compressobj()
+
+    return None
+
+
+def open_decompressed(file_path: str, compression: str):
+    """
+    This function opens a blob for reading and returns a binary file object of the original (decompressed) content.
+
+    Args:
+        file_path (str): The blob path.
+        compression (str): One of CompressionEnum values.
+
+    Returns:
+        A readable binary file object, to be closed by the caller.
+    """
+    if compression == CompressionEnum.GZIP.value:
+        return gzip.open(file_path, "rb")
+
+    if compression == CompressionEnum.ZSTD.value:
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True)
+
+    return open(file_path, "rb")
@@ -1,4 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import Field, AliasChoices, validator
+from typing import Optional, Dict, Literal
 
 # Create a Settings class that inherits all the features from BaseSettings.
 class Settings(BaseSettings):
@@ -13,32 +15,117 @@ class Settings(BaseSettings):
     FILE_ALLOWED_TYPES: list
     FILE_MAX_SIZE: int
     FILE_DEFAULT_CHUNK_SIZE: int
+    FILE_UPLOAD_CONCURRENCY: int = 8   # max number of files written at the same time by the batch upload
+    FILE_STORAGE_COMPRESSION: Literal["none", "gzip", "zstd"] = "none"   # CompressionEnum values
+    FILE_STORAGE_COMPRESSION_LEVEL: int = 3
+    FILE_COMPRESSIBLE_TYPES: list = ["text/plain"]   # types worth compressing (PDF is already compressed)
+    UPLOAD_SESSION_LOCK_SECONDS: int = 60   # a request writing to an upload session holds it, refreshed while it writes
+    UPLOAD_SESSION_TTL_SECONDS: int = 86400   # an upload session without activity for this long is deleted with its bytes
+    UPLOAD_SESSION_CLEANUP_INTERVAL: float = 3600   # seconds between two looks for expired upload sessions
+    
+    # Processing settings
+    PROCESSING_WORKERS: int = 2   # number of background jobs processed at the same time by every app process
+    PROCESSING_JOB_LEASE_SECONDS: int = 300   # a running job without heartbeat for this long is resumed by another worker
+    PROCESSING_JOB_POLL_INTERVAL: float = 5   # seconds between two looks for new jobs when idle
+    PROCESSING_MAX_JOB_FILES: int = 20000   # files of a project-wide job, all listed in the job document
+    PROCESSING_POOL_SIZE: Optional[int] = None   # worker processes parsing and splitting the files, None = number of CPUs
+    PROCESSING_GLOBAL_FILE_SLOTS: int = 8   # files processed at the same time by every app process, all projects together
+    PROCESSING_PROJECT_FILE_SLOTS: int = 4   # files of the same project processed at the same time
+    PROCESSING_PROJECT_WEIGHTS: Dict[str, float] = {}   # project_id -> share of the file slots when projects compete (default 1)
+    PROCESSING_WINDOW_PAGES: int = 20   # PDF pages loaded and split at a time
+    PROCESSING_WINDOW_BYTES: int = 4194304   # bytes of a large text file loaded and split at a time (4 MB)
+    PROCESSING_WINDOWS_IN_FLIGHT: int = 4   # windows of the same file loaded and split in parallel (kept in order)
+    PROCESSING_PIPELINE_DEPTH: int = 2   # split windows waiting to be inserted, bounds the memory used per file
+    PROCESSING_INSERT_BATCH_SIZE: int = 1000   # max chunks written per bulk_write
+    PROCESSING_INSERT_BATCH_BYTES: int = 2097152   # max estimated bytes (chunk texts + overhead) written per bulk_write (2 MB)
+    PROCESSING_INSERTS_IN_FLIGHT: int = 4   # bulk_write calls of the same file running at the same time
+    PROCESSING_TOKENIZER: str = "gpt2"   # fast tokenizer of the token length mode (hub model id, downloaded on first
+                                         # use by the pool workers, or a local directory when offline)
+    
+    # Project settings
+    PROJECT_CACHE_SIZE: int = 1024   # projects kept in memory by every app process (0 disables the cache)
+    PROJECT_CACHE_TTL_SECONDS: float = 300   # a cached project is read again from the database after this long
+    
+    # Export settings
+    EXPORT_BATCH_SIZE: int = 1000   # chunks read per database round-trip (and sent per write) by the NDJSON export
+    EXPORT_COMPRESSION_LEVEL: int = 3
     
     # DB Settings
     MONGODB_URI: str
     MONGO_DATABASE: str
+    DB_REBUILD_CHANGED_INDEXES: bool = False   # drop and rebuild at startup the indexes whose definition changed
     
     # LLM Settings
     GENERATION_BACKEND: str 
     EMBEDDING_BACKEND: str
     
-    OPENAI_API_KEY: str = None
-    OPENAI_API_URL: str = None
-    COHERE_API_KEY: str = None
+    OPENAI_API_KEY: Optional[str] = None
+    OPENAI_API_URL: Optional[str] = None
+    COHERE_API_KEY: Optional[str] = None
     
-    GENERATION_MODEL_ID: str = None
-    EMBEDDING_MODEL_ID: str = None
-    EMBEDDING_MODEL_SIZE: str = None
+    GENERATION_MODEL_ID: Optional[str] = None
+    EMBEDDING_MODEL_ID: Optional[str] = None
+    EMBEDDING_MODEL_SIZE: Optional[int] = None
     
-    INPUT_DEFAULT_MAX_CHRACTERS: str = None
-    GENERATION_DEFAULT_MAX_TOKENS: str = None
-    GENERATION_DEFAULT_TEMPERATURE: str = None
+    # INPUT_DEFAULT_MAX_CHRACTERS is the former (misspelled) name, still read from the older .env files
+    INPUT_DEFAULT_MAX_CHARACTERS: Optional[int] = Field(None, validation_alias=AliasChoices("INPUT_DEFAULT_MAX_CHARACTERS",
+                                                                                             "INPUT_DEFAULT_MAX_CHRACTERS"))
+    GENERATION_DEFAULT_MAX_TOKENS: Optional[int] = None
+    GENERATION_DEFAULT_TEMPERATURE: Optional[float] = None
+
+    @validator("PROCESSING_PROJECT_WEIGHTS")
+    def check_project_weights(cls, value):
+        # a file pushes its project by cost / weight: 0 would divide by zero in the scheduler, a negative one
+        # would put the project in front of the others
+        for project_id, weight in value.items():
+            if weight <= 0:
+                raise ValueError(f"PROCESSING_PROJECT_WEIGHTS: the weight of {project_id} must be greater than 0")
+
+        return value
     
     class Config(SettingsConfigDict): # Config class inherit from SettingsConfigDict, it's a nested class 
        env_file = ".env" # This tells Pydantic to look for a file named `.env`
+       frozen = True # the settings are shared by the whole process (see get_settings), nobody can change them in place
+
+
+# the settings of this process, read once: get_settings is called several times per request
+# (FastAPI dependency, every controller and model), parsing the environment and `.env` each time was wasted work
+_settings = None
+
 
 def get_settings(): # Function to return object from Settings class
-    return Settings()
+    r"""
+    Returns the settings snapshot of this process, read from the environment and `.env` on the first call.
+
+    The snapshot is immutable and only replaced as a whole by reload_settings: a caller always sees
+    a consistent set of settings, the old or the new one, never a mix.
+    """
+    global _settings
+
+    if _settings is None:
+        _settings = Settings()
+
+    return _settings
+
+
+def reload_settings():
+    r"""
+    Reads the environment and `.env` again and swaps the snapshot returned by get_settings
+    (the app calls it on SIGHUP, see main.py).
+
+    The new settings are validated before the swap: when they are invalid, the error is raised
+    and the current snapshot stays in use. The objects created at startup (Example: the database client,
+    the LLM clients, the processing pool and its worker processes) keep the values they were created with.
+
+    Returns:
+        Settings: The new snapshot.
+    """
+    global _settings
+
+    settings = Settings()
+    _settings = settings
+
+    return settings
 
 """
 # ----------------------------------------------------------------------------------------------------------------
@@ -232,4 +319,4 @@ print(settings.app_name)  # Outputs the app name loaded from `.env` or default
 
 # from os import getenv
 # APP_NAME = getenv("APP_NAME")
-# APP_VERSION = getenv("APP_VERSION")
\ No newline at end of file
+# APP_VERSION = getenv("APP_VERSION")
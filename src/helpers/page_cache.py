@@ -0,0 +1,136 @@
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+# bump when the extracted pages change for the same file and extractor (Example: a new extraction option),
+# the sidecars written by the older versions are then ignored
+PAGE_CACHE_VERSION = 1
+
+# file layout: header length (8 bytes, little endian) | JSON header | page texts, each one zlib compressed
+# header: {"version": 1, "pages": [[offset, length, metadata], ...]}, offsets are relative to the end of the header
+HEADER_LENGTH_FORMAT = "<Q"
+HEADER_LENGTH_SIZE = struct.calcsize(HEADER_LENGTH_FORMAT)
+PAGE_COMPRESSION_LEVEL = 1 # pages are read far more often than written, fast decompression matters most
+
+
+def write_pages(file_path: str, pages: list):
+    """
+    This function writes extracted pages to a page cache file (atomically: a reader never sees a partial file).
+
+    Args:
+        file_path (str): The page cache file path.
+        pages (list): The pages as (page_text, page_metadata) tuples.
+    """
+    index, bodies, offset = [], [], 0
+
+    for page_text, page_metadata in pages:
+        body = zlib.compress(page_text.encode("utf-8"), PAGE_COMPRESSION_LEVEL)
+        index.append([offset, len(body), page_metadata])
+        bodies.append(body)
+        offset += len(body)
+
+    write_page_file(file_path=file_path, index=index, bodies=bodies)
+
+
+def write_page_file(file_path: str, index: list, bodies: list):
+
+    header = json.dumps({"version": PAGE_CACHE_VERSION, "pages": index}, separators=(",", ":")).encode("utf-8")
+
+    # a unique temp file next to the target: two writes of the same file (Example: two projects sharing a blob,
+    # merged from the same process) never write into each other's temp file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".",
+                                     prefix=f"{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(struct.pack(HEADER_LENGTH_FORMAT, len(header)))
+            f.write(header)
+            for body in bodies:
+                f.write(body)
+
+        os.replace(temp_path, file_path)
+
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_header(f):
+
+    header_length, = struct.unpack(HEADER_LENGTH_FORMAT, f.read(HEADER_LENGTH_SIZE))
+    header = json.loads(f.read(header_length))
+
+    if header.get("version") != PAGE_CACHE_VERSION:
+        raise ValueError(f"unsupported page cache version: {header.get('version')}")
+
+    return header, HEADER_LENGTH_SIZE + header_length
+
+
+def read_page_count(file_path: str):
+    """
+    This function returns the number of pages of a page cache file.
+    """
+    with open(file_path, "rb") as f:
+        header, _ = read_header(f)
+
+    return len(header["pages"])
+
+
+def read_pages(file_path: str, start_page: int=0, end_page: int=None):
+    """
+    This function reads a range of pages from a page cache file, without reading the other pages.
+
+    Args:
+        file_path (str): The page cache file path.
+        start_page (int, optional): The first page (included). Defaults to 0.
+        end_page (int, optional): The last page (excluded). Defaults to None (the last page of the file).
+
+    Returns:
+        list: The pages as (page_text, page_metadata) tuples.
+    """
+    pages = []
+
+    with open(file_path, "rb") as f:
+        header, body_start = read_header(f)
+
+        index = header["pages"][start_page:end_page]
+        if len(index) == 0:
+            return pages
+
+        # the pages of a range are contiguous: a single read
+        range_start = index[0][0]
+        f.seek(body_start + range_start)
+        data = f.read(index[-1][0] + index[-1][1] - range_start)
+
+    for offset, length, page_metadata in index:
+        body = data[offset - range_start:offset - range_start + length]
+        pages.append((zlib.decompress(body).decode("utf-8"), page_metadata))
+
+    return pages
+
+
+def merge_page_files(part_paths: list, file_path: str):
+    """
+    This function concatenates page cache files (Example: written window by window) into a single one,
+    without decompressing the pages.
+
+    Args:
+        part_paths (list): The page cache files, in page order.
+        file_path (str): The merged page cache file path.
+    """
+    index, bodies, offset = [], [], 0
+
+    for part_path in part_paths:
+        with open(part_path, "rb") as f:
+            header, _ = read_header(f)
+            body = f.read()
+
+        for page_offset, page_length, page_metadata in header["pages"]:
+            index.append([offset + page_offset, page_length, page_metadata])
+
+        bodies.append(body)
+        offset += len(body)
+
+    write_page_file(file_path=file_path, index=index, bodies=bodies)
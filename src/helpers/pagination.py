@@ -0,0 +1,42 @@
+import base64
+import json
+
+
+def encode_cursor(values: list):
+    """
+    This function encodes the sort key of the last item of a page into an opaque cursor for the next page.
+
+    Args:
+        values (list): The sort key values (JSON serializable, Example: [str(asset_id), chunk_order, str(chunk_id)]).
+
+    Returns:
+        str: The cursor (URL safe).
+    """
+    data = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int):
+    """
+    This function decodes a cursor made by encode_cursor.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+        size (int): The expected number of sort key values.
+
+    Returns:
+        list: The sort key values.
+
+    Raises:
+        ValueError: When the cursor was not made by encode_cursor.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid cursor: {e}")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+
+    return values
@@ -0,0 +1,189 @@
+import re
+from bisect import bisect_left
+from collections import deque
+
+
+class RecursiveTextSplitter:
+    r"""
+    A text splitter with the same output as langchain's RecursiveCharacterTextSplitter
+    (keep_separator=True, strip_whitespace=True, is_separator_regex=False), but working on (start, end) offsets:
+
+    - The separator offsets are computed once per text and reused at every level of the recursion,
+      instead of searching and splitting a new substring at every level.
+    - The pieces are spans of the original text, a string is only created for the final chunks.
+    - No Document object is created per chunk.
+
+    The chunk length is the number of characters by default, a `span_length(start, end)` function can be given
+    to measure it differently (Example: in tokens).
+
+    Usage:
+    ```
+    splitter = RecursiveTextSplitter(chunk_size=100, chunk_overlap=20)
+    splitter.split_text(text)    # ["chunk 1", "chunk 2", ...]
+    splitter.split_spans(text)   # [(0, 98), (80, 175), ...]
+    ```
+    """
+
+    def __init__(self, chunk_size: int=100, chunk_overlap: int=20, separators: list=None):
+
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller."
+            )
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or ["\n\n", "\n", " ", ""]
+
+    def split_text(self, text: str, span_length=None):
+
+        return [
+            text[start:end]
+            for start, end in self.split_spans(text=text, span_length=span_length)
+        ]
+
+    def split_spans(self, text: str, span_length=None):
+
+        r"""
+        This function splits a text into chunks.
+
+        Args:
+            text (str): The text to split.
+            span_length (callable, optional): span_length(start, end) returns the length of text[start:end].
+                                              Defaults to None (number of characters).
+
+        Returns:
+            list: The (start, end) offsets of the chunks in the text.
+        """
+
+        chunks = []
+        offsets = {} # separator -> its offsets in the whole text, computed on first use
+
+        self._split_range(
+            text=text,
+            start=0,
+            end=len(text),
+            separators=self.separators,
+            offsets=offsets,
+            span_length=span_length,
+            chunks=chunks
+        )
+
+        return chunks
+
+    def _find_separator(self, text: str, separator: str, start: int, end: int, offsets: dict):
+
+        # offsets of the separator inside text[start:end], without overlaps (like re.split)
+        if len(separator) > 1 and (start != 0 or end != len(text)):
+            # a multi-character separator may overlap itself, scanning from another start can give other matches
+            return [
+                match.start() for match in re.compile(re.escape(separator)).finditer(text, start, end)
+            ]
+
+        if separator not in offsets:
+            offsets[separator] = [match.start() for match in re.finditer(re.escape(separator), text)]
+
+        separator_offsets = offsets[separator]
+        return separator_offsets[
+            bisect_left(separator_offsets, start):bisect_left(separator_offsets, end - len(separator) + 1)
+        ]
+
+    def _split_range(self, text: str, start: int, end: int, separators: list,
+                     offsets: dict, span_length, chunks: list):
+
+        # use the first separator found in the range
+        separator = separators[-1]
+        new_separators = []
+        separator_offsets = None
+
+        for i, _separator in enumerate(separators):
+            if _separator == "":
+                separator = _separator
+                break
+
+            _separator_offsets = self._find_separator(
+                text=text, separator=_separator, start=start, end=end, offsets=offsets
+            )
+            if _separator_offsets:
+                separator = _separator
+                separator_offsets = _separator_offsets
+                new_separators = separators[i + 1:]
+                break
+
+        # the pieces keep their separator at the start: they are contiguous spans of the text
+        if separator == "":
+            splits = [(i, i + 1) for i in range(start, end)]
+        else:
+            if separator_offsets is None:
+                separator_offsets = self._find_separator(
+                    text=text, separator=separator, start=start, end=end, offsets=offsets
+                )
+            bounds = [start] + separator_offsets + [end]
+            splits = [
+                (bounds[i], bounds[i + 1])
+                for i in range(len(bounds) - 1)
+                if bounds[i] < bounds[i + 1]
+            ]
+
+        # merge the small pieces, split the long ones again with the next separators
+        good_splits = []
+        for split_start, split_end in splits:
+
+            split_length = split_end - split_start if span_length is None else span_length(split_start, split_end)
+            if split_length < self.chunk_size:
+                good_splits.append((split_start, split_end, split_length))
+                continue
+
+            if good_splits:
+                self._merge_splits(text=text, splits=good_splits, chunks=chunks)
+                good_splits = []
+
+            if not new_separators:
+                chunks.append((split_start, split_end))
+            else:
+                self._split_range(
+                    text=text,
+                    start=split_start,
+                    end=split_end,
+                    separators=new_separators,
+                    offsets=offsets,
+                    span_length=span_length,
+                    chunks=chunks
+                )
+
+        if good_splits:
+            self._merge_splits(text=text, splits=good_splits, chunks=chunks)
+
+    def _merge_splits(self, text: str, splits: list, chunks: list):
+
+        # splits: contiguous (start, end, length) pieces, every chunk is the span from its first to its last piece
+        current = deque()
+        total = 0
+
+        for split in splits:
+            split_length = split[2]
+
+            if total + split_length > self.chunk_size and len(current) > 0:
+                self._add_chunk(text=text, start=current[0][0], end=current[-1][1], chunks=chunks)
+
+                # keep the last pieces as the overlap of the next chunk
+                while total > self.chunk_overlap or (total + split_length > self.chunk_size and total > 0):
+                    total -= current.popleft()[2]
+
+            current.append(split)
+            total += split_length
+
+        if len(current) > 0:
+            self._add_chunk(text=text, start=current[0][0], end=current[-1][1], chunks=chunks)
+
+    def _add_chunk(self, text: str, start: int, end: int, chunks: list):
+
+        # strip the whitespaces, drop empty chunks
+        while start < end and text[start].isspace():
+            start += 1
+
+        while end > start and text[end - 1].isspace():
+            end -= 1
+
+        if start < end:
+            chunks.append((start, end))
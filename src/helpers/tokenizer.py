@@ -0,0 +1,76 @@
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4)
+def get_tokenizer(tokenizer_name: str):
+    """
+    This function loads a fast (Rust) tokenizer once per process, the next calls reuse it.
+
+    Args:
+        tokenizer_name (str): A Hugging Face hub model id (Example: gpt2) or a local directory.
+                              A hub id is downloaded by the first token length job, inside a processing pool worker,
+                              then read from the local cache (HF_HOME): without network access that job fails.
+                              Offline, use a local directory (tokenizer.save_pretrained) or a filled cache
+                              with HF_HUB_OFFLINE=1.
+
+    Returns:
+        The tokenizer (transformers.PreTrainedTokenizerFast).
+    """
+    # transformers is slow to import, only the token length mode needs it
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, use_fast=True)
+
+    if not tokenizer.is_fast:
+        raise ValueError(f"{tokenizer_name} has no fast tokenizer, the token offsets are not available")
+
+    return tokenizer
+
+
+class TokenSpanLength:
+    r"""
+    span_length(start, end) function for RecursiveTextSplitter measuring text[start:end] in tokens.
+
+    The text is tokenized once (see get_token_span_lengths), then the length of any span is the number of
+    tokens overlapping it, found with two binary searches over the token offsets: no tokenizer call per piece.
+    """
+
+    def __init__(self, offsets: list):
+
+        # offsets: (start, end) character offsets of the tokens, in text order
+        self.token_starts = [start for start, _ in offsets]
+        self.token_ends = [end for _, end in offsets]
+
+    def __call__(self, start: int, end: int):
+
+        # tokens starting before the span end, minus the tokens ending before (or at) the span start
+        return bisect_left(self.token_starts, end) - bisect_right(self.token_ends, start)
+
+
+def get_token_span_lengths(texts: list, tokenizer_name: str):
+    """
+    This function tokenizes texts in one batched call (run in parallel by the fast tokenizer).
+
+    Args:
+        texts (list): The texts, Example: the pages of a window.
+        tokenizer_name (str): See get_tokenizer.
+
+    Returns:
+        list: One TokenSpanLength per text.
+    """
+    if len(texts) == 0:
+        return []
+
+    encodings = get_tokenizer(tokenizer_name)(
+        texts,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+
+    return [
+        TokenSpanLength(offsets=offsets)
+        for offsets in encodings["offset_mapping"]
+    ]
@@ -7,13 +7,18 @@ For main.py:
 """
 
 from fastapi import FastAPI       
+import asyncio
+import logging
+import signal
 
 from routes import base_router  
 from routes import data_router
 from motor.motor_asyncio import AsyncIOMotorClient
-from helpers.config import get_settings 
+from helpers.config import get_settings, reload_settings
 
 from stores.llm.LLMProviderFactory import LLMProviderFactory
+from workers import ProcessingWorkerPool, UploadSessionCleaner
+from models import ModelRegistry
 """
 Note:
 instead of writing `from routes.base import base_router` we can write `from routes import base_router`
@@ -23,6 +28,27 @@ as it's already imported in __init__.py file in routes directory.
 # Create an instance(object) of the FastAPI class
 app = FastAPI() 
 
+logger = logging.getLogger("uvicorn.error")
+
+
+def reload_app_settings(): # SIGHUP handler: `kill -HUP <pid>` after editing `.env`
+    try:
+        reload_settings()
+        logger.info("Settings reloaded")
+    except Exception as e:
+        # invalid `.env`: the current settings stay in use
+        logger.error(f"Settings not reloaded: {e}")
+
+
+def install_reload_handler():
+    # a signal instead of an admin endpoint: the app has no authentication, and the signal is only
+    # available to whoever runs the process. Not supported on Windows, the settings are then read once.
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_app_settings)
+    except (NotImplementedError, AttributeError, RuntimeError) as e:
+        logger.warning(f"Settings reload on SIGHUP not available: {e}")
+
+
 async def startup_db_client(): # start database connection
     settings = get_settings()
     app.mongo_conn = AsyncIOMotorClient(settings.MONGODB_URI) # attach the mongo_conn to the app, so that it can be used in other parts of the app
@@ -41,13 +67,28 @@ async def startup_db_client(): # start database connection
         embedding_size=settings.EMBEDDING_MODEL_SIZE
         )
 
+    # Models shared by all the requests, the collections and indexes are checked once here
+    app.models = await ModelRegistry.create_instance(db_client=app.db_client)
+
+    # Background workers running the /process jobs
+    app.processing_worker_pool = ProcessingWorkerPool(models=app.models)
+    await app.processing_worker_pool.start()
+
+    # Deletes the resumable upload sessions abandoned by their clients
+    app.upload_session_cleaner = UploadSessionCleaner(models=app.models)
+    await app.upload_session_cleaner.start()
+
+    install_reload_handler()
+
 
 async def shutdown_db_client():
+    await app.upload_session_cleaner.stop()
+    await app.processing_worker_pool.stop()
     app.mongo_conn.close()
     
 
-app.router.lifespan.on_startup.append(startup_db_client)
-app.router.lifespan.on_shutdown.append(shutdown_db_client)
+app.router.on_startup.append(startup_db_client)
+app.router.on_shutdown.append(shutdown_db_client)
 
 
 app.include_router(base_router)
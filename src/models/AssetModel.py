@@ -1,7 +1,10 @@
 from .BaseDataModel import BaseDataModel
 from .db_schemes import Asset
 from .enums.DataBaseEnum import DataBaseEnum
+from .enums.AssetTypeEnum import AssetTypeEnum
 from bson import ObjectId
+from datetime import datetime, timedelta
+import uuid
 
 class AssetModel(BaseDataModel):
 
@@ -27,13 +30,36 @@ class AssetModel(BaseDataModel):
                     unique=index["unique"]
                 )
 
+    def get_asset_document(self, asset: Asset):
+
+        # asset_pushed_at is never set by the callers, exclude_unset would leave it out of the document
+        return {
+            **asset.dict(by_alias=True, exclude_unset=True),
+            "asset_pushed_at": asset.asset_pushed_at,
+        }
+
     async def create_asset(self, asset: Asset):
 
-        result = await self.collection.insert_one(asset.dict(by_alias=True, exclude_unset=True))
+        result = await self.collection.insert_one(self.get_asset_document(asset=asset))
         asset.id = result.inserted_id
 
         return asset
 
+    async def insert_many_assets(self, assets: list):
+
+        if len(assets) == 0:
+            return assets
+
+        result = await self.collection.insert_many([
+            self.get_asset_document(asset=asset)
+            for asset in assets
+        ])
+
+        for asset, inserted_id in zip(assets, result.inserted_ids):
+            asset.id = inserted_id
+
+        return assets
+
     async def get_all_project_assets(self, asset_project_id: str, asset_type: str):
 
         records = await self.collection.find({
@@ -46,6 +72,107 @@ class AssetModel(BaseDataModel):
             for record in records
         ]
 
+    async def iter_assets(self, asset_project_id: str, asset_type: str=None, min_size: int=None, max_size: int=None,
+                          pushed_after: datetime=None, pushed_before: datetime=None, fields: list=None,
+                          batch_size: int=1000, after: ObjectId=None, limit: int=None):
+
+        r"""
+        Reads the assets of a project from a single cursor in _id order, one batch at a time,
+        for the callers that need a few fields of every asset: the memory used is bounded by `batch_size`
+        and the records are returned raw (no Asset validation per record).
+
+        Args:
+            asset_project_id (str): The project.
+            asset_type (str, optional): Only the assets of this type (AssetTypeEnum).
+            min_size (int, optional): Only the assets of at least this size (asset_size, bytes).
+            max_size (int, optional): Only the assets of at most this size.
+            pushed_after (datetime, optional): Only the assets pushed at or after this date (asset_pushed_at).
+            pushed_before (datetime, optional): Only the assets pushed before this date.
+            fields (list, optional): The fields to return, `_id` is always returned. Defaults to None (every field).
+            batch_size (int, optional): The records read per round-trip.
+            after (ObjectId, optional): Start right after this asset _id (keyset pagination).
+            limit (int, optional): Stop after this many assets. Defaults to None (all of them).
+
+        Yields:
+            list: The raw asset records of every batch.
+        """
+
+        cursor = self.get_assets_cursor(asset_project_id=asset_project_id, asset_type=asset_type, min_size=min_size,
+                                        max_size=max_size, pushed_after=pushed_after, pushed_before=pushed_before,
+                                        fields=fields, after=after).batch_size(batch_size)
+
+        if limit is not None:
+            cursor = cursor.limit(limit)
+
+        try:
+            while batch := await cursor.to_list(length=batch_size):
+                yield batch
+        finally:
+            await cursor.close()
+
+    async def get_assets_page(self, asset_project_id: str, page_size: int=100, **filters):
+
+        r"""
+        Reads one page of assets (same filters and fields as iter_assets), the next page starts after its last _id.
+
+        Returns:
+            list: The raw asset records, at most page_size.
+        """
+
+        # a single limited round-trip: the server closes the cursor once the page is read
+        cursor = self.get_assets_cursor(asset_project_id=asset_project_id, **filters).limit(page_size)
+
+        return await cursor.to_list(length=page_size)
+
+    def get_assets_cursor(self, asset_project_id: str, fields: list=None, **filters):
+
+        return self.collection.find(
+            self.get_assets_query(asset_project_id=asset_project_id, **filters),
+            projection=None if fields is None else {field: 1 for field in fields}
+        ).sort("_id", 1)
+
+    def get_assets_query(self, asset_project_id: str, asset_type: str=None, min_size: int=None, max_size: int=None,
+                         pushed_after: datetime=None, pushed_before: datetime=None, after: ObjectId=None):
+
+        query = {
+            "asset_project_id": ObjectId(asset_project_id) if isinstance(asset_project_id, str) else asset_project_id,
+        }
+
+        if asset_type is not None:
+            query["asset_type"] = asset_type
+
+        if min_size is not None or max_size is not None:
+            query["asset_size"] = {
+                **({"$gte": min_size} if min_size is not None else {}),
+                **({"$lte": max_size} if max_size is not None else {}),
+            }
+
+        if pushed_after is not None or pushed_before is not None:
+            query["asset_pushed_at"] = {
+                **({"$gte": pushed_after} if pushed_after is not None else {}),
+                **({"$lt": pushed_before} if pushed_before is not None else {}),
+            }
+
+        if after is not None:
+            query["_id"] = {"$gt": after}
+
+        return query
+
+    async def get_asset_names_by_ids(self, asset_project_id: str, asset_ids: list):
+
+        records = await self.collection.find(
+            {
+                "_id": {"$in": list(asset_ids)},
+                "asset_project_id": ObjectId(asset_project_id) if isinstance(asset_project_id, str) else asset_project_id,
+            },
+            projection={"asset_name": 1}
+        ).to_list(length=None)
+
+        return {
+            record["_id"]: record["asset_name"]
+            for record in records
+        }
+
     async def get_asset_record(self, asset_project_id: str, asset_name: str):
 
         record = await self.collection.find_one({
@@ -58,5 +185,171 @@ class AssetModel(BaseDataModel):
         
         return None
 
+    async def get_asset_by_hash(self, asset_project_id: str, asset_hash: str):
+
+        record = await self.collection.find_one({
+            "asset_project_id": ObjectId(asset_project_id) if isinstance(asset_project_id, str) else asset_project_id,
+            "asset_hash": asset_hash,
+        })
+
+        if record:
+            return Asset(**record)
+
+        return None
+
+    async def get_assets_by_hashes(self, asset_project_id: str, asset_hashes: list):
+
+        records = await self.collection.find({
+            "asset_project_id": ObjectId(asset_project_id) if isinstance(asset_project_id, str) else asset_project_id,
+            "asset_hash": {"$in": list(asset_hashes)},
+        }).to_list(length=None)
+
+        return {
+            record["asset_hash"]: Asset(**record)
+            for record in records
+        }
+
+    async def get_asset_by_id(self, asset_project_id: str, asset_id: str):
+
+        if not ObjectId.is_valid(asset_id):
+            return None
+
+        record = await self.collection.find_one({
+            "_id": ObjectId(asset_id) if isinstance(asset_id, str) else asset_id,
+            "asset_project_id": ObjectId(asset_project_id) if isinstance(asset_project_id, str) else asset_project_id,
+        })
+
+        if record:
+            return Asset(**record)
+
+        return None
+
+    async def update_asset(self, asset: Asset):
+
+        await self.collection.update_one(
+            {"_id": asset.id},
+            {"$set": asset.dict(by_alias=True, exclude_unset=True, exclude={"id"})}
+        )
+
+        return asset
+
+    async def delete_asset(self, asset_id: ObjectId):
+
+        result = await self.collection.delete_one({
+            "_id": asset_id
+        })
+
+        return result.deleted_count
+
+    # resumable upload sessions: one request at a time writes to (or finalizes) a session, the lock is an atomic
+    # update of the session asset, so it holds across app processes. A lock not refreshed in time is released.
+
+    async def lock_upload_session(self, asset_id: ObjectId, lock_seconds: int):
+
+        r"""
+        Takes the lock of an upload session.
+
+        Returns:
+            str: The lock token, or None if another request holds the lock (or the session does not exist anymore).
+        """
+
+        now = datetime.utcnow()
+        lock_token = uuid.uuid4().hex
+
+        record = await self.collection.find_one_and_update(
+            {
+                "_id": asset_id,
+                "asset_type": AssetTypeEnum.UPLOAD.value,
+                "$or": [{"asset_lock": None}, {"asset_lock_until": {"$lt": now}}],
+            },
+            {"$set": {"asset_lock": lock_token, "asset_lock_until": now + timedelta(seconds=lock_seconds)}},
+            projection={"_id": 1}
+        )
+
+        return lock_token if record is not None else None
+
+    async def refresh_upload_session_lock(self, asset_id: ObjectId, lock_token: str, lock_seconds: int):
+
+        result = await self.collection.update_one(
+            {"_id": asset_id, "asset_lock": lock_token},
+            {"$set": {"asset_lock_until": datetime.utcnow() + timedelta(seconds=lock_seconds)}}
+        )
+
+        # False means the lock expired and was taken by another request
+        return result.matched_count == 1
+
+    async def unlock_upload_session(self, asset_id: ObjectId, lock_token: str):
+
+        # asset_lock_until keeps the time of the last activity (see delete_expired_upload_sessions)
+        await self.collection.update_one(
+            {"_id": asset_id, "asset_lock": lock_token},
+            {"$set": {"asset_lock": None, "asset_lock_until": datetime.utcnow()}}
+        )
+
+    async def delete_expired_upload_sessions(self, inactive_before: datetime, limit: int=1000):
+
+        r"""
+        Deletes the upload sessions without activity (created, written to or finalized) since `inactive_before`.
+        Every session is deleted atomically, only if it did not become active in the meantime.
+
+        Returns:
+            list: The ObjectIds of the deleted sessions (their partial files are left to the caller).
+        """
+
+        expired_query = {
+            "asset_type": AssetTypeEnum.UPLOAD.value,
+            "$or": [
+                {"asset_lock_until": {"$lt": inactive_before}},
+                {"asset_lock_until": None, "asset_pushed_at": {"$lt": inactive_before}},
+            ],
+        }
+
+        deleted_ids = []
+
+        for record in await self.collection.find(expired_query, projection={"_id": 1}).limit(limit).to_list(length=limit):
+            if await self.collection.find_one_and_delete({"_id": record["_id"], **expired_query}) is not None:
+                deleted_ids.append(record["_id"])
+
+        return deleted_ids
+
+    async def set_asset_chunking(self, asset_id: ObjectId, asset_chunking: dict, committed_generation: ObjectId=None):
+
+        r"""
+        Commits a new chunking state (and its chunk generation), only if the committed generation is still
+        the one read before the processing (compare-and-set): a run never overwrites the commit of another one.
+
+        Args:
+            asset_id (ObjectId): The asset.
+            asset_chunking (dict): The new state, with its "generation".
+            committed_generation (ObjectId, optional): The generation committed when the run started,
+                                                       None when there was none.
+
+        Returns:
+            bool: False when another run committed (or the chunking was reset) in the meantime.
+        """
+
+        result = await self.collection.update_one(
+            # None also matches the assets without asset_chunking
+            {"_id": asset_id, "asset_chunking.generation": committed_generation},
+            {"$set": {"asset_chunking": asset_chunking}}
+        )
+
+        return result.matched_count == 1
+
+    async def clear_chunking_pending(self, asset_id: ObjectId, generation: ObjectId):
+
+        # the chunks of the committed generation are visible and the older ones deleted (see set_asset_chunking)
+        await self.collection.update_one(
+            {"_id": asset_id, "asset_chunking.generation": generation},
+            {"$unset": {"asset_chunking.chunks_pending": ""}}
+        )
+
+    async def reset_project_chunking(self, asset_project_id: ObjectId):
+
+        # the chunks of the project were deleted, no asset is processed anymore
+        result = await self.collection.update_many(
+            {"asset_project_id": asset_project_id, "asset_chunking": {"$ne": None}},
+            {"$unset": {"asset_chunking": ""}}
+        )
 
-    
\ No newline at end of file
+        return result.modified_count
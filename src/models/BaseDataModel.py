@@ -4,4 +4,8 @@ class BaseDataModel:
 
     def __init__(self, db_client: object):
         self.db_client = db_client
-        self.app_settings = get_settings()
+
+    @property
+    def app_settings(self) -> Settings:
+        # the current snapshot: the models live as long as the app (see ModelRegistry) and follow reload_settings
+        return get_settings()
@@ -1,8 +1,11 @@
 from .BaseDataModel import BaseDataModel
 from .db_schemes import DataChunk
+from .ChunkWriter import ChunkWriter
 from .enums.DataBaseEnum import DataBaseEnum
 from bson.objectid import ObjectId
-from pymongo import InsertOne
+
+# order of the chunk listings and exports, see the chunk_project_id_asset_id_order_index_1 index
+CHUNKS_SORT = [("chunk_asset_id", 1), ("chunk_order", 1), ("_id", 1)]
 
 class ChunkModel(BaseDataModel):
 
@@ -43,19 +46,118 @@ class ChunkModel(BaseDataModel):
         
         return DataChunk(**result)
 
-    async def insert_many_chunks(self, chunks: list, batch_size: int=100):
+    async def get_chunks_page(self, project_id: ObjectId, asset_id: ObjectId=None, chunk_profile: str=None,
+                              committed_only: bool=False, after: tuple=None, limit: int=100, fields: list=None):
+
+        r"""
+        Reads a page of chunks ordered by (chunk_asset_id, chunk_order, _id), with keyset pagination:
+        the next page starts right after the last chunk of the previous one, so the database seeks in the
+        chunk_project_id_asset_id_order_index_1 index instead of skipping the previous pages (constant time at any depth).
+
+        Args:
+            project_id (ObjectId): The project.
+            asset_id (ObjectId, optional): Only the chunks of this asset.
+            chunk_profile (str, optional): Only the chunks of this chunking profile.
+            committed_only (bool, optional): Only the committed chunks, not the ones of a processing still running
+                                             (or interrupted). Defaults to False (every chunk).
+            after (tuple, optional): (chunk_asset_id, chunk_order, _id) of the last chunk of the previous page.
+            limit (int, optional): The page size.
+            fields (list, optional): The chunk fields to return, the sort key fields are always returned.
+                                     Defaults to None (every field).
 
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i+batch_size]
+        Returns:
+            list: The raw chunk records.
+        """
 
-            operations = [
-                InsertOne(chunk.dict(by_alias=True, exclude_unset=True))
-                for chunk in batch
+        query = self.get_chunks_query(project_id=project_id, asset_id=asset_id, chunk_profile=chunk_profile,
+                                      committed_only=committed_only)
+
+        if after is not None:
+            after_asset_id, after_order, after_id = after
+            query["$or"] = [
+                {"chunk_asset_id": {"$gt": after_asset_id}},
+                {"chunk_asset_id": after_asset_id, "chunk_order": {"$gt": after_order}},
+                {"chunk_asset_id": after_asset_id, "chunk_order": after_order, "_id": {"$gt": after_id}},
             ]
 
-            await self.collection.bulk_write(operations)
-        
-        return len(chunks)
+        return await self.collection.find(
+            query,
+            projection=self.get_chunks_projection(fields=fields)
+        ).sort(CHUNKS_SORT).limit(limit).to_list(length=limit)
+
+    async def iter_chunks(self, project_id: ObjectId, asset_id: ObjectId=None, chunk_profile: str=None,
+                          committed_only: bool=False, fields: list=None, batch_size: int=1000):
+
+        r"""
+        Reads all the chunks of a project (same filters, order and projection as get_chunks_page) from a single cursor,
+        one batch at a time: the memory used is bounded by `batch_size`, not by the number of chunks,
+        and the first batch is available after one round-trip.
+
+        Yields:
+            list: The raw chunk records of every batch.
+        """
+
+        cursor = self.collection.find(
+            self.get_chunks_query(project_id=project_id, asset_id=asset_id, chunk_profile=chunk_profile,
+                                  committed_only=committed_only),
+            projection=self.get_chunks_projection(fields=fields)
+        ).sort(CHUNKS_SORT).batch_size(batch_size)
+
+        try:
+            while batch := await cursor.to_list(length=batch_size):
+                yield batch
+        finally:
+            # the consumer stopped early (Example: the client disconnected), free the server cursor
+            await cursor.close()
+
+    def get_chunks_query(self, project_id: ObjectId, asset_id: ObjectId=None, chunk_profile: str=None,
+                         committed_only: bool=False):
+
+        query = {"chunk_project_id": project_id}
+
+        if asset_id is not None:
+            query["chunk_asset_id"] = asset_id
+        if chunk_profile is not None:
+            query["chunk_profile"] = chunk_profile
+
+        if committed_only:
+            # a processing writes its generation next to the committed one, flagged chunk_committed=False until
+            # it is committed (see ProcessingWorkerPool.process_job_asset): a filter on the chunk itself, whatever
+            # the number of assets. The chunks written before the flag have none and are committed
+            query["chunk_committed"] = {"$ne": False}
+
+        return query
+
+    def get_chunks_projection(self, fields: list=None):
+
+        # None: every field, the sort key fields are always returned
+        if fields is None:
+            return None
+
+        return {field: 1 for field in [*fields, "chunk_asset_id", "chunk_order"]}
+
+    def get_writer(self, max_batch_bytes: int=2097152, max_batch_size: int=1000, concurrency: int=4):
+        return ChunkWriter(
+            collection=self.collection,
+            max_batch_bytes=max_batch_bytes,
+            max_batch_size=max_batch_size,
+            concurrency=concurrency
+        )
+
+    async def insert_many_chunks(self, chunks: list, batch_size: int=100, max_batch_bytes: int=2097152,
+                                 concurrency: int=1):
+
+        # batches of at most batch_size chunks and max_batch_bytes bytes, concurrency batches in flight
+        writer = self.get_writer(max_batch_bytes=max_batch_bytes, max_batch_size=batch_size, concurrency=concurrency)
+
+        try:
+            for chunk in chunks:
+                await writer.add(chunk)
+        except BaseException:
+            await writer.abort()
+            raise
+
+        return await writer.close()
 
     async def delete_chunks_by_project_id(self, project_id: ObjectId):
         result = await self.collection.delete_many({
@@ -63,7 +165,45 @@ class ChunkModel(BaseDataModel):
         })
 
         return result.deleted_count
-    
-    
 
-    
\ No newline at end of file
+    async def delete_chunks_by_asset_id(self, project_id: ObjectId, asset_id: ObjectId, before_generation: ObjectId):
+
+        # delete the chunks of the asset older than this generation (ObjectIds grow with time): the previously committed
+        # ones, the ones left by interrupted runs and the ones processed before the generations. The generations
+        # started later, by a run still in progress, are left to it
+        result = await self.collection.delete_many({
+            "chunk_project_id": project_id,
+            "chunk_asset_id": asset_id,
+            "$or": [
+                {"chunk_generation": {"$lt": before_generation}},
+                {"chunk_generation": None},
+            ],
+        })
+
+        return result.deleted_count
+
+    async def commit_generation(self, project_id: ObjectId, asset_id: ObjectId, generation: ObjectId):
+
+        # the chunks of the generation just committed on the asset become visible to the readers
+        result = await self.collection.update_many(
+            {
+                "chunk_project_id": project_id,
+                "chunk_asset_id": asset_id,
+                "chunk_generation": generation,
+                "chunk_committed": False,
+            },
+            {"$set": {"chunk_committed": True}}
+        )
+
+        return result.modified_count
+
+    async def delete_chunks_by_generation(self, project_id: ObjectId, asset_id: ObjectId, generation: ObjectId):
+
+        # delete the chunks of one generation of the asset, Example: a run that could not commit them
+        result = await self.collection.delete_many({
+            "chunk_project_id": project_id,
+            "chunk_asset_id": asset_id,
+            "chunk_generation": generation,
+        })
+
+        return result.deleted_count
@@ -0,0 +1,147 @@
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+import asyncio
+import time
+
+# estimated BSON size of a chunk besides its text: the field names, the ids, the order and a short metadata
+CHUNK_OVERHEAD_BYTES = 256
+
+
+class ChunkWriter:
+    r"""
+    Writes chunks with several unordered bulk_write calls in flight, instead of one round-trip at a time.
+
+    - Batches are cut by estimated BSON size (`max_batch_bytes`), capped at `max_batch_size` documents:
+      small chunks make large batches, large chunks never build an oversized message. The size is estimated
+      from the text length (see estimate_size), the documents are only encoded once, by the driver: the estimate
+      counts characters, a non-ASCII text takes more bytes, the driver still splits a message above the server limit.
+    - Up to `concurrency` batches are in flight, `add` waits when they are all busy (backpressure for the caller).
+    - Unordered writes: a failing document does not stop the rest of its batch.
+    - Every batch is reported (see `batches`), `close` waits for all of them and raises if a document failed.
+
+    Usage:
+    ```
+    writer = chunk_model.get_writer(concurrency=4)
+    for chunk in chunks:
+        await writer.add(chunk)
+    await writer.close()
+    ```
+    """
+
+    def __init__(self, collection, max_batch_bytes: int, max_batch_size: int, concurrency: int):
+        self.collection = collection
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_size = max_batch_size
+        self.concurrency = max(concurrency, 1)
+
+        self.operations = []
+        self.operations_bytes = 0
+        self.in_flight = set()
+        self.batch_count = 0
+
+        self.batches = []   # one report per written batch, in completion order
+        self.inserted_count = 0
+        self.failed_count = 0
+
+    async def add(self, chunk):
+
+        # a DataChunk, or a document already BSON ready (see DataChunk.make_record)
+        document = chunk if isinstance(chunk, dict) else chunk.dict(by_alias=True, exclude_unset=True)
+        document_bytes = self.estimate_size(document)
+
+        if self.operations and self.operations_bytes + document_bytes > self.max_batch_bytes:
+            await self.flush()
+
+        self.operations.append(InsertOne(document))
+        self.operations_bytes += document_bytes
+
+        if len(self.operations) >= self.max_batch_size:
+            await self.flush()
+
+    @staticmethod
+    def estimate_size(document: dict):
+        return len(document.get("chunk_text") or "") + CHUNK_OVERHEAD_BYTES
+
+    async def flush(self):
+
+        if not self.operations:
+            return
+
+        # wait for a free place before sending the next batch
+        while len(self.in_flight) >= self.concurrency:
+            _, self.in_flight = await asyncio.wait(self.in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+        self.batch_count += 1
+        task = asyncio.create_task(self.write_batch(
+            batch_number=self.batch_count,
+            operations=self.operations,
+            operations_bytes=self.operations_bytes
+        ))
+        self.in_flight.add(task)
+
+        self.operations = []
+        self.operations_bytes = 0
+
+    async def write_batch(self, batch_number: int, operations: list, operations_bytes: int):
+
+        start = time.perf_counter()
+        error = None
+
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            inserted = result.inserted_count
+
+        except BulkWriteError as e:
+            # unordered: the documents without a write error are inserted
+            inserted = e.details.get("nInserted", 0)
+            error = e.details["writeErrors"][0]["errmsg"] if e.details.get("writeErrors") else str(e)
+
+        except Exception as e:
+            inserted = 0
+            error = str(e)
+
+        self.inserted_count += inserted
+        self.failed_count += len(operations) - inserted
+        self.batches.append({
+            "batch": batch_number,
+            "documents": len(operations),
+            "bytes": operations_bytes,
+            "inserted": inserted,
+            "failed": len(operations) - inserted,
+            "seconds": round(time.perf_counter() - start, 4),
+            "error": error,
+        })
+
+    async def close(self):
+
+        r"""
+        Sends the last batch and waits for every batch in flight.
+
+        Returns:
+            int: The number of inserted chunks.
+
+        Raises:
+            ValueError: When some chunks were not inserted (the first error of each failed batch is in `batches`).
+        """
+
+        await self.flush()
+
+        if self.in_flight:
+            await asyncio.wait(self.in_flight)
+            self.in_flight = set()
+
+        if self.failed_count > 0:
+            errors = [batch["error"] for batch in self.batches if batch["error"]]
+            raise ValueError(f"{self.failed_count} chunks not inserted: {errors[0]}")
+
+        return self.inserted_count
+
+    async def abort(self):
+
+        # the caller failed: nothing more is sent, the batches already sent are awaited
+        self.operations = []
+        self.operations_bytes = 0
+
+        if self.in_flight:
+            await asyncio.wait(self.in_flight)
+            self.in_flight = set()
@@ -0,0 +1,257 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemes import ProcessingJob
+from .enums.DataBaseEnum import DataBaseEnum
+from .enums.JobEnums import JobStatusEnum, JobAssetStatusEnum
+from bson.objectid import ObjectId
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+class JobModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.collection = self.db_client[DataBaseEnum.COLLECTION_JOB_NAME.value]
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client=db_client)
+        await instance.init_collection()
+        return instance
+
+    async def init_collection(self):
+        all_collections = await self.db_client.list_collection_names()
+        if DataBaseEnum.COLLECTION_JOB_NAME.value not in all_collections:
+            self.collection = self.db_client[DataBaseEnum.COLLECTION_JOB_NAME.value]
+            indexes = ProcessingJob.get_indexes()
+            for index in indexes:
+                await self.collection.create_index(
+                    index["key"],
+                    name=index["name"],
+                    unique=index["unique"],
+                    sparse=index.get("sparse", False)
+                )
+
+    async def create_job(self, job: ProcessingJob):
+
+        # job_running_project_id must be absent (not null) while the job is not running, see its sparse index
+        result = await self.collection.insert_one(job.dict(by_alias=True, exclude={"id", "job_running_project_id"}))
+        job.id = result.inserted_id
+
+        return job
+
+    async def get_job(self, job_id: str):
+
+        if not ObjectId.is_valid(job_id):
+            return None
+
+        record = await self.collection.find_one({
+            "_id": ObjectId(job_id) if isinstance(job_id, str) else job_id
+        })
+
+        if record is None:
+            return None
+
+        return ProcessingJob(**record)
+
+    async def claim_next_job(self, worker_id: str, lease_seconds: int):
+
+        r"""
+        Atomically takes the oldest queued job of a project without a running job, or a running job whose worker
+        stopped sending heartbeats (it is resumed before the queued jobs of its project).
+
+        A project runs one job at a time, so two jobs never process the same files at the same time
+        (the later one skips the files the earlier one already processed with the same parameters).
+        A running job holds job_running_project_id, its unique index rejects a second running job of the same
+        project even when two workers claim one at the same moment.
+
+        Returns:
+            ProcessingJob: The claimed job, or None when there is nothing to claim.
+        """
+
+        now = datetime.utcnow()
+
+        # the projects with a running job, alive or not: their queued jobs wait
+        busy_project_ids = set(await self.collection.distinct("job_project_id", {
+            "job_status": JobStatusEnum.RUNNING.value
+        }))
+        conflicting_job_ids = []
+
+        while True:
+
+            claimable = {"_id": {"$nin": conflicting_job_ids}, "$or": [
+                {
+                    "job_status": JobStatusEnum.RUNNING.value,
+                    "job_heartbeat_at": {"$lt": now - timedelta(seconds=lease_seconds)}
+                },
+                {
+                    "job_status": JobStatusEnum.QUEUED.value,
+                    "job_project_id": {"$nin": list(busy_project_ids)}
+                },
+            ]}
+
+            record = await self.collection.find_one(claimable, projection={"job_project_id": 1},
+                                                    sort=[("job_created_at", 1)])
+            if record is None:
+                return None
+
+            try:
+                record = await self.collection.find_one_and_update(
+                    {**claimable, "_id": record["_id"]},
+                    {"$set": {
+                        "job_status": JobStatusEnum.RUNNING.value,
+                        "job_worker_id": worker_id,
+                        "job_heartbeat_at": now,
+                        "job_running_project_id": record["job_project_id"],
+                    }},
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # another worker just started a job of this project
+                busy_project_ids.add(record["job_project_id"])
+                conflicting_job_ids.append(record["_id"])
+                continue
+
+            # None: another worker claimed this job in the meantime, look for the next one
+            if record is not None:
+                return ProcessingJob(**record)
+
+    async def get_queued_jobs_stats(self):
+
+        r"""
+        This function counts the jobs waiting to be claimed, per project.
+
+        Returns:
+            dict: project ObjectId -> {"queued_jobs": int, "oldest_queued_at": datetime}
+        """
+
+        records = await self.collection.aggregate([
+            {"$match": {"job_status": JobStatusEnum.QUEUED.value}},
+            {"$group": {
+                "_id": "$job_project_id",
+                "queued_jobs": {"$sum": 1},
+                "oldest_queued_at": {"$min": "$job_created_at"},
+            }},
+        ]).to_list(length=None)
+
+        return {
+            record["_id"]: {
+                "queued_jobs": record["queued_jobs"],
+                "oldest_queued_at": record["oldest_queued_at"],
+            }
+            for record in records
+        }
+
+    async def heartbeat(self, job_id: ObjectId, worker_id: str):
+
+        result = await self.collection.update_one(
+            {"_id": job_id, "job_worker_id": worker_id},
+            {"$set": {"job_heartbeat_at": datetime.utcnow()}}
+        )
+
+        # False means another worker took the job over
+        return result.matched_count == 1
+
+    # the job state is only updated by the worker holding the job: once another worker took it over (see heartbeat),
+    # the updates of the former one match nothing, instead of overwriting the progress of the new one.
+    # They return False in that case.
+
+    async def mark_reset_done(self, job_id: ObjectId, worker_id: str):
+
+        result = await self.collection.update_one(
+            {"_id": job_id, "job_worker_id": worker_id},
+            {"$set": {"job_reset_done": True}}
+        )
+
+        return result.matched_count == 1
+
+    async def mark_asset_running(self, job_id: ObjectId, worker_id: str, asset_id: ObjectId):
+
+        result = await self.collection.update_one(
+            {"_id": job_id, "job_worker_id": worker_id, "job_assets.asset_id": asset_id},
+            {"$set": {
+                "job_assets.$.status": JobAssetStatusEnum.RUNNING.value,
+                "job_heartbeat_at": datetime.utcnow(),
+            }}
+        )
+
+        return result.matched_count == 1
+
+    # the counters are only incremented by the first update of an asset (status guard): an asset processed again
+    # after a resume is not counted twice
+
+    async def mark_asset_done(self, job_id: ObjectId, worker_id: str, asset_id: ObjectId, inserted_chunks: int):
+
+        result = await self.collection.update_one(
+            {
+                "_id": job_id,
+                "job_worker_id": worker_id,
+                "job_assets": {"$elemMatch": {"asset_id": asset_id, "status": {"$ne": JobAssetStatusEnum.DONE.value}}},
+            },
+            {
+                "$set": {
+                    "job_assets.$.status": JobAssetStatusEnum.DONE.value,
+                    "job_assets.$.inserted_chunks": inserted_chunks,
+                    "job_heartbeat_at": datetime.utcnow(),
+                },
+                "$inc": {
+                    "job_processed_files": 1,
+                    "job_inserted_chunks": inserted_chunks,
+                },
+            }
+        )
+
+        return result.matched_count == 1
+
+    async def mark_asset_skipped(self, job_id: ObjectId, worker_id: str, asset_id: ObjectId):
+
+        result = await self.collection.update_one(
+            {
+                "_id": job_id,
+                "job_worker_id": worker_id,
+                "job_assets": {"$elemMatch": {"asset_id": asset_id, "status": {"$ne": JobAssetStatusEnum.SKIPPED.value}}},
+            },
+            {
+                "$set": {
+                    "job_assets.$.status": JobAssetStatusEnum.SKIPPED.value,
+                    "job_heartbeat_at": datetime.utcnow(),
+                },
+                "$inc": {"job_skipped_files": 1},
+            }
+        )
+
+        return result.matched_count == 1
+
+    async def mark_asset_failed(self, job_id: ObjectId, worker_id: str, asset_id: ObjectId, error: str):
+
+        result = await self.collection.update_one(
+            {"_id": job_id, "job_worker_id": worker_id, "job_assets.asset_id": asset_id},
+            {
+                "$set": {
+                    "job_assets.$.status": JobAssetStatusEnum.FAILED.value,
+                    "job_assets.$.error": error,
+                    "job_heartbeat_at": datetime.utcnow(),
+                },
+                "$push": {"job_errors": error},
+            }
+        )
+
+        return result.matched_count == 1
+
+    async def mark_job_finished(self, job_id: ObjectId, worker_id: str, job_status: str, error: str=None):
+
+        update = {
+            "$set": {
+                "job_status": job_status,
+                "job_finished_at": datetime.utcnow(),
+            },
+            # the next queued job of the project can run
+            "$unset": {"job_running_project_id": ""},
+        }
+
+        if error is not None:
+            update["$push"] = {"job_errors": error}
+
+        result = await self.collection.update_one({"_id": job_id, "job_worker_id": worker_id}, update)
+
+        return result.matched_count == 1
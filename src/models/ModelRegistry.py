@@ -0,0 +1,101 @@
+from .ProjectModel import ProjectModel
+from .AssetModel import AssetModel
+from .ChunkModel import ChunkModel
+from .JobModel import JobModel
+from .db_schemes import Project, Asset, DataChunk, ProcessingJob
+from helpers.config import get_settings
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger("uvicorn.error")
+
+# index errors left to the other app processes reconciling the same indexes at the same time, or to the administrator:
+# IndexNotFound (already dropped), IndexOptionsConflict (same key under another name), IndexKeySpecsConflict
+INDEX_CONFLICT_CODES = {27, 85, 86}
+
+
+class ModelRegistry:
+    r"""
+    One instance of every model for the whole app, created at startup (see main.py) and shared by the routes
+    (request.app.models) and the background workers.
+
+    The collections and their indexes are checked once here, instead of one list_collection_names() round-trip
+    per model per request with XModel.create_instance. The indexes are reconciled with the get_indexes()
+    definitions: the missing ones are created, the ones whose keys, uniqueness or sparseness changed are reported
+    (and rebuilt only with DB_REBUILD_CHANGED_INDEXES, a rebuild of a large collection blocks the startup),
+    and the ones not defined anywhere are only reported, they may have been added on purpose by hand.
+
+    Every app process runs this at startup: the conflicts with the others (an index already dropped, or created
+    under another name) are reported, they never stop the startup.
+    """
+
+    def __init__(self, db_client: object):
+        self.db_client = db_client
+
+        self.project_model = ProjectModel(db_client=db_client)
+        self.asset_model = AssetModel(db_client=db_client)
+        self.chunk_model = ChunkModel(db_client=db_client)
+        self.job_model = JobModel(db_client=db_client)
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client=db_client)
+        await instance.init_collections()
+        return instance
+
+    async def init_collections(self):
+
+        for model, scheme in [
+            (self.project_model, Project),
+            (self.asset_model, Asset),
+            (self.chunk_model, DataChunk),
+            (self.job_model, ProcessingJob),
+        ]:
+            await self.reconcile_indexes(collection=model.collection, indexes=scheme.get_indexes())
+
+    async def reconcile_indexes(self, collection, indexes: list):
+
+        # existing indexes by name (nothing when the collection does not exist yet, create_index creates it)
+        existing_indexes = {
+            index["name"]: index
+            async for index in collection.list_indexes()
+        }
+        existing_indexes.pop("_id_", None)
+
+        for index in indexes:
+            existing_index = existing_indexes.pop(index["name"], None)
+
+            if existing_index is not None:
+                existing_key = list(existing_index["key"].items())
+                if existing_key == [tuple(field) for field in index["key"]] \
+                        and existing_index.get("unique", False) == index["unique"] \
+                        and existing_index.get("sparse", False) == index.get("sparse", False):
+                    continue
+
+                if not get_settings().DB_REBUILD_CHANGED_INDEXES:
+                    logger.warning(f"{collection.name}: index {index['name']} differs from its definition, "
+                                   f"left as it is (set DB_REBUILD_CHANGED_INDEXES=true to rebuild it)")
+                    continue
+
+                logger.warning(f"{collection.name}: index {index['name']} changed, rebuilding it")
+                try:
+                    await collection.drop_index(index["name"])
+                except OperationFailure as e:
+                    if e.code not in INDEX_CONFLICT_CODES:
+                        raise
+                    logger.warning(f"{collection.name}: index {index['name']} not dropped: {e}")
+
+            try:
+                await collection.create_index(
+                    index["key"],
+                    name=index["name"],
+                    unique=index["unique"],
+                    sparse=index.get("sparse", False)
+                )
+            except OperationFailure as e:
+                if e.code not in INDEX_CONFLICT_CODES:
+                    raise
+                logger.warning(f"{collection.name}: index {index['name']} not created: {e}")
+
+        for index_name in existing_indexes:
+            logger.warning(f"{collection.name}: index {index_name} is not defined in the models, left as it is")
@@ -1,12 +1,22 @@
 from .BaseDataModel import BaseDataModel
 from .db_schemes import Project
 from .enums.DataBaseEnum import DataBaseEnum
+from .enums.PaginationEnums import CountModeEnum
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from helpers.cache import TTLCache
+import asyncio
 
 class ProjectModel(BaseDataModel):
 
     def __init__(self, db_client: object):
         super().__init__(db_client=db_client)
         self.collection = self.db_client[DataBaseEnum.COLLECTION_PROJECT_NAME.value]
+        self.project_cache = TTLCache(
+            max_size=self.app_settings.PROJECT_CACHE_SIZE,
+            ttl_seconds=self.app_settings.PROJECT_CACHE_TTL_SECONDS
+        )
         
     @classmethod
     async def create_instance(cls, db_client: object):
@@ -37,36 +47,157 @@ class ProjectModel(BaseDataModel):
 
     async def get_project_or_create_one(self, project_id: str):
 
+        # hot projects are resolved without any database call
+        project = self.project_cache.get(project_id)
+        if project is not None:
+            return project
+
+        # validate the project_id before reaching the database
+        project = Project(project_id=project_id)
+
+        # a single atomic upsert: concurrent first uploads to a new project all get the same project
+        try:
+            record = await self.collection.find_one_and_update(
+                {"project_id": project_id},
+                {"$setOnInsert": project.dict(by_alias=True, exclude_unset=True)},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # two upserts inserted at the same time, the unique index kept the other one
+            record = await self.collection.find_one({
+                "project_id": project_id
+            })
+
+        project = Project(**record)
+        self.project_cache.set(project_id, project)
+
+        return project
+
+
+    async def get_project(self, project_id: str):
+
+        project = self.project_cache.get(project_id)
+        if project is not None:
+            return project
+
+        # read only: unlike get_project_or_create_one, an unknown project is not created (and not cached)
         record = await self.collection.find_one({
             "project_id": project_id
         })
 
         if record is None:
-            # create new project
-            project = Project(project_id=project_id)
-            project = await self.create_project(project=project)
+            return None
+
+        project = Project(**record)
+        self.project_cache.set(project_id, project)
+
+        return project
+
+
+    def get_project_cache_stats(self):
+
+        # projects are never changed nor deleted by the app, the cache only has to be bounded (see TTLCache)
+        return self.project_cache.get_stats()
+
+
+    async def get_project_by_id(self, project_id: ObjectId):
+
+        record = await self.collection.find_one({
+            "_id": project_id
+        })
+
+        if record is None:
+            return None
 
-            return project
-        
         return Project(**record)
 
 
-    # get all projects with pagination
-    async def get_all_projects(self, page: int=1, page_size: int=10):
+    async def get_project_ids_by_ids(self, ids: list):
 
-        # count total number of documents
-        total_documents = await self.collection.count_documents({})
+        # ObjectId -> project_id of several projects, one round-trip
+        records = await self.collection.find(
+            {"_id": {"$in": list(ids)}},
+            projection={"project_id": 1}
+        ).to_list(length=None)
 
-        # calculate total number of pages
-        total_pages = total_documents // page_size
-        if total_documents % page_size > 0:
-            total_pages += 1
+        return {
+            record["_id"]: record["project_id"]
+            for record in records
+        }
+
+
+    # get all projects with pagination
+    async def get_all_projects(self, page: int=1, page_size: int=10, count_mode: str=CountModeEnum.EXACT.value):
+
+        r"""
+        Offset pagination: the database still walks the skipped projects, deep pages get slower,
+        prefer get_projects_page for large collections.
+        """
 
         cursor = self.collection.find().skip( (page-1) * page_size ).limit(page_size)
-        projects = []
-        async for document in cursor:
-            projects.append(
-                Project(**document)
-            )
+
+        # the count and the page are read at the same time
+        total_documents, records = await asyncio.gather(
+            self.count_projects(count_mode=count_mode),
+            cursor.to_list(length=page_size)
+        )
+
+        projects = [
+            Project(**record)
+            for record in records
+        ]
+
+        # calculate total number of pages
+        total_pages = None
+        if total_documents is not None:
+            total_pages = total_documents // page_size
+            if total_documents % page_size > 0:
+                total_pages += 1
 
         return projects, total_pages
+
+
+    async def get_projects_page(self, page_size: int=10, after: ObjectId=None, count_mode: str=CountModeEnum.NONE.value):
+
+        r"""
+        Keyset pagination by _id: every page starts right after the last project of the previous one,
+        an _id index seek instead of skipping the previous pages (constant time at any depth).
+
+        Args:
+            page_size (int, optional): The number of projects per page.
+            after (ObjectId, optional): The _id of the last project of the previous page. Defaults to None (first page).
+            count_mode (str, optional): One of CountModeEnum values. Defaults to none.
+
+        Returns:
+            tuple: (projects, next_after, total_documents), next_after is None on the last page
+                   and total_documents is None when not counted.
+        """
+
+        query = {} if after is None else {"_id": {"$gt": after}}
+        cursor = self.collection.find(query).sort("_id", 1).limit(page_size)
+
+        total_documents, records = await asyncio.gather(
+            self.count_projects(count_mode=count_mode),
+            cursor.to_list(length=page_size)
+        )
+
+        projects = [
+            Project(**record)
+            for record in records
+        ]
+
+        next_after = projects[-1].id if len(projects) == page_size else None
+
+        return projects, next_after, total_documents
+
+
+    async def count_projects(self, count_mode: str):
+
+        if count_mode == CountModeEnum.ESTIMATED.value:
+            return await self.collection.estimated_document_count()
+
+        if count_mode == CountModeEnum.EXACT.value:
+            return await self.collection.count_documents({})
+
+        return None
@@ -2,3 +2,5 @@ from .enums.ResponseEnums import ResponseSignal
 from .enums.ProcessingEnums import ProcessingEnum
 from .ProjectModel import ProjectModel
 from .ChunkModel import ChunkModel
+from .JobModel import JobModel
+from .ModelRegistry import ModelRegistry
@@ -1,3 +1,4 @@
 from .project import Project
 from .data_chunk import DataChunk
 from .asset import Asset
+from .processing_job import ProcessingJob
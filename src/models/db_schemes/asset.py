@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field
 from typing import Optional
 from bson.objectid import ObjectId
 from datetime import datetime
@@ -8,9 +8,14 @@ class Asset(BaseModel):
     asset_project_id: ObjectId
     asset_type: str = Field(..., min_length=1)
     asset_name: str = Field(..., min_length=1)
-    asset_size: int = Field(ge=0, default=None)
+    asset_size: int = Field(ge=0, default=None)                 # logical size of the file in bytes
+    asset_stored_size: int = Field(ge=0, default=None)          # size on disk (smaller than asset_size when the blob is compressed)
+    asset_hash: Optional[str] = Field(default=None, min_length=64, max_length=64) # SHA-256 of the content, points to the blob in the blob store
     asset_config: dict = Field(default=None)
-    asset_pushed_at: datetime = Field(default=datetime.utcnow)
+    asset_chunking: dict = Field(default=None)                  # state of the stored chunks: asset_hash, chunk_size, overlap_size, generation, chunks_pending
+    asset_pushed_at: datetime = Field(default_factory=datetime.utcnow)
+    asset_lock: Optional[str] = None                            # upload sessions: token of the request writing to it
+    asset_lock_until: Optional[datetime] = None                 # upload sessions: end of the lock, then the last activity
 
     class Config:
         arbitrary_types_allowed = True
@@ -34,4 +39,30 @@ class Asset(BaseModel):
                 "name": "asset_project_id_name_index_1",
                 "unique": True
             },
-        ]
\ No newline at end of file
+            {
+                "key": [
+                    ("asset_project_id", 1),
+                    ("asset_hash", 1)
+                ],
+                "name": "asset_project_id_hash_index_1",
+                "unique": False
+            },
+            {
+                # keyset pagination of the project assets (AssetModel.iter_assets)
+                "key": [
+                    ("asset_project_id", 1),
+                    ("_id", 1)
+                ],
+                "name": "asset_project_id_id_index_1",
+                "unique": False
+            },
+            {
+                # expired upload sessions (AssetModel.delete_expired_upload_sessions)
+                "key": [
+                    ("asset_type", 1),
+                    ("asset_lock_until", 1)
+                ],
+                "name": "asset_type_lock_until_index_1",
+                "unique": False
+            },
+        ]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field
 from typing import Optional
 from bson.objectid import ObjectId
 
@@ -9,10 +9,30 @@ class DataChunk(BaseModel):
     chunk_order: int = Field(..., gt=0)
     chunk_project_id: ObjectId
     chunk_asset_id: ObjectId
+    chunk_generation: Optional[ObjectId] = None   # processing run that produced the chunk, see Asset.asset_chunking
+    chunk_profile: Optional[str] = None   # chunking profile (ProcessRequest.chunking_profiles), None for a single configuration
+    chunk_committed: Optional[bool] = None   # False until its generation is committed, see ChunkModel.commit_generation
 
     class Config:
         arbitrary_types_allowed = True
 
+    @staticmethod
+    def make_record(chunk_text: str, chunk_metadata: dict, chunk_order: int, chunk_project_id: ObjectId,
+                    chunk_asset_id: ObjectId, chunk_generation: ObjectId=None, chunk_profile: str=None,
+                    chunk_committed: bool=None):
+        # BSON ready document for trusted internal data (Example: the splitter output), no model in between.
+        # Unlike DataChunk(...).dict(by_alias=True, exclude_unset=True), every field is written,
+        # chunk_generation, chunk_profile and chunk_committed included when they are None
+        return {
+            "chunk_text": chunk_text,
+            "chunk_metadata": chunk_metadata,
+            "chunk_order": chunk_order,
+            "chunk_project_id": chunk_project_id,
+            "chunk_asset_id": chunk_asset_id,
+            "chunk_generation": chunk_generation,
+            "chunk_profile": chunk_profile,
+            "chunk_committed": chunk_committed,
+        }
 
     @classmethod            # decorator for static method
     def get_indexes(cls):
@@ -23,5 +43,33 @@ class DataChunk(BaseModel):
                 ],
                 "name": "chunk_project_id_index_1",
                 "unique": False
+            },
+            {
+                "key": [
+                    ("chunk_project_id", 1),
+                    ("chunk_asset_id", 1)
+                ],
+                "name": "chunk_project_id_asset_id_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("chunk_project_id", 1),
+                    ("chunk_profile", 1)
+                ],
+                "name": "chunk_project_id_profile_index_1",
+                "unique": False
+            },
+            {
+                # keyset pagination (ChunkModel.get_chunks_page): the filter and the whole sort key,
+                # _id breaks the ties between chunk profiles and generations
+                "key": [
+                    ("chunk_project_id", 1),
+                    ("chunk_asset_id", 1),
+                    ("chunk_order", 1),
+                    ("_id", 1)
+                ],
+                "name": "chunk_project_id_asset_id_order_index_1",
+                "unique": False
             }
         ]
@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from bson.objectid import ObjectId
+from datetime import datetime
+
+class ProcessingJob(BaseModel):
+    id: Optional[ObjectId] = Field(None, alias="_id")
+    job_project_id: ObjectId
+    job_status: str = Field(..., min_length=1)
+    job_config: dict                                        # chunk_size, overlap_size, do_reset
+    job_assets: list                                        # [{asset_id, asset_name, status, inserted_chunks, error}]
+    job_processed_files: int = Field(ge=0, default=0)
+    job_skipped_files: int = Field(ge=0, default=0)
+    job_inserted_chunks: int = Field(ge=0, default=0)
+    job_errors: list = Field(default_factory=list)
+    job_reset_done: bool = False                            # do_reset is applied only once, even if the job is resumed
+    job_worker_id: Optional[str] = None                     # the worker holding the job
+    job_heartbeat_at: Optional[datetime] = None             # refreshed while the job runs, a stale heartbeat means the worker died
+    job_running_project_id: Optional[ObjectId] = None       # set (to job_project_id) only while the job runs, see JobModel.claim_next_job
+    job_created_at: datetime = Field(default_factory=datetime.utcnow)
+    job_finished_at: Optional[datetime] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def get_indexes(cls):
+
+        return [
+            {
+                "key": [
+                    ("job_status", 1),
+                    ("job_created_at", 1)
+                ],
+                "name": "job_status_created_at_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("job_project_id", 1)
+                ],
+                "name": "job_project_id_index_1",
+                "unique": False
+            },
+            {
+                # one running job per project: the jobs not running have no job_running_project_id (sparse)
+                "key": [
+                    ("job_running_project_id", 1)
+                ],
+                "name": "job_running_project_id_index_1",
+                "unique": True,
+                "sparse": True
+            },
+        ]
@@ -3,4 +3,5 @@ from enum import Enum
 class AssetTypeEnum(Enum):
 
     FILE = "file"
+    UPLOAD = "upload"  # resumable upload session, becomes a FILE once finalized
     
\ No newline at end of file
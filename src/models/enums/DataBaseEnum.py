@@ -5,3 +5,4 @@ class DataBaseEnum(Enum):
     COLLECTION_PROJECT_NAME = "projects"
     COLLECTION_CHUNK_NAME = "chunks"
     COLLECTION_ASSET_NAME = "assets"
+    COLLECTION_JOB_NAME = "jobs"
@@ -0,0 +1,18 @@
+from enum import Enum
+
+class JobStatusEnum(Enum):
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    PARTIAL = "partial"      # completed, but some files failed (see job_errors)
+    FAILED = "failed"        # no file could be processed, or the job itself failed
+
+
+class JobAssetStatusEnum(Enum):
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    SKIPPED = "skipped"  # the stored chunks are up to date (same content and chunking parameters)
+    FAILED = "failed"
@@ -0,0 +1,8 @@
+from enum import Enum
+
+class CountModeEnum(Enum):
+
+    # How the total of a paginated listing is computed
+    NONE = "none"             # no total, the cheapest
+    ESTIMATED = "estimated"   # estimated_document_count: collection metadata, constant time, may be off after a crash
+    EXACT = "exact"           # count_documents: scans the _id index, run concurrently with the page read
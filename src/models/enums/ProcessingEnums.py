@@ -5,3 +5,28 @@ class ProcessingEnum(Enum):
     # Supported file types (extensions)
     TXT = ".txt"
     PDF = ".pdf"
+
+
+class SplitterEnum(Enum):
+
+    # Text splitters (ProcessRequest.splitter), both give the same chunks
+    LANGCHAIN = "langchain"     # langchain RecursiveCharacterTextSplitter
+    NATIVE = "native"           # helpers.text_splitter.RecursiveTextSplitter, faster
+
+
+class PdfExtractorEnum(Enum):
+
+    # PDF text extraction (ProcessRequest.pdf_extractor)
+    LANGCHAIN = "langchain"             # same pages and metadata as langchain PyMuPDFLoader
+    NATIVE = "native"                   # PyMuPDF page text, the page number is the only metadata
+    NATIVE_BLOCKS = "native_blocks"     # PyMuPDF text blocks in reading order, one paragraph per block
+
+
+class LengthUnitEnum(Enum):
+
+    # Unit of chunk_size / overlap_size (ProcessRequest.length_unit)
+    CHARACTERS = "characters"
+    # tokens of PROCESSING_TOKENIZER, always split with the native splitter. The sizes are approximate: a chunk length
+    # is the sum of the token lengths of its pieces (a token straddling two pieces is counted in both), measured on
+    # the window tokenization: tokenized alone, a chunk may differ from chunk_size by a few tokens, so does the overlap
+    TOKENS = "tokens"
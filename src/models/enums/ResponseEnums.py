@@ -5,12 +5,34 @@ class ResponseSignal(Enum):
     FILE_TYPE_NOT_SUPPORTED = "File type not supported"
 
     FILE_SIZE_EXCEEDED = "File size exceeded"
+
+    FILE_EMPTY = "File is empty"
+
+    FILE_TYPE_MISMATCH = "File type does not match the file extension"
     
     FILE_VALIDATED_SUCCESS = "File validate successfully"
     
     FILE_UPLOAD_SUCCESS = "File uploaded successfully"
     
     FILE_UPLOAD_FAILED = "File upload failed"
+
+    FILE_ALREADY_EXISTS = "File already exists"
+
+    FILE_HASH_INVALID = "Invalid file hash"
+
+    FILE_HASH_NOT_FOUND = "No file found with this hash"
+
+    UPLOAD_SESSION_CREATED = "Upload session created"
+
+    UPLOAD_SESSION_NOT_FOUND = "No upload session found with this id"
+
+    UPLOAD_SESSION_BUSY = "Upload session is used by another request"
+
+    UPLOAD_OFFSET_MISMATCH = "Upload offset does not match the committed offset"
+
+    UPLOAD_RANGE_SUCCESS = "Upload range saved successfully"
+
+    UPLOAD_INCOMPLETE = "Upload is not complete"
     
     FILE_PROCESS_FAILED = "Processing failed"
     
@@ -20,7 +42,29 @@ class ResponseSignal(Enum):
     
     NO_FILES_ERROR = "No files found"
 
+    TOO_MANY_FILES_ERROR = "Too many files for one processing job, process them by file_id"
+
     PROCESSING_FAILED = "Processing failed"
     
     PROCESSING_SUCCESS = "Processing success"
-    
\ No newline at end of file
+
+    PROCESSING_QUEUED = "Processing queued"
+
+    JOB_ID_ERROR = "No job found with this id"
+
+    PROJECT_NOT_FOUND_ERROR = "No project found with this id"
+
+    PAGE_CURSOR_INVALID = "Invalid cursor"
+
+    CHUNK_FIELDS_INVALID = "Invalid chunk fields"
+
+    CHUNKS_LISTED = "Chunks listed successfully"
+
+    EXPORT_COMPRESSION_NOT_SUPPORTED = "Export compression not supported"
+
+
+    PROJECTS_LISTED = "Projects listed successfully"
+
+    ASSET_FIELDS_INVALID = "Invalid asset fields"
+
+    ASSETS_LISTED = "Assets listed successfully"
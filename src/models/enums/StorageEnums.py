@@ -0,0 +1,8 @@
+from enum import Enum
+
+class CompressionEnum(Enum):
+
+    # How the blobs are stored on disk (FILE_STORAGE_COMPRESSION)
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
@@ -1,17 +1,25 @@
-import os
-import aiofiles
-from fastapi import APIRouter, Depends, UploadFile, status, Request     
-from fastapi.responses import JSONResponse
+import json
+import time
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, UploadFile, status, Request, Header, Query     
+from fastapi.responses import JSONResponse, StreamingResponse
 from helpers.config import Settings, get_settings
-from controllers import DataController, ProjectController, ProcessController
+from helpers.pagination import encode_cursor, decode_cursor
+from helpers.compression import COMPRESSION_EXTENSIONS, get_compressor
+from controllers import DataController
 from models import ResponseSignal
 import logging
-from .schemes.data import ProcessRequest
-from models import ProjectModel
-from models import ChunkModel
+from .schemes.data import ProcessRequest, UploadCheckRequest, UploadSessionRequest
 from models.AssetModel import AssetModel
-from models.db_schemes import DataChunk, Asset
+from models.db_schemes import Asset, ProcessingJob
 from models.enums.AssetTypeEnum import AssetTypeEnum
+from models.enums.StorageEnums import CompressionEnum
+from models.enums.PaginationEnums import CountModeEnum
+from models.enums.JobEnums import JobStatusEnum, JobAssetStatusEnum
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -28,9 +36,7 @@ async def upload_data(request: Request,
                       file: UploadFile,  
                       app_settings: Settings = Depends(get_settings)):
 
-    project_model = await ProjectModel.create_instance(
-        db_client=request.app.db_client
-        )    
+    project_model = request.app.models.project_model
     
     project = await project_model.get_project_or_create_one(
         project_id=project_id
@@ -48,27 +54,20 @@ async def upload_data(request: Request,
             )
     
     """
-    Now if the file is valid, we need to save the file using it's id (project_id):
-    assets/files/project_id/file_name
-    for example if the file id (project_id) is 1, then the file will be saved at assets/files/1/file_name
+    Now if the file is valid, we need to save the file content in the blob store:
+    assets/blobs/<hash[:2]>/<hash[2:4]>/<hash>
+    the same content is stored only once, whatever the project or the number of uploads.
     """
     
-    # Get the project directory, or create it if it does not exist
-    # project_dir_path = ProjectController().get_project_path(project_id=project_id)
-    
-    # Generate a unique file path
-    # Example output: f:\LLM\LLMProjects\RAG-APP-1\src\assets\files\1\mw1178534nx8_Projectname.txt
-    file_path, file_id = data_controller.generate_unique_filepath(  # file_id is the file name
-        orig_file_name=file.filename, 
-        project_id=project_id
-        )
-    
+    # Generate a unique file id (asset name) | Example output: mw1178534nx8_Projectname.txt
+    file_id = data_controller.generate_file_id(orig_file_name=file.filename)
     
     try:
-        # Save the file in the project directory
-        async with aiofiles.open(file_path, "wb") as f:  # Open the destination file in binary write mode
-            while chunk := await file.read(app_settings.FILE_DEFAULT_CHUNK_SIZE):  # Read 512 KB (512,000 bytes) from the uploaded file
-                await f.write(chunk)  # Write the 512 KB chunk to the destination file
+        # Save the file in the blob store while hashing it (512 KB at a time)
+        is_valid, result_signal, blob = await data_controller.write_blob_stream(
+            chunks=data_controller.iter_upload_file(file=file),
+            max_size=data_controller.get_max_file_size()
+            )
                 
     except Exception as e:
         
@@ -78,17 +77,45 @@ async def upload_data(request: Request,
             content={"signal": ResponseSignal.FILE_UPLOAD_FAILED.value}, 
             status_code=status.HTTP_400_BAD_REQUEST
             )
+
+    if not is_valid:
+        return JSONResponse(
+            content={"signal": result_signal},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
         
+    return await register_uploaded_blob(request=request, project=project, file_id=file_id, blob=blob)
+
+
+async def register_uploaded_blob(request: Request, project, file_id: str, blob: dict):
+
     # store the assets into the database
-    asset_model = await AssetModel.create_instance(
-        db_client=request.app.db_client
+    asset_model = request.app.models.asset_model
+
+    # the same content was already uploaded to this project, reuse its asset (no new processing needed)
+    asset_record = await asset_model.get_asset_by_hash(
+        asset_project_id=project.id,
+        asset_hash=blob["file_hash"]
     )
 
+    if asset_record is not None:
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.FILE_ALREADY_EXISTS.value,
+                "file_id": asset_record.asset_name,
+                "file_id__": str(asset_record.id),
+                "file_hash": asset_record.asset_hash,
+                "project_id": str(project.id)
+                }
+        )
+
     asset_resource = Asset(
         asset_project_id=project.id,
         asset_type=AssetTypeEnum.FILE.value,
         asset_name=file_id,
-        asset_size=os.path.getsize(file_path)
+        asset_size=blob["file_size"],
+        asset_stored_size=blob["stored_size"],
+        asset_hash=blob["file_hash"]
     )
 
     asset_record = await asset_model.create_asset(asset=asset_resource)
@@ -98,36 +125,592 @@ async def upload_data(request: Request,
                 "signal": ResponseSignal.FILE_UPLOAD_SUCCESS.value,
                 "file_id": file_id,
                 "file_id__": str(asset_record.id),
-                "file_path": file_path,
+                "file_hash": blob["file_hash"],
+                "file_path": blob["file_path"],
                 "project_id": str(project.id)
                 }, 
             
             # status_code=status.HTTP_200_OK   # default
         )
+
+
+# endpoint to receive the raw file as the request body, without multipart parsing and temporary files
+@data_router.post("/upload/stream/{project_id}")
+async def upload_stream(request: Request, project_id: str, file_name: str,
+                        app_settings: Settings = Depends(get_settings)):
+
+    """
+    The body is written directly from request.stream() to the blob store: no SpooledTemporaryFile, no second copy.
+    The file type is detected from the magic bytes of the first block, and must match the extension of file_name.
+    The size is checked as the bytes arrive, so an invalid upload is aborted without reading the rest of the body.
+    Empty bodies are rejected.
+    Example: curl -X POST --data-binary @file.pdf "http://localhost:5000/api/v1/data/upload/stream/1?file_name=file.pdf"
+    """
+
+    data_controller = DataController()
+
+    # reject early when the client announces a body that is too large
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > data_controller.get_max_file_size():
+        return JSONResponse(
+            content={"signal": ResponseSignal.FILE_SIZE_EXCEEDED.value},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    # the processing picks the loader from the extension: it must be supported, and match the content (checked below)
+    expected_type = data_controller.get_expected_content_type(file_name=file_name)
+    if expected_type is None:
+        return JSONResponse(
+            content={"signal": ResponseSignal.FILE_TYPE_NOT_SUPPORTED.value},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    project_model = request.app.models.project_model
+    
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+        )
+
+    file_id = data_controller.generate_file_id(orig_file_name=file_name)
+
+    try:
+        is_valid, result_signal, blob = await data_controller.write_blob_stream(
+            chunks=request.stream(),
+            max_size=data_controller.get_max_file_size(),
+            allowed_types=app_settings.FILE_ALLOWED_TYPES,
+            expected_type=expected_type
+            )
+
+    except Exception as e:
+
+        logger.error(f"An error occurred while saving the file: {e}")
+
+        return JSONResponse(
+            content={"signal": ResponseSignal.FILE_UPLOAD_FAILED.value}, 
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    if not is_valid:
+        return JSONResponse(
+            content={"signal": result_signal},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    return await register_uploaded_blob(request=request, project=project, file_id=file_id, blob=blob)
+
+
+# endpoint to ask the server "does this project already have this content?" before sending the bytes
+@data_router.post("/upload/check/{project_id}")
+async def upload_check(request: Request, project_id: str, check_request: UploadCheckRequest):
+
+    """
+    Only the files of the same project are matched: a hash alone is no proof that the client has the content,
+    registering a blob uploaded by another project from its hash would tell (and give) that content to anyone
+    knowing the hash. The content of the other projects is still stored once, when the bytes are uploaded.
+    """
+
+    data_controller = DataController()
+
+    if not data_controller.is_valid_file_hash(file_hash=check_request.file_hash):
+        return JSONResponse(
+            content={"signal": ResponseSignal.FILE_HASH_INVALID.value},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    project_model = request.app.models.project_model
+
+    # a read only check: an unknown project is not created, it has no files
+    project = await project_model.get_project(project_id=project_id)
+
+    if project is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.PROJECT_NOT_FOUND_ERROR.value,
+            }
+        )
+
+    asset_model = request.app.models.asset_model
+
+    asset_record = await asset_model.get_asset_by_hash(
+        asset_project_id=project.id,
+        asset_hash=check_request.file_hash
+    )
+
+    if asset_record is not None:
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.FILE_ALREADY_EXISTS.value,
+                "exists": True,
+                "file_id": asset_record.asset_name,
+                "file_id__": str(asset_record.id),
+                "project_id": str(project.id)
+                }
+        )
+
+    # the client has to upload the bytes (whether another project has them or not)
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.FILE_HASH_NOT_FOUND.value,
+            "exists": False
+            },
+        status_code=status.HTTP_404_NOT_FOUND
+        )
     
     
+####################### Batch Upload #######################
+
+
+@data_router.post("/upload/batch/{project_id}")
+async def upload_batch(request: Request, project_id: str, files: List[UploadFile],
+                       app_settings: Settings = Depends(get_settings)):
+
+    # resolve the project and the asset collection once for the whole batch
+    project_model = request.app.models.project_model
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+        )
+
+    asset_model = request.app.models.asset_model
+
+    data_controller = DataController()
+    semaphore = asyncio.Semaphore(app_settings.FILE_UPLOAD_CONCURRENCY)
+
+    async def save_file(file: UploadFile):
+
+        is_valid, result_signal = data_controller.validate_uploaded_file(file=file)
+        if not is_valid:
+            return {"file_name": file.filename, "signal": result_signal}
+
+        async with semaphore:
+            try:
+                is_valid, result_signal, blob = await data_controller.write_blob_stream(
+                    chunks=data_controller.iter_upload_file(file=file),
+                    max_size=data_controller.get_max_file_size()
+                    )
+            except Exception as e:
+                logger.error(f"An error occurred while saving the file {file.filename}: {e}")
+                return {"file_name": file.filename, "signal": ResponseSignal.FILE_UPLOAD_FAILED.value}
+
+        if not is_valid:
+            return {"file_name": file.filename, "signal": result_signal}
+
+        return {"file_name": file.filename, "signal": ResponseSignal.FILE_UPLOAD_SUCCESS.value, "blob": blob}
+
+    results = await asyncio.gather(*[
+        save_file(file=file)
+        for file in files
+    ])
+
+    # one query for all the hashes already known in this project
+    existing_assets = await asset_model.get_assets_by_hashes(
+        asset_project_id=project.id,
+        asset_hashes={result["blob"]["file_hash"] for result in results if "blob" in result}
+    )
+
+    new_assets = {}
+    for file, result in zip(files, results):
+
+        blob = result.pop("blob", None)
+        if blob is None:
+            continue
+
+        result["file_hash"] = blob["file_hash"]
+
+        # already in the project, or sent twice in the same batch
+        if blob["file_hash"] in existing_assets or blob["file_hash"] in new_assets:
+            result["signal"] = ResponseSignal.FILE_ALREADY_EXISTS.value
+            continue
+
+        new_assets[blob["file_hash"]] = Asset(
+            asset_project_id=project.id,
+            asset_type=AssetTypeEnum.FILE.value,
+            asset_name=data_controller.generate_file_id(orig_file_name=file.filename),
+            asset_size=blob["file_size"],
+            asset_stored_size=blob["stored_size"],
+            asset_hash=blob["file_hash"]
+        )
+
+    # one insert for all the new assets
+    await asset_model.insert_many_assets(assets=list(new_assets.values()))
+    existing_assets.update(new_assets)
+
+    for result in results:
+        asset_record = existing_assets.get(result.get("file_hash"))
+        if asset_record is not None:
+            result["file_id"] = asset_record.asset_name
+            result["file_id__"] = str(asset_record.id)
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.FILE_UPLOAD_SUCCESS.value,
+            "project_id": str(project.id),
+            "uploaded_files": len(new_assets),
+            "files": results
+            }
+    )
+
+
+####################### Resumable Upload #######################
+"""
+Resumable upload protocol for large files:
+1) POST   /upload/session/{project_id}                        -> create the session, returns the upload_id
+2) PATCH  /upload/session/{project_id}/{upload_id}            -> send a byte range, the `Upload-Offset` header is the offset of its first byte
+3) GET    /upload/session/{project_id}/{upload_id}            -> get the committed offset (resume from there after a dropped connection)
+4) POST   /upload/session/{project_id}/{upload_id}/finalize   -> hash the file, copy it to the blob store (compressed, see FILE_STORAGE_COMPRESSION) and turn the session into a file asset
+A session is used by one PATCH / finalize at a time (409 for the others), and is deleted with its bytes
+after UPLOAD_SESSION_TTL_SECONDS without activity (see workers/UploadSessionCleaner).
+"""
+
+
+@data_router.post("/upload/session/{project_id}")
+async def create_upload_session(request: Request, project_id: str, session_request: UploadSessionRequest):
+
+    data_controller = DataController()
+    is_valid, result_signal = data_controller.validate_file_properties(
+        content_type=session_request.content_type,
+        file_size=session_request.file_size
+    )
+
+    if not is_valid:
+        return JSONResponse(
+            content={"signal": result_signal},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    # same rules as upload_stream: the extension must be supported and match the declared type,
+    # the content itself is checked from its magic bytes when the session is finalized
+    expected_type = data_controller.get_expected_content_type(file_name=session_request.file_name)
+    if expected_type is None:
+        return JSONResponse(
+            content={"signal": ResponseSignal.FILE_TYPE_NOT_SUPPORTED.value},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    if session_request.content_type != expected_type:
+        return JSONResponse(
+            content={"signal": ResponseSignal.FILE_TYPE_MISMATCH.value},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    project_model = request.app.models.project_model
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+        )
+
+    asset_model = request.app.models.asset_model
+
+    file_id = data_controller.generate_file_id(orig_file_name=session_request.file_name)
+
+    asset_record = await asset_model.create_asset(asset=Asset(
+        asset_project_id=project.id,
+        asset_type=AssetTypeEnum.UPLOAD.value,
+        asset_name=file_id,
+        asset_size=session_request.file_size,
+        asset_config={"content_type": session_request.content_type}
+    ))
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.UPLOAD_SESSION_CREATED.value,
+            "upload_id": str(asset_record.id),
+            "file_id": file_id,
+            "upload_offset": 0,
+            "file_size": session_request.file_size,
+            "project_id": str(project.id)
+            }
+    )
+
+
+async def get_upload_session(request: Request, project_id: str, upload_id: str):
+
+    project_model = request.app.models.project_model
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+        )
+
+    asset_model = request.app.models.asset_model
+
+    asset_record = await asset_model.get_asset_by_id(
+        asset_project_id=project.id,
+        asset_id=upload_id
+    )
+
+    if asset_record is None or asset_record.asset_type != AssetTypeEnum.UPLOAD.value:
+        return project, asset_model, None
+
+    return project, asset_model, asset_record
+
+
+async def keep_upload_session_lock(chunks, asset_model: AssetModel, asset_id: ObjectId, lock_token: str,
+                                   lock_seconds: int):
+
+    # a long range keeps the session lock: refreshed every third of its duration, while the bytes arrive
+    refreshed_at = time.monotonic()
+
+    async for chunk in chunks:
+
+        if time.monotonic() - refreshed_at > lock_seconds / 3:
+            if not await asset_model.refresh_upload_session_lock(asset_id=asset_id, lock_token=lock_token,
+                                                                 lock_seconds=lock_seconds):
+                raise RuntimeError("the upload session lock expired")
+            refreshed_at = time.monotonic()
+
+        yield chunk
+
+
+@data_router.get("/upload/session/{project_id}/{upload_id}")
+async def upload_session_status(request: Request, project_id: str, upload_id: str):
+
+    _, _, asset_record = await get_upload_session(
+        request=request, project_id=project_id, upload_id=upload_id
+    )
+
+    if asset_record is None:
+        return JSONResponse(
+            content={"signal": ResponseSignal.UPLOAD_SESSION_NOT_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND
+            )
+
+    return JSONResponse(
+        content={
+            "upload_id": upload_id,
+            "file_id": asset_record.asset_name,
+            "upload_offset": DataController().get_upload_offset(upload_id=upload_id),
+            "file_size": asset_record.asset_size
+            }
+    )
+
+
+@data_router.patch("/upload/session/{project_id}/{upload_id}")
+async def upload_session_range(request: Request, project_id: str, upload_id: str,
+                               upload_offset: int = Header(..., alias="Upload-Offset"),
+                               app_settings: Settings = Depends(get_settings)):
+
+    _, asset_model, asset_record = await get_upload_session(
+        request=request, project_id=project_id, upload_id=upload_id
+    )
+
+    if asset_record is None:
+        return JSONResponse(
+            content={"signal": ResponseSignal.UPLOAD_SESSION_NOT_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND
+            )
+
+    # two ranges written at the same offset would both be appended: one request at a time
+    lock_token = await asset_model.lock_upload_session(
+        asset_id=asset_record.id,
+        lock_seconds=app_settings.UPLOAD_SESSION_LOCK_SECONDS
+    )
+
+    if lock_token is None:
+        return JSONResponse(
+            content={"signal": ResponseSignal.UPLOAD_SESSION_BUSY.value},
+            status_code=status.HTTP_409_CONFLICT
+            )
+
+    data_controller = DataController()
+
+    try:
+        is_valid, result_signal, committed_offset = await data_controller.write_upload_range(
+            upload_id=upload_id,
+            offset=upload_offset,
+            total_size=asset_record.asset_size,
+            chunks=keep_upload_session_lock(
+                chunks=request.stream(),
+                asset_model=asset_model,
+                asset_id=asset_record.id,
+                lock_token=lock_token,
+                lock_seconds=app_settings.UPLOAD_SESSION_LOCK_SECONDS
+            )
+        )
+
+    except Exception as e:
+
+        # the bytes received before the error are kept, the client resumes from the committed offset
+        logger.error(f"An error occurred while saving the upload range: {e}")
+
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.FILE_UPLOAD_FAILED.value,
+                "upload_offset": data_controller.get_upload_offset(upload_id=upload_id)
+                },
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    finally:
+        await asset_model.unlock_upload_session(asset_id=asset_record.id, lock_token=lock_token)
+
+    if not is_valid:
+        return JSONResponse(
+            content={
+                "signal": result_signal,
+                "upload_offset": committed_offset
+                },
+            status_code=status.HTTP_409_CONFLICT if result_signal == ResponseSignal.UPLOAD_OFFSET_MISMATCH.value
+                        else status.HTTP_400_BAD_REQUEST
+            )
+
+    return JSONResponse(
+        content={
+            "signal": result_signal,
+            "upload_offset": committed_offset,
+            "file_size": asset_record.asset_size
+            }
+    )
+
+
+@data_router.post("/upload/session/{project_id}/{upload_id}/finalize")
+async def finalize_upload_session(request: Request, project_id: str, upload_id: str,
+                                  app_settings: Settings = Depends(get_settings)):
+
+    project, asset_model, asset_record = await get_upload_session(
+        request=request, project_id=project_id, upload_id=upload_id
+    )
+
+    if asset_record is None:
+        return JSONResponse(
+            content={"signal": ResponseSignal.UPLOAD_SESSION_NOT_FOUND.value},
+            status_code=status.HTTP_404_NOT_FOUND
+            )
+
+    # no range written meanwhile, and a single finalize: the partial file is moved only once
+    lock_token = await asset_model.lock_upload_session(
+        asset_id=asset_record.id,
+        lock_seconds=app_settings.UPLOAD_SESSION_LOCK_SECONDS
+    )
+
+    if lock_token is None:
+        return JSONResponse(
+            content={"signal": ResponseSignal.UPLOAD_SESSION_BUSY.value},
+            status_code=status.HTTP_409_CONFLICT
+            )
+
+    try:
+        return await finalize_locked_upload_session(project=project, asset_model=asset_model,
+                                                    asset_record=asset_record, upload_id=upload_id,
+                                                    app_settings=app_settings)
+    finally:
+        await asset_model.unlock_upload_session(asset_id=asset_record.id, lock_token=lock_token)
+
+
+async def finalize_locked_upload_session(project, asset_model: AssetModel, asset_record: Asset, upload_id: str,
+                                         app_settings: Settings):
+
+    data_controller = DataController()
+    committed_offset = data_controller.get_upload_offset(upload_id=upload_id)
+
+    if committed_offset != asset_record.asset_size:
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.UPLOAD_INCOMPLETE.value,
+                "upload_offset": committed_offset,
+                "file_size": asset_record.asset_size
+                },
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    # the partial file is copied through write_blob_stream, so it is checked, hashed and compressed like the other uploads:
+    # the declared content_type was only checked against the extension, the magic bytes must match it too
+    part_path = data_controller.get_upload_part_path(upload_id=upload_id)
+
+    try:
+        is_valid, result_signal, blob = await data_controller.write_blob_stream(
+            chunks=data_controller.iter_file(file_path=part_path),
+            allowed_types=app_settings.FILE_ALLOWED_TYPES,
+            expected_type=data_controller.get_expected_content_type(file_name=asset_record.asset_name)
+            )
+
+    except Exception as e:
+
+        logger.error(f"An error occurred while saving the file: {e}")
+
+        return JSONResponse(
+            content={"signal": ResponseSignal.FILE_UPLOAD_FAILED.value},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    if not is_valid:
+        # resuming can not fix the content, drop the session
+        data_controller.delete_upload_part(upload_id=upload_id)
+        await asset_model.delete_asset(asset_id=asset_record.id)
+
+        return JSONResponse(
+            content={"signal": result_signal},
+            status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+    data_controller.delete_upload_part(upload_id=upload_id)
+    file_hash = blob["file_hash"]
+    blob_path = blob["file_path"]
+
+    # the same content was already uploaded to this project, drop the session and reuse the existing asset
+    existing_asset = await asset_model.get_asset_by_hash(
+        asset_project_id=project.id,
+        asset_hash=file_hash
+    )
+
+    if existing_asset is not None:
+        await asset_model.delete_asset(asset_id=asset_record.id)
+
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.FILE_ALREADY_EXISTS.value,
+                "file_id": existing_asset.asset_name,
+                "file_id__": str(existing_asset.id),
+                "file_hash": file_hash,
+                "project_id": str(project.id)
+                }
+        )
+
+    asset_record.asset_type = AssetTypeEnum.FILE.value
+    asset_record.asset_lock = None
+    asset_record.asset_hash = file_hash
+    asset_record.asset_size = committed_offset
+    asset_record.asset_stored_size = blob["stored_size"]
+    asset_record = await asset_model.update_asset(asset=asset_record)
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.FILE_UPLOAD_SUCCESS.value,
+            "file_id": asset_record.asset_name,
+            "file_id__": str(asset_record.id),
+            "file_hash": file_hash,
+            "file_path": blob_path,
+            "project_id": str(project.id)
+            }
+    )
+
+
 ####################### File Processing #######################
     
     
     
 @data_router.post("/process/{project_id}")
-async def process_endpoint(request: Request, project_id: str, process_request: ProcessRequest):
+async def process_endpoint(request: Request, project_id: str, process_request: ProcessRequest,
+                           app_settings: Settings = Depends(get_settings)):
 
     chunk_size = process_request.chunk_size
     overlap_size = process_request.overlap_size
     do_reset = process_request.do_reset
+    splitter = process_request.splitter.value
+    pdf_extractor = process_request.pdf_extractor.value
+    chunking_profiles = [
+        profile.dict()
+        for profile in process_request.chunking_profiles
+    ] if process_request.chunking_profiles else None
+    length_unit = process_request.length_unit.value
 
-    project_model = await ProjectModel.create_instance(
-        db_client=request.app.db_client
-    )
+    project_model = request.app.models.project_model
 
     project = await project_model.get_project_or_create_one(
         project_id=project_id
     )
 
-    asset_model = await AssetModel.create_instance(
-            db_client=request.app.db_client
-        )
+    asset_model = request.app.models.asset_model
 
     project_files_ids = {}
     if process_request.file_id:
@@ -145,21 +728,33 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
             )
 
         project_files_ids = {
-            asset_record.id: asset_record.asset_name
+            asset_record.id: {"asset_name": asset_record.asset_name, "asset_hash": asset_record.asset_hash}
         }
     
     else:
         
 
-        project_files = await asset_model.get_all_project_assets(
+        # the job only needs the name and the hash of every file: projected raw records, no Asset per file.
+        # every file is still listed in the job document (job_assets), so the files of a job are bounded
+        # by PROCESSING_MAX_JOB_FILES, well below the 16 MB document limit
+        max_job_files = app_settings.PROCESSING_MAX_JOB_FILES
+        async for batch in asset_model.iter_assets(
             asset_project_id=project.id,
             asset_type=AssetTypeEnum.FILE.value,
-        )
+            fields=["asset_name", "asset_hash"],
+            limit=max_job_files + 1
+        ):
+            for record in batch:
+                project_files_ids[record["_id"]] = record
 
-        project_files_ids = {
-            record.id: record.asset_name
-            for record in project_files
-        }
+        if len(project_files_ids) > max_job_files:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.TOO_MANY_FILES_ERROR.value,
+                    "max_job_files": max_job_files,
+                }
+            )
 
     if len(project_files_ids) == 0:
         return JSONResponse(
@@ -169,62 +764,124 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
             }
         )
     
-    process_controller = ProcessController(project_id=project_id)
+    # the processing runs in the background (see workers/ProcessingWorkerPool), the client polls /process/status/{job_id}
+    job_model = request.app.models.job_model
+
+    job = await job_model.create_job(job=ProcessingJob(
+        job_project_id=project.id,
+        job_status=JobStatusEnum.QUEUED.value,
+        job_config={
+            "chunk_size": chunk_size,
+            "overlap_size": overlap_size,
+            "do_reset": do_reset,
+            "splitter": splitter,
+            "pdf_extractor": pdf_extractor,
+            "chunking_profiles": chunking_profiles,
+            "length_unit": length_unit,
+        },
+        job_assets=[
+            {
+                "asset_id": asset_id,
+                "asset_name": asset_record["asset_name"],
+                "asset_hash": asset_record.get("asset_hash"),
+                "status": JobAssetStatusEnum.PENDING.value,
+                "inserted_chunks": 0,
+                "error": None,
+            }
+            for asset_id, asset_record in project_files_ids.items()
+        ]
+    ))
 
-    no_records = 0
-    no_files = 0
+    request.app.processing_worker_pool.notify()
 
-    chunk_model = await ChunkModel.create_instance(
-                        db_client=request.app.db_client
-                    )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "signal": ResponseSignal.PROCESSING_QUEUED.value,
+            "job_id": str(job.id),
+            "total_files": len(project_files_ids)
+        }
+    )
 
-    if do_reset == 1:
-        _ = await chunk_model.delete_chunks_by_project_id(
-            project_id=project.id
-        )
 
-    for asset_id, file_id in project_files_ids.items():
+@data_router.get("/process/status/{job_id}")
+async def process_status(request: Request, job_id: str):
 
-        file_content = process_controller.get_file_content(file_id=file_id)
+    job_model = request.app.models.job_model
 
-        if file_content is None:
-            logger.error(f"Error while processing file: {file_id}")
-            continue
+    job = await job_model.get_job(job_id=job_id)
 
-        file_chunks = process_controller.process_file_content(
-            file_content=file_content,
-            file_id=file_id,
-            chunk_size=chunk_size,
-            overlap_size=overlap_size
+    if job is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.JOB_ID_ERROR.value,
+            }
         )
 
-        if file_chunks is None or len(file_chunks) == 0:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={
-                    "signal": ResponseSignal.PROCESSING_FAILED.value
+    return JSONResponse(
+        content={
+            "job_id": str(job.id),
+            "job_status": job.job_status,
+            "total_files": len(job.job_assets),
+            "processed_files": job.job_processed_files,
+            "skipped_files": job.job_skipped_files,
+            "inserted_chunks": job.job_inserted_chunks,
+            "errors": job.job_errors,
+            "files": [
+                {
+                    "file_id": job_asset["asset_name"],
+                    "status": job_asset["status"],
+                    "inserted_chunks": job_asset["inserted_chunks"],
+                    "error": job_asset["error"],
                 }
-            )
+                for job_asset in job.job_assets
+            ],
+            "created_at": job.job_created_at.isoformat(),
+            "finished_at": job.job_finished_at.isoformat() if job.job_finished_at else None,
+        }
+    )
 
-        file_chunks_records = [
-            DataChunk(
-                chunk_text=chunk.page_content,
-                chunk_metadata=chunk.metadata,
-                chunk_order=i+1,
-                chunk_project_id=project.id,
-                chunk_asset_id=asset_id
-            )
-            for i, chunk in enumerate(file_chunks)
-        ]
 
-        no_records += await chunk_model.insert_many_chunks(chunks=file_chunks_records)
-        no_files += 1
+@data_router.get("/process/stats")
+async def process_stats(request: Request):
+
+    # files waiting for / holding a processing slot in this app process (see workers/IngestionScheduler)
+    scheduler_stats = request.app.processing_worker_pool.scheduler.get_stats()
+
+    # jobs not claimed by any worker yet, all app processes together
+    job_model = request.app.models.job_model
+
+    project_model = request.app.models.project_model
+
+    queued_jobs_stats = await job_model.get_queued_jobs_stats()
+    project_ids = await project_model.get_project_ids_by_ids(ids=queued_jobs_stats.keys())
+
+    queued_jobs = {}
+    now = datetime.utcnow()
+    for job_project_id, job_stats in queued_jobs_stats.items():
+        if job_project_id not in project_ids:
+            continue
+
+        queued_jobs[project_ids[job_project_id]] = {
+            "queued_jobs": job_stats["queued_jobs"],
+            "oldest_queued_seconds": round((now - job_stats["oldest_queued_at"]).total_seconds(), 3),
+        }
+
+    empty_project_stats = {"queued_jobs": 0, "oldest_queued_seconds": 0.0}
 
     return JSONResponse(
         content={
-            "signal": ResponseSignal.PROCESSING_SUCCESS.value,
-            "inserted_chunks": no_records,
-            "processed_files": no_files
+            **{key: value for key, value in scheduler_stats.items() if key != "projects"},
+            # hits / misses of the project lookups of this app process (see ProjectModel.get_project_or_create_one)
+            "project_cache": project_model.get_project_cache_stats(),
+            "projects": {
+                project_id: {
+                    **queued_jobs.get(project_id, empty_project_stats),
+                    **scheduler_stats["projects"].get(project_id, {}),
+                }
+                for project_id in scheduler_stats["projects"].keys() | queued_jobs.keys()
+            }
         }
     )
     
@@ -239,6 +896,398 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
     
     
     
+####################### Projects #######################
+
+@data_router.get("/projects")
+async def list_projects(request: Request, cursor: Optional[str] = None,
+                        page_size: int = Query(10, gt=0, le=1000), count: CountModeEnum = CountModeEnum.NONE):
+
+    r"""
+    Lists the projects one page at a time, in creation order.
+
+    - cursor: the `next_cursor` of the previous page (keyset pagination, constant time at any depth).
+    - count: none | estimated | exact, how the `total` is computed (see CountModeEnum).
+    """
+
+    after = None
+    if cursor is not None:
+        try:
+            after_id, = decode_cursor(cursor=cursor, size=1)
+            after = ObjectId(after_id)
+        except (ValueError, TypeError, InvalidId):
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.PAGE_CURSOR_INVALID.value,
+                }
+            )
+
+    project_model = request.app.models.project_model
+
+    projects, next_after, total_documents = await project_model.get_projects_page(
+        page_size=page_size,
+        after=after,
+        count_mode=count.value
+    )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.PROJECTS_LISTED.value,
+            "projects": [
+                {
+                    "project_id": project.project_id,
+                    "id": str(project.id),
+                }
+                for project in projects
+            ],
+            "next_cursor": encode_cursor([str(next_after)]) if next_after is not None else None,
+            "total": total_documents,
+        }
+    )
+
+
+####################### Assets #######################
+
+# asset fields a client can ask for, the file_id (asset_name) and the asset id are always returned
+ASSET_FIELDS = {"asset_type", "asset_size", "asset_stored_size", "asset_hash", "asset_config", "asset_chunking",
+                "asset_pushed_at"}
+
+
+def get_json_value(value):
+
+    # ObjectIds and dates (Example: asset_chunking.generation, asset_pushed_at) are sent as strings
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: get_json_value(item) for key, item in value.items()}
+
+    return value
+
+
+@data_router.get("/assets/{project_id}")
+async def list_assets(request: Request, project_id: str, asset_type: Optional[str] = None,
+                      min_size: Optional[int] = Query(None, ge=0), max_size: Optional[int] = Query(None, ge=0),
+                      pushed_after: Optional[datetime] = None, pushed_before: Optional[datetime] = None,
+                      cursor: Optional[str] = None, page_size: int = Query(100, gt=0, le=1000),
+                      fields: Optional[str] = None):
+
+    r"""
+    Lists the assets of a project one page at a time, in upload order.
+
+    - asset_type, min_size / max_size (bytes), pushed_after / pushed_before (ISO dates): filters.
+    - cursor: the `next_cursor` of the previous page (keyset pagination, constant time at any depth).
+    - fields: comma separated asset fields among ASSET_FIELDS (Example: `fields=asset_size,asset_pushed_at`).
+      Defaults to every field.
+    """
+
+    project_model = request.app.models.project_model
+
+    project = await project_model.get_project(project_id=project_id)
+
+    if project is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.PROJECT_NOT_FOUND_ERROR.value,
+            }
+        )
+
+    asset_fields = sorted(ASSET_FIELDS)
+    if fields is not None:
+        asset_fields = [field.strip() for field in fields.split(",") if field.strip()]
+
+        if not set(asset_fields) <= ASSET_FIELDS:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.ASSET_FIELDS_INVALID.value,
+                    "allowed_fields": sorted(ASSET_FIELDS),
+                }
+            )
+
+    after = None
+    if cursor is not None:
+        try:
+            after_id, = decode_cursor(cursor=cursor, size=1)
+            after = ObjectId(after_id)
+        except (ValueError, TypeError, InvalidId):
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.PAGE_CURSOR_INVALID.value,
+                }
+            )
+
+    asset_model = request.app.models.asset_model
+
+    records = await asset_model.get_assets_page(
+        asset_project_id=project.id,
+        page_size=page_size,
+        asset_type=asset_type,
+        min_size=min_size,
+        max_size=max_size,
+        pushed_after=pushed_after,
+        pushed_before=pushed_before,
+        fields=["asset_name", *asset_fields],
+        after=after
+    )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.ASSETS_LISTED.value,
+            "assets": [
+                {
+                    "file_id": record["asset_name"],
+                    "asset_id": str(record["_id"]),
+                    **{
+                        field: get_json_value(record.get(field))
+                        for field in asset_fields
+                    },
+                }
+                for record in records
+            ],
+            "next_cursor": encode_cursor([str(records[-1]["_id"])]) if len(records) == page_size else None,
+        }
+    )
+
+
+####################### Chunks #######################
+
+# chunk fields a client can ask for, the sort key (file_id, chunk_order, chunk_id) is always returned
+CHUNK_FIELDS = {"chunk_text", "chunk_metadata", "chunk_profile", "chunk_generation"}
+
+EXPORT_MEDIA_TYPES = {
+    CompressionEnum.NONE.value: "application/x-ndjson",
+    CompressionEnum.GZIP.value: "application/gzip",
+    CompressionEnum.ZSTD.value: "application/zstd",
+}
+
+
+async def get_chunks_filters(request: Request, project_id: str, file_id: Optional[str], fields: Optional[str]):
+
+    r"""
+    Checks the parameters shared by the chunk listing and export endpoints.
+
+    Returns:
+        tuple: (filters, None) with the get_chunks_page / iter_chunks arguments, or (None, error JSONResponse).
+    """
+
+    project_model = request.app.models.project_model
+
+    project = await project_model.get_project(project_id=project_id)
+
+    if project is None:
+        return None, JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "signal": ResponseSignal.PROJECT_NOT_FOUND_ERROR.value,
+            }
+        )
+
+    chunk_fields = None
+    if fields is not None:
+        chunk_fields = [field.strip() for field in fields.split(",") if field.strip()]
+
+        if not set(chunk_fields) <= CHUNK_FIELDS:
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.CHUNK_FIELDS_INVALID.value,
+                    "allowed_fields": sorted(CHUNK_FIELDS),
+                }
+            )
+
+    filters = {"project_id": project.id, "fields": chunk_fields}
+
+    asset_model = request.app.models.asset_model
+
+    if file_id is not None:
+        asset_record = await asset_model.get_asset_record(
+            asset_project_id=project.id,
+            asset_name=file_id
+        )
+
+        if asset_record is None:
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.FILE_ID_ERROR.value,
+                }
+            )
+
+        filters["asset_id"] = asset_record.id
+
+    # only the committed chunks: the ones of a running or failed processing are never listed next to them
+    filters["committed_only"] = True
+
+    return filters, None
+
+
+def get_chunk_content(chunk: dict, asset_names: dict):
+
+    # JSON ready chunk, with the file id instead of the asset ObjectId
+    return {
+        "chunk_id": str(chunk["_id"]),
+        "file_id": asset_names.get(chunk["chunk_asset_id"]),
+        "chunk_order": chunk["chunk_order"],
+        **{
+            field: str(chunk[field]) if isinstance(chunk[field], ObjectId) else chunk[field]
+            for field in CHUNK_FIELDS
+            if field in chunk
+        },
+    }
+
+
+@data_router.get("/chunks/{project_id}")
+async def list_chunks(request: Request, project_id: str, file_id: Optional[str] = None,
+                      profile: Optional[str] = None, cursor: Optional[str] = None,
+                      limit: int = Query(100, gt=0, le=1000), fields: Optional[str] = None):
+
+    r"""
+    Lists the chunks of a project (or of one of its files) ordered by file then chunk_order, one page at a time.
+    Only the committed chunks are listed, not the ones a running (or failed) processing wrote.
+
+    - cursor: the `next_cursor` of the previous page (keyset pagination, constant time at any depth).
+    - fields: comma separated chunk fields among CHUNK_FIELDS (Example: `fields=chunk_metadata` leaves the text out).
+      Defaults to every field.
+    """
+
+    filters, error_response = await get_chunks_filters(request=request, project_id=project_id, file_id=file_id,
+                                                       fields=fields)
+    if error_response is not None:
+        return error_response
+
+    after = None
+    if cursor is not None:
+        try:
+            after_asset_id, after_order, after_id = decode_cursor(cursor=cursor, size=3)
+            after = (ObjectId(after_asset_id), int(after_order), ObjectId(after_id))
+        except (ValueError, TypeError, InvalidId):
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.PAGE_CURSOR_INVALID.value,
+                }
+            )
+
+    chunk_model = request.app.models.chunk_model
+
+    chunks = await chunk_model.get_chunks_page(
+        **filters,
+        chunk_profile=profile,
+        after=after,
+        limit=limit
+    )
+
+    # one query for the file ids of the page
+    asset_model = request.app.models.asset_model
+
+    asset_names = await asset_model.get_asset_names_by_ids(
+        asset_project_id=filters["project_id"],
+        asset_ids={chunk["chunk_asset_id"] for chunk in chunks}
+    )
+
+    next_cursor = None
+    if len(chunks) == limit:
+        last_chunk = chunks[-1]
+        next_cursor = encode_cursor([str(last_chunk["chunk_asset_id"]), last_chunk["chunk_order"], str(last_chunk["_id"])])
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.CHUNKS_LISTED.value,
+            "chunks": [
+                get_chunk_content(chunk=chunk, asset_names=asset_names)
+                for chunk in chunks
+            ],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@data_router.get("/chunks/{project_id}/export")
+async def export_chunks(request: Request, project_id: str, file_id: Optional[str] = None,
+                        profile: Optional[str] = None, fields: Optional[str] = None,
+                        compression: str = CompressionEnum.NONE.value,
+                        app_settings: Settings = Depends(get_settings)):
+
+    r"""
+    Streams all the chunks of a project (or of one of its files) as NDJSON, one chunk per line,
+    same filters, fields and order as /chunks/{project_id}.
+
+    The chunks are read from a single database cursor EXPORT_BATCH_SIZE at a time and every batch is sent
+    (compressed on the fly when `compression` is gzip or zstd) before the next one is read:
+    the export runs in constant memory whatever its size, and the first bytes leave after one round-trip.
+    """
+
+    filters, error_response = await get_chunks_filters(request=request, project_id=project_id, file_id=file_id,
+                                                       fields=fields)
+    if error_response is not None:
+        return error_response
+
+    if compression not in EXPORT_MEDIA_TYPES:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.EXPORT_COMPRESSION_NOT_SUPPORTED.value,
+                "allowed_compressions": list(EXPORT_MEDIA_TYPES.keys()),
+            }
+        )
+
+    compressor = get_compressor(compression=compression, level=app_settings.EXPORT_COMPRESSION_LEVEL)
+
+    chunk_model = request.app.models.chunk_model
+
+    asset_model = request.app.models.asset_model
+
+    def encode_batch(batch: list, asset_names: dict):
+
+        # JSON encoding and compression of a whole batch are CPU bound, they run in a thread (see stream_chunks)
+        data = "".join(
+            json.dumps(get_chunk_content(chunk=chunk, asset_names=asset_names), ensure_ascii=False) + "\n"
+            for chunk in batch
+        ).encode("utf-8")
+
+        if compressor is not None:
+            data = compressor.compress(data)
+
+        return data
+
+    async def stream_chunks():
+
+        asset_names = {}
+
+        async for batch in chunk_model.iter_chunks(**filters, chunk_profile=profile,
+                                                   batch_size=app_settings.EXPORT_BATCH_SIZE):
+
+            # the file ids of the assets not seen yet, the chunks are grouped by asset
+            missing_asset_ids = {chunk["chunk_asset_id"] for chunk in batch} - asset_names.keys()
+            if missing_asset_ids:
+                asset_names.update(await asset_model.get_asset_names_by_ids(
+                    asset_project_id=filters["project_id"],
+                    asset_ids=missing_asset_ids
+                ))
+
+            # off the event loop, the other requests are served meanwhile. The batches are encoded one after
+            # the other, the compressor is never used by two threads at once
+            data = await asyncio.to_thread(encode_batch, batch, asset_names)
+
+            if data:
+                yield data
+
+        if compressor is not None:
+            yield await asyncio.to_thread(compressor.flush)
+
+    file_name = f"{project_id}_chunks.ndjson{COMPRESSION_EXTENSIONS[compression]}"
+
+    return StreamingResponse(
+        stream_chunks(),
+        media_type=EXPORT_MEDIA_TYPES[compression],
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+    )
+
+
 # @data_router.post("/process/{project_id}")    
 # async def process_endpoint(project_id: str, process_request: ProcessRequest, request:Request):
     
@@ -1,9 +1,66 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, validator
+from typing import Optional, List
+from models.enums.ProcessingEnums import SplitterEnum, PdfExtractorEnum, LengthUnitEnum
+
+def check_overlap_size(overlap_size: int, chunk_size: int):
+
+    # a chunk must move the split forward: every file of the job would fail in the worker otherwise
+    if chunk_size is not None and overlap_size is not None and overlap_size >= chunk_size:
+        raise ValueError("overlap_size must be smaller than chunk_size")
+
+    return overlap_size
+
+
+class ChunkingProfile(BaseModel):
+    name: Optional[str] = None      # tag of the chunks (DataChunk.chunk_profile), defaults to "<chunk_size>_<overlap_size>"
+    chunk_size: int = Field(..., gt=0)
+    overlap_size: int = Field(20, ge=0)
+
+    @validator("overlap_size")
+    def validate_overlap_size(cls, value, values):
+        return check_overlap_size(overlap_size=value, chunk_size=values.get("chunk_size"))
+
 
 class ProcessRequest(BaseModel):
     file_id: str = None    # optional
-    chunk_size: Optional[int] = 100 
-    overlap_size: Optional[int] = 20
-    do_reset: Optional[int] = 0
-    
\ No newline at end of file
+    chunk_size: int = Field(100, gt=0)
+    overlap_size: int = Field(20, ge=0)
+    do_reset: Optional[int] = 0    # 1: delete all the chunks of the project and process every file again,
+                                   # 0: only process the files that are new or changed (content or chunk_size/overlap_size)
+    splitter: Optional[SplitterEnum] = SplitterEnum.LANGCHAIN    # langchain or native (same chunks, native is faster)
+    pdf_extractor: Optional[PdfExtractorEnum] = PdfExtractorEnum.LANGCHAIN  # langchain, native or native_blocks
+    chunking_profiles: Optional[List[ChunkingProfile]] = None   # every file is loaded once and split under every profile,
+                                                                # replaces chunk_size/overlap_size
+    length_unit: Optional[LengthUnitEnum] = LengthUnitEnum.CHARACTERS   # unit of chunk_size/overlap_size: characters or tokens
+
+    @validator("overlap_size")
+    def validate_overlap_size(cls, value, values):
+        return check_overlap_size(overlap_size=value, chunk_size=values.get("chunk_size"))
+
+    @validator("chunking_profiles")
+    def validate_chunking_profiles(cls, value):
+
+        if value is None:
+            return value
+
+        if len(value) == 0:
+            raise ValueError("chunking_profiles must not be empty")
+
+        for profile in value:
+            if profile.name is None:
+                profile.name = f"{profile.chunk_size}_{profile.overlap_size}"
+
+        if len({profile.name for profile in value}) != len(value):
+            raise ValueError("chunking_profiles names must be unique")
+
+        return value
+
+
+class UploadCheckRequest(BaseModel):
+    file_hash: str                  # SHA-256 hex digest of the file content
+
+
+class UploadSessionRequest(BaseModel):
+    file_name: str                  # original file name
+    file_size: int = Field(..., gt=0)   # total size of the file in bytes
+    content_type: str               # Example: application/pdf
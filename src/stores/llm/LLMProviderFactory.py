@@ -11,17 +11,17 @@ class LLMProviderFactory:
             return OpenAIProvider(
                 api_key = self.config.OPENAI_API_KEY,
                 api_url = self.config.OPENAI_API_URL,
-                default_input_max_characters=self.config.INPUT_DAFAULT_MAX_CHARACTERS,
-                default_generation_max_output_tokens=self.config.GENERATION_DAFAULT_MAX_TOKENS,
-                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE
+                default_input_max_characters=self.config.INPUT_DEFAULT_MAX_CHARACTERS,
+                default_generation_max_output_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
+                default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE
             )
 
         if provider == LLMEnums.COHERE.value:
             return CoHereProvider(
                 api_key = self.config.COHERE_API_KEY,
-                default_input_max_characters=self.config.INPUT_DAFAULT_MAX_CHARACTERS,
-                default_generation_max_output_tokens=self.config.GENERATION_DAFAULT_MAX_TOKENS,
-                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE
+                default_input_max_characters=self.config.INPUT_DEFAULT_MAX_CHARACTERS,
+                default_generation_max_output_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
+                default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE
             )
 
         return None
\ No newline at end of file
@@ -0,0 +1,163 @@
+from contextlib import asynccontextmanager
+from collections import deque
+import asyncio
+import time
+
+
+class ProjectQueue:
+    # scheduling state of one project
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.waiting = deque()      # (start_tag, enqueued_at, future), in arrival order
+        self.running = 0
+        self.last_finish_tag = 0.0
+
+        # stats
+        self.granted = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+
+class IngestionScheduler:
+    r"""
+    Shares the file processing slots of an app process between the projects.
+
+    - Global budget: at most `global_slots` files are processed at the same time.
+    - Per-project cap: at most `project_slots` files of the same project are processed at the same time.
+    - Weighted fair queuing (start-time fair queuing): when a slot is free, it goes to the waiting file with the
+      smallest start tag, among the projects under their cap. A file of cost C (Example: its size) pushes the next
+      start tag of its project by C / weight, so every project gets a share of the processing proportional to its
+      weight, whatever the number and the size of the files it queued.
+
+    A project is forgotten once it has nothing running nor waiting and the others caught up with it (its next start
+    tag is not ahead of the virtual time): it would start from the virtual time anyway, so the state of the projects
+    seen once does not pile up. When no file is running nor waiting, the virtual time catches up with every project
+    and they are all forgotten. The stats of a project are forgotten with it.
+
+    Usage:
+    ```
+    async with scheduler.slot(project_id="project1", cost=asset_size):
+        ... # process the file
+    ```
+    """
+
+    def __init__(self, global_slots: int, project_slots: int, project_weights: dict=None):
+        self.global_slots = global_slots
+        self.project_slots = project_slots
+        self.project_weights = project_weights or {}
+
+        self.running = 0
+        self.virtual_time = 0.0     # start tag of the last file given a slot
+        self.projects = {}
+
+    def get_project_queue(self, project_id: str):
+
+        if project_id not in self.projects:
+            self.projects[project_id] = ProjectQueue(weight=self.project_weights.get(project_id, 1.0))
+
+        return self.projects[project_id]
+
+    @asynccontextmanager
+    async def slot(self, project_id: str, cost: float=1):
+
+        await self.acquire(project_id=project_id, cost=cost)
+        try:
+            yield
+        finally:
+            self.release(project_id=project_id)
+
+    async def acquire(self, project_id: str, cost: float=1):
+
+        project_queue = self.get_project_queue(project_id=project_id)
+
+        start_tag = max(self.virtual_time, project_queue.last_finish_tag)
+        project_queue.last_finish_tag = start_tag + max(cost, 1) / project_queue.weight
+
+        future = asyncio.get_running_loop().create_future()
+        project_queue.waiting.append((start_tag, time.monotonic(), future))
+        self.dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was given while the caller was being cancelled: give it back
+                self.release(project_id=project_id)
+            else:
+                project_queue.waiting = deque(item for item in project_queue.waiting if item[2] is not future)
+                self.dispatch()
+            raise
+
+    def release(self, project_id: str):
+
+        self.running -= 1
+        self.projects[project_id].running -= 1
+        self.dispatch()
+
+    def dispatch(self):
+
+        while self.running < self.global_slots:
+
+            eligible = [
+                project_queue
+                for project_queue in self.projects.values()
+                if project_queue.waiting and project_queue.running < self.project_slots
+            ]
+            if not eligible:
+                break
+
+            project_queue = min(eligible, key=lambda project_queue: project_queue.waiting[0][0])
+            start_tag, enqueued_at, future = project_queue.waiting.popleft()
+
+            wait_seconds = time.monotonic() - enqueued_at
+            project_queue.granted += 1
+            project_queue.total_wait_seconds += wait_seconds
+            project_queue.max_wait_seconds = max(project_queue.max_wait_seconds, wait_seconds)
+
+            self.virtual_time = max(self.virtual_time, start_tag)
+            self.running += 1
+            project_queue.running += 1
+            future.set_result(None)
+
+        self.drop_idle_projects()
+
+    def drop_idle_projects(self):
+
+        if not self.running and not any(project_queue.waiting for project_queue in self.projects.values()):
+            self.virtual_time = max([self.virtual_time] + [
+                project_queue.last_finish_tag for project_queue in self.projects.values()
+            ])
+
+        for project_id in [
+            project_id
+            for project_id, project_queue in self.projects.items()
+            if not project_queue.waiting and not project_queue.running
+            and project_queue.last_finish_tag <= self.virtual_time
+        ]:
+            del self.projects[project_id]
+
+    def get_stats(self):
+
+        now = time.monotonic()
+
+        return {
+            "global_slots": self.global_slots,
+            "project_slots": self.project_slots,
+            "running": self.running,
+            "waiting": sum(len(project_queue.waiting) for project_queue in self.projects.values()),
+            "projects": {
+                project_id: {
+                    "weight": project_queue.weight,
+                    "running": project_queue.running,
+                    "queue_depth": len(project_queue.waiting),
+                    "granted": project_queue.granted,
+                    "avg_wait_seconds": round(project_queue.total_wait_seconds / project_queue.granted, 3)
+                                        if project_queue.granted else 0.0,
+                    "max_wait_seconds": round(project_queue.max_wait_seconds, 3),
+                    "oldest_wait_seconds": round(now - project_queue.waiting[0][1], 3)
+                                           if project_queue.waiting else 0.0,
+                }
+                for project_id, project_queue in self.projects.items()
+            }
+        }
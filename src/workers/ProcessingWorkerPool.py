@@ -0,0 +1,558 @@
+from controllers import get_file_windows, load_and_split_window, commit_page_cache
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from helpers.config import get_settings
+from models import ModelRegistry, ResponseSignal
+from models.db_schemes import DataChunk, ProcessingJob
+from models.enums.JobEnums import JobStatusEnum, JobAssetStatusEnum
+from models.enums.ProcessingEnums import ProcessingEnum, SplitterEnum, PdfExtractorEnum, LengthUnitEnum
+from collections import deque
+from .IngestionScheduler import IngestionScheduler
+from bson.objectid import ObjectId
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import uuid
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class ProcessingWorkerPool:
+    r"""
+    Runs the processing jobs (load -> split -> insert chunks) in the background, outside of the HTTP requests.
+
+    The queue is the jobs collection itself: every worker atomically claims the oldest queued job (JobModel.claim_next_job),
+    so the jobs survive restarts and can be shared by several uvicorn processes. A project runs one job at a time,
+    its next jobs wait in the queue. A running job refreshes its heartbeat,
+    and a job whose heartbeat is older than the lease is claimed again and resumed from the first asset not done yet.
+
+    Loading and splitting the files is CPU bound: it runs in a ProcessPoolExecutor (PROCESSING_POOL_SIZE processes),
+    while the chunks are inserted from the event loop. The files of all the running jobs share PROCESSING_GLOBAL_FILE_SLOTS
+    slots, at most PROCESSING_PROJECT_FILE_SLOTS per project, given with weighted fair queuing (see IngestionScheduler).
+    Every file goes through a streaming pipeline (see process_asset), so large files are never held in memory at once.
+    """
+
+    def __init__(self, models: ModelRegistry):
+        self.models = models
+
+        self.pool_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.wake_up = asyncio.Event()
+        self.tasks = []
+
+        self.scheduler = IngestionScheduler(
+            global_slots=self.app_settings.PROCESSING_GLOBAL_FILE_SLOTS,
+            project_slots=self.app_settings.PROCESSING_PROJECT_FILE_SLOTS,
+            project_weights=self.app_settings.PROCESSING_PROJECT_WEIGHTS
+        )
+
+    @property
+    def app_settings(self):
+        # the current snapshot, see reload_settings (the slots, the pool size and the worker processes keep their startup values)
+        return get_settings()
+
+    async def start(self):
+
+        # the collections and indexes were checked once by the registry at startup
+        self.job_model = self.models.job_model
+        self.project_model = self.models.project_model
+        self.chunk_model = self.models.chunk_model
+        self.asset_model = self.models.asset_model
+
+        self.executor = self.create_executor()
+
+        self.tasks = [
+            asyncio.create_task(self.worker_loop(worker_id=f"{self.pool_id}-{i}"))
+            for i in range(self.app_settings.PROCESSING_WORKERS)
+        ]
+
+    def create_executor(self):
+
+        # spawn: forking a process that already runs the event loop and the Mongo client threads is not safe
+        return ProcessPoolExecutor(
+            max_workers=self.app_settings.PROCESSING_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def stop(self):
+
+        # the interrupted jobs keep their progress and are resumed once their lease expires
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def notify(self):
+        # a new job was queued, wake up the idle workers instead of waiting for the next poll
+        self.wake_up.set()
+
+    async def worker_loop(self, worker_id: str):
+
+        while True:
+
+            self.wake_up.clear()
+
+            try:
+                job = await self.job_model.claim_next_job(
+                    worker_id=worker_id,
+                    lease_seconds=self.app_settings.PROCESSING_JOB_LEASE_SECONDS
+                )
+            except Exception as e:
+                logger.error(f"Error while claiming a processing job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.wake_up.wait(), timeout=self.app_settings.PROCESSING_JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.run_job(job=job, worker_id=worker_id)
+
+    async def keep_alive(self, job: ProcessingJob, worker_id: str, job_task: asyncio.Task):
+
+        while True:
+            await asyncio.sleep(self.app_settings.PROCESSING_JOB_LEASE_SECONDS / 3)
+
+            if not await self.job_model.heartbeat(job_id=job.id, worker_id=worker_id):
+                # the lease expired and another worker resumed the job: stop here, instead of inserting
+                # the same chunks twice (the updates of this worker would be ignored anyway, see JobModel)
+                logger.warning(f"Processing job {job.id} was taken over by another worker, stopping it")
+                job_task.cancel()
+                return
+
+    async def run_job(self, job: ProcessingJob, worker_id: str):
+
+        job_task = asyncio.create_task(self.process_job(job=job, worker_id=worker_id))
+        heartbeat_task = asyncio.create_task(self.keep_alive(job=job, worker_id=worker_id, job_task=job_task))
+
+        try:
+            await job_task
+
+        except asyncio.CancelledError:
+            # cancelled by keep_alive (lease lost): this worker goes on with the next job
+            if heartbeat_task.done() and not heartbeat_task.cancelled():
+                return
+            raise
+
+        finally:
+            heartbeat_task.cancel()
+            job_task.cancel()
+            await asyncio.gather(heartbeat_task, job_task, return_exceptions=True)
+
+    async def process_job(self, job: ProcessingJob, worker_id: str):
+
+        try:
+            project = await self.project_model.get_project_by_id(project_id=job.job_project_id)
+
+            if project is None:
+                await self.job_model.mark_job_finished(
+                    job_id=job.id,
+                    worker_id=worker_id,
+                    job_status=JobStatusEnum.FAILED.value,
+                    error=f"Project {job.job_project_id} not found"
+                )
+                return
+
+            if job.job_config.get("do_reset") == 1 and not job.job_reset_done:
+                _ = await self.chunk_model.delete_chunks_by_project_id(
+                    project_id=project.id
+                )
+                _ = await self.asset_model.reset_project_chunking(asset_project_id=project.id)
+                await self.job_model.mark_reset_done(job_id=job.id, worker_id=worker_id)
+
+            # every file waits for a slot of the scheduler, shared fairly with the jobs of the other projects.
+            # The files are fed lazily: a project never holds more than PROCESSING_PROJECT_FILE_SLOTS slots, so as many
+            # runners take the next file one after the other, instead of one task (and its lookups) per file up front
+            job_assets = iter([
+                job_asset
+                for job_asset in job.job_assets
+                if job_asset["status"] not in [JobAssetStatusEnum.DONE.value, JobAssetStatusEnum.SKIPPED.value,
+                                               JobAssetStatusEnum.FAILED.value]
+            ])
+
+            await asyncio.gather(*[
+                self.run_job_assets(job=job, worker_id=worker_id, project=project, job_assets=job_assets)
+                for _ in range(self.scheduler.project_slots)
+            ])
+
+            await self.job_model.mark_job_finished(
+                job_id=job.id,
+                worker_id=worker_id,
+                job_status=await self.get_job_final_status(job_id=job.id)
+            )
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.error(f"Processing job {job.id} failed: {e}")
+            await self.job_model.mark_job_finished(
+                job_id=job.id,
+                worker_id=worker_id,
+                job_status=JobStatusEnum.FAILED.value,
+                error=str(e)
+            )
+
+    async def get_job_final_status(self, job_id: ObjectId):
+
+        # the asset statuses of a resumed job were partly written by the previous worker, read them back
+        job = await self.job_model.get_job(job_id=job_id)
+        asset_statuses = {job_asset["status"] for job_asset in job.job_assets}
+
+        if JobAssetStatusEnum.FAILED.value not in asset_statuses:
+            return JobStatusEnum.COMPLETED.value
+
+        if asset_statuses & {JobAssetStatusEnum.DONE.value, JobAssetStatusEnum.SKIPPED.value}:
+            return JobStatusEnum.PARTIAL.value
+
+        return JobStatusEnum.FAILED.value
+
+    async def run_job_assets(self, job: ProcessingJob, worker_id: str, project, job_assets):
+
+        # job_assets is shared by the runners of the job: every file is taken by one of them
+        for job_asset in job_assets:
+            await self.run_job_asset(job=job, worker_id=worker_id, project=project, job_asset=job_asset)
+
+    async def run_job_asset(self, job: ProcessingJob, worker_id: str, project, job_asset: dict):
+
+        asset_record = await self.asset_model.get_asset_by_id(
+            asset_project_id=project.id,
+            asset_id=job_asset["asset_id"]
+        )
+
+        if asset_record is None:
+            await self.job_model.mark_asset_failed(
+                job_id=job.id,
+                worker_id=worker_id,
+                asset_id=job_asset["asset_id"],
+                error=f"{job_asset['asset_name']}: {ResponseSignal.FILE_ID_ERROR.value}"
+            )
+            return
+
+        # the stored chunks were produced from the same content with the same parameters, nothing to do.
+        # The settings that change the chunks are read once here, recorded, and passed to the worker processes
+        # (they read their own settings when they start, maybe before a reload or an edit of .env)
+        app_settings = self.app_settings
+        file_extension = os.path.splitext(asset_record.asset_name)[-1]
+        chunking_state = {"asset_hash": asset_record.asset_hash}
+        if job.job_config.get("chunking_profiles"):
+            chunking_state["chunking_profiles"] = job.job_config["chunking_profiles"]
+        else:
+            chunking_state["chunk_size"] = job.job_config["chunk_size"]
+            chunking_state["overlap_size"] = job.job_config["overlap_size"]
+        if job.job_config.get("length_unit", LengthUnitEnum.CHARACTERS.value) == LengthUnitEnum.TOKENS.value:
+            chunking_state["length_unit"] = LengthUnitEnum.TOKENS.value
+            chunking_state["tokenizer"] = app_settings.PROCESSING_TOKENIZER
+        if file_extension == ProcessingEnum.PDF.value:
+            chunking_state["pdf_extractor"] = job.job_config.get("pdf_extractor", PdfExtractorEnum.LANGCHAIN.value)
+            chunking_state["window_pages"] = app_settings.PROCESSING_WINDOW_PAGES
+        if file_extension == ProcessingEnum.TXT.value:
+            chunking_state["window_bytes"] = app_settings.PROCESSING_WINDOW_BYTES
+        committed_state = asset_record.asset_chunking or {}
+
+        if job.job_config.get("do_reset") != 1 and chunking_state == {
+            key: value
+            for key, value in committed_state.items()
+            if key not in ["generation", "chunks_pending"]
+        }:
+            # the run that committed these chunks stopped before making them visible
+            if committed_state.get("chunks_pending"):
+                await self.finish_commit(project=project, asset_record=asset_record,
+                                         generation=committed_state["generation"])
+
+            await self.job_model.mark_asset_skipped(job_id=job.id, worker_id=worker_id, asset_id=asset_record.id)
+            return
+
+        # skipped files do not take a slot, a file costs its size: projects share the bytes processed, not the files
+        async with self.scheduler.slot(project_id=project.project_id, cost=asset_record.asset_size or 1):
+            await self.process_job_asset(job=job, worker_id=worker_id, project=project, job_asset=job_asset,
+                                         asset_record=asset_record, chunking_state=chunking_state,
+                                         committed_state=committed_state)
+
+    async def process_job_asset(self, job: ProcessingJob, worker_id: str, project, job_asset: dict, asset_record,
+                                chunking_state: dict, committed_state: dict):
+
+        # the job was taken over in the meantime: do not touch the chunks the new owner may be writing
+        if not await self.job_model.mark_asset_running(job_id=job.id, worker_id=worker_id, asset_id=asset_record.id):
+            return
+
+        # the new chunks are written next to the old ones (hidden, chunk_committed=False), the new generation is
+        # committed on the asset, its chunks are made visible, then the older ones are deleted: the asset always has
+        # a complete set of visible chunks, even if the processing fails midway (see ChunkModel.get_chunks_query).
+        # Nothing is deleted before the commit: the generations not committed yet may belong to another run
+        generation = ObjectId()
+        committed = False
+
+        try:
+            inserted_chunks = await self.process_asset(
+                project=project,
+                job_asset=job_asset,
+                job_config=job.job_config,
+                chunking_state=chunking_state,
+                generation=generation
+            )
+
+            # taken over while the file was processed (the lease expired before keep_alive stopped this job):
+            # the new generation is left uncommitted, the new owner processes the file again
+            if not await self.job_model.heartbeat(job_id=job.id, worker_id=worker_id):
+                logger.warning(f"{job_asset['asset_name']}: job {job.id} was taken over, the new chunks are not committed")
+                await self.drop_generation(project=project, asset_record=asset_record, generation=generation)
+                return
+
+            # compare-and-set on the generation committed when this run started
+            # chunks_pending: until finish_commit is over, a crash is caught up by the next job (see run_job_asset)
+            if not await self.asset_model.set_asset_chunking(
+                asset_id=asset_record.id,
+                asset_chunking=chunking_state | {"generation": generation, "chunks_pending": True},
+                committed_generation=committed_state.get("generation")
+            ):
+                raise ValueError("the chunks were replaced by another run in the meantime, the new ones are dropped")
+            committed = True
+
+            await self.finish_commit(project=project, asset_record=asset_record, generation=generation)
+
+        except Exception as e:
+            logger.error(f"Error while processing file: {job_asset['asset_name']}: {e}")
+            if not committed:
+                await self.drop_generation(project=project, asset_record=asset_record, generation=generation)
+            await self.job_model.mark_asset_failed(
+                job_id=job.id,
+                worker_id=worker_id,
+                asset_id=asset_record.id,
+                error=f"{job_asset['asset_name']}: {e}"
+            )
+            return
+
+        await self.job_model.mark_asset_done(
+            job_id=job.id,
+            worker_id=worker_id,
+            asset_id=asset_record.id,
+            inserted_chunks=inserted_chunks
+        )
+
+    async def finish_commit(self, project, asset_record, generation: ObjectId):
+
+        # for a moment both generations are visible, then the previous ones (and the chunks without a generation)
+        # are deleted. Every step can run again, after a crash
+        _ = await self.chunk_model.commit_generation(
+            project_id=project.id,
+            asset_id=asset_record.id,
+            generation=generation
+        )
+
+        _ = await self.chunk_model.delete_chunks_by_asset_id(
+            project_id=project.id,
+            asset_id=asset_record.id,
+            before_generation=generation
+        )
+
+        await self.asset_model.clear_chunking_pending(asset_id=asset_record.id, generation=generation)
+
+    async def drop_generation(self, project, asset_record, generation: ObjectId):
+
+        # the uncommitted chunks of a run (best effort: the next commit of the asset deletes them anyway, they are older)
+        try:
+            await self.chunk_model.delete_chunks_by_generation(
+                project_id=project.id, asset_id=asset_record.id, generation=generation
+            )
+        except Exception as e:
+            logger.error(f"{asset_record.asset_name}: the uncommitted chunks of generation {generation} were not deleted: {e}")
+
+    async def run_in_executor(self, func, *args):
+
+        executor = self.executor
+
+        try:
+            future = executor.submit(func, *args)
+            return await asyncio.wrap_future(future)
+
+        except asyncio.CancelledError:
+            # a call already running in a worker process cannot be stopped: wait for it to end, so that its side
+            # effects (Example: the page cache parts of a window) are over when the caller cleans up after it
+            if not future.done():
+                await asyncio.gather(asyncio.wrap_future(future), return_exceptions=True)
+            raise
+
+        except BrokenProcessPool:
+            # a worker process died (Example: out of memory on a huge file), replace the pool for the next files
+            if self.executor is executor:
+                self.executor = self.create_executor()
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def process_asset(self, project, job_asset: dict, job_config: dict, chunking_state: dict,
+                            generation: ObjectId):
+
+        r"""
+        Streaming pipeline for one file, the memory used is bounded by the window and batch sizes, not by the file size:
+        window loader + splitter (worker processes, PROCESSING_WINDOWS_IN_FLIGHT windows at a time) -> bounded queue -> DataChunk builder -> ChunkWriter (PROCESSING_INSERTS_IN_FLIGHT unordered bulk_writes at a time).
+        The loader stops when PROCESSING_PIPELINE_DEPTH split windows are waiting for the writer (backpressure).
+        The extracted PDF pages are kept in a page cache next to the blob, the next runs only split them again.
+        The window sizes and the tokenizer are the ones recorded in `chunking_state`.
+        """
+
+        pdf_extractor = job_config.get("pdf_extractor", PdfExtractorEnum.LANGCHAIN.value)
+        cache_token = str(generation)
+
+        windows = await self.run_in_executor(
+            get_file_windows,
+            project.project_id,
+            job_asset["asset_name"],
+            job_asset.get("asset_hash"),
+            pdf_extractor,
+            chunking_state.get("window_pages"),
+            chunking_state.get("window_bytes"),
+        )
+
+        if windows is None:
+            raise ValueError(ResponseSignal.FILE_PROCESS_FAILED.value)
+
+        queue = asyncio.Queue(maxsize=self.app_settings.PROCESSING_PIPELINE_DEPTH)
+        producer = asyncio.create_task(self.produce_windows(
+            queue=queue,
+            project=project,
+            job_asset=job_asset,
+            job_config=job_config,
+            windows=windows,
+            cache_token=cache_token,
+            tokenizer_name=chunking_state.get("tokenizer")
+        ))
+
+        try:
+            inserted_chunks = await self.consume_windows(
+                queue=queue,
+                project=project,
+                job_asset=job_asset,
+                generation=generation
+            )
+        except BaseException:
+            # stop the producer and wait for it: it waits for its windows still running in the pool,
+            # which would otherwise write their page cache parts again after the cleanup
+            await self.stop_producer(producer=producer)
+
+            # some windows are missing, only drop the page cache parts
+            await asyncio.to_thread(
+                commit_page_cache, project.project_id, job_asset.get("asset_hash"), pdf_extractor, cache_token, False
+            )
+            raise
+
+        # the writer got the end of the file: the producer is done
+        await producer
+
+        # merging the parts is only file I/O, a thread is enough
+        await asyncio.to_thread(
+            commit_page_cache, project.project_id, job_asset.get("asset_hash"), pdf_extractor, cache_token, True
+        )
+
+        if inserted_chunks == 0:
+            raise ValueError(ResponseSignal.PROCESSING_FAILED.value)
+
+        return inserted_chunks
+
+    async def stop_producer(self, producer: asyncio.Task):
+
+        producer.cancel()
+
+        # shielded: cancelling the job while the producer winds down must not leave its windows running
+        try:
+            await asyncio.shield(asyncio.gather(producer, return_exceptions=True))
+        except asyncio.CancelledError:
+            await asyncio.gather(producer, return_exceptions=True)
+            raise
+
+    async def produce_windows(self, queue: asyncio.Queue, project, job_asset: dict, job_config: dict, windows: list,
+                              cache_token: str=None, tokenizer_name: str=None):
+
+        # up to PROCESSING_WINDOWS_IN_FLIGHT windows are loaded and split in parallel by the pool,
+        # their chunks are handed to the writer in the window order
+        in_flight = deque()
+
+        try:
+            for window in windows:
+
+                in_flight.append(asyncio.ensure_future(self.run_in_executor(
+                    load_and_split_window,
+                    project.project_id,
+                    job_asset["asset_name"],
+                    job_asset.get("asset_hash"),
+                    window,
+                    job_config["chunk_size"],
+                    job_config["overlap_size"],
+                    job_config.get("splitter", SplitterEnum.LANGCHAIN.value),
+                    job_config.get("pdf_extractor", PdfExtractorEnum.LANGCHAIN.value),
+                    cache_token,
+                    job_config.get("chunking_profiles"),
+                    job_config.get("length_unit", LengthUnitEnum.CHARACTERS.value),
+                    tokenizer_name,
+                )))
+
+                if len(in_flight) >= self.app_settings.PROCESSING_WINDOWS_IN_FLIGHT:
+                    await self.put_window_chunks(queue=queue, future=in_flight.popleft())
+
+            while in_flight:
+                await self.put_window_chunks(queue=queue, future=in_flight.popleft())
+
+            await queue.put(None) # end of the file
+
+        except Exception as e:
+            await queue.put(e) # handed to the writer, which raises it
+
+        finally:
+            for future in in_flight:
+                future.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def put_window_chunks(self, queue: asyncio.Queue, future: asyncio.Future):
+
+        file_chunks = await future
+
+        if file_chunks is None:
+            raise ValueError(ResponseSignal.FILE_PROCESS_FAILED.value)
+
+        await queue.put(file_chunks) # waits while the writer is behind
+
+    async def consume_windows(self, queue: asyncio.Queue, project, job_asset: dict, generation: ObjectId):
+
+        # several unordered bulk writes in flight, batches cut by encoded size (see ChunkWriter)
+        writer = self.chunk_model.get_writer(
+            max_batch_bytes=self.app_settings.PROCESSING_INSERT_BATCH_BYTES,
+            max_batch_size=self.app_settings.PROCESSING_INSERT_BATCH_SIZE,
+            concurrency=self.app_settings.PROCESSING_INSERTS_IN_FLIGHT
+        )
+        chunk_orders = {} # chunk_profile -> last chunk_order, every profile is numbered on its own
+
+        try:
+            while (file_chunks := await queue.get()) is not None:
+
+                if isinstance(file_chunks, Exception):
+                    raise file_chunks
+
+                for chunk_text, chunk_metadata, chunk_profile in file_chunks:
+                    chunk_orders[chunk_profile] = chunk_orders.get(chunk_profile, 0) + 1
+                    # the splitter output is trusted (never empty, numbered from 1): no DataChunk validation
+                    await writer.add(DataChunk.make_record(
+                        chunk_text=chunk_text,
+                        chunk_metadata=chunk_metadata,
+                        chunk_order=chunk_orders[chunk_profile],
+                        chunk_project_id=project.id,
+                        chunk_asset_id=job_asset["asset_id"],
+                        chunk_generation=generation,
+                        chunk_profile=chunk_profile,
+                        chunk_committed=False
+                    ))
+
+        except BaseException:
+            await writer.abort()
+            raise
+
+        try:
+            return await writer.close()
+        finally:
+            for batch in writer.batches:
+                logger.debug(f"{job_asset['asset_name']}: insert batch {batch}")
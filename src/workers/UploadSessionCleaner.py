@@ -0,0 +1,61 @@
+from controllers import DataController
+from helpers.config import get_settings
+from models import ModelRegistry
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class UploadSessionCleaner:
+    r"""
+    Deletes the resumable upload sessions abandoned by their clients (no range written nor finalize for
+    UPLOAD_SESSION_TTL_SECONDS), with their partial files in assets/uploads, every UPLOAD_SESSION_CLEANUP_INTERVAL seconds.
+
+    Every session is deleted atomically (see AssetModel.delete_expired_upload_sessions): several app processes
+    can run a cleaner, and a session that became active in the meantime is kept.
+    """
+
+    def __init__(self, models: ModelRegistry):
+        self.models = models
+        self.task = None
+
+    @property
+    def app_settings(self):
+        return get_settings()
+
+    async def start(self):
+        self.task = asyncio.create_task(self.cleanup_loop())
+
+    async def stop(self):
+
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def cleanup_loop(self):
+
+        while True:
+            try:
+                await self.delete_expired_sessions()
+            except Exception as e:
+                logger.error(f"Error while deleting the expired upload sessions: {e}")
+
+            await asyncio.sleep(self.app_settings.UPLOAD_SESSION_CLEANUP_INTERVAL)
+
+    async def delete_expired_sessions(self):
+
+        inactive_before = datetime.utcnow() - timedelta(seconds=self.app_settings.UPLOAD_SESSION_TTL_SECONDS)
+
+        upload_ids = await self.models.asset_model.delete_expired_upload_sessions(inactive_before=inactive_before)
+
+        data_controller = DataController()
+        for upload_id in upload_ids:
+            await asyncio.to_thread(data_controller.delete_upload_part, upload_id=str(upload_id))
+
+        if upload_ids:
+            logger.info(f"Deleted {len(upload_ids)} expired upload sessions")
+
+        return len(upload_ids)
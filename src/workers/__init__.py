@@ -0,0 +1,3 @@
+from .ProcessingWorkerPool import ProcessingWorkerPool
+from .IngestionScheduler import IngestionScheduler
+from .UploadSessionCleaner import UploadSessionCleaner